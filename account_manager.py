@@ -3,7 +3,12 @@
 import json
 import os
 import platform
-import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     import urllib.request
@@ -12,16 +17,249 @@ try:
 except ImportError:
     _HAS_URLLIB = False
 
+import steam_collections
+import vdf_parser
 from core import NOTES_APPID
 from utils import urlopen as _urlopen
 
+_SCAN_WORKERS = 8  # 账号/路径扫描的并行线程数上限（主要是等待磁盘 I/O）
+_STEAM_ID64_BASE = 76561197960265728
+# IStoreService/GetAppList 分页：单页重试次数、退避基数（秒）、页数上限、断点有效期（秒）
+_APP_LIST_RETRIES = 4
+_APP_LIST_BACKOFF = 2.0
+_APP_LIST_MAX_PAGES = 100
+_APP_LIST_CHECKPOINT_MAX_AGE = 7 * 86400
+
+
+def to_steam_id64(steam_id: str) -> str:
+    """32 位好友代码（AccountID）转 64 位 Steam ID；已是 64 位或非数字时原样返回"""
+    sid = str(steam_id).strip()
+    if sid.isdigit() and int(sid) < _STEAM_ID64_BASE:
+        return str(int(sid) + _STEAM_ID64_BASE)
+    return sid
+
+
+class OwnedGamesSnapshot:
+    """某账号一次 GetOwnedGames 结果的快照，附带相对上一份不同快照的增减"""
+
+    __slots__ = ('steam_id', 'fetched_at', 'app_ids', 'names',
+                 'delta_base_at', 'delta_at', 'added', 'removed')
+
+    def __init__(self, steam_id, fetched_at, app_ids, names=None,
+                 delta_base_at=0.0, delta_at=0.0, added=(), removed=()):
+        self.steam_id = steam_id
+        self.fetched_at = fetched_at          # 本快照获取时间
+        self.app_ids = array('I', sorted(app_ids))
+        self.names = names                    # 与 app_ids 平行的名称列表，未知为 None
+        self.delta_base_at = delta_base_at    # 增减所对比的旧快照获取时间（0 = 无旧快照）
+        self.delta_at = delta_at              # 检测到增减的时间
+        self.added = array('I', sorted(added))      # 新入库
+        self.removed = array('I', sorted(removed))  # 许可被移除（退款、家庭组成员离开等）
+
+    def id_set(self) -> set:
+        return set(self.app_ids)
+
+    def games(self) -> list:
+        """[{'app_id': str, 'name': str}]，按名称排序；无名称时为 None"""
+        if self.names is None:
+            return None
+        games = [{'app_id': str(a), 'name': n} for a, n in zip(self.app_ids, self.names)]
+        games.sort(key=lambda g: g['name'].lower())
+        return games
+
+
+# 快照文件：头部 + 三段 uint32 小端数组（app_ids / added / removed）+ 名称（UTF-8，\0 分隔）
+_SNAPSHOT_MAGIC = b"OGS1"
+_SNAPSHOT_HEADER = struct.Struct("<4sdddIIII")
+
+
+def _le_bytes(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array('I', arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _le_array(data: bytes) -> array:
+    arr = array('I')
+    arr.frombytes(data)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+class OwnedGamesCache:
+    """各 Steam 账号已拥有游戏的快照存储：每个账号一个紧凑二进制文件 <steam_id64>.snap
+
+    每次写入新快照时与旧快照比较，记录新入库/被移除的游戏；内容未变化时只更新获取时间，
+    保留最近一次变化的增减。超过 ttl 秒的快照在 get() 中视为过期。
+    线程安全，可在并行扫描的工作线程中直接读写。
+    """
+
+    DEFAULT_TTL = 6 * 3600
+
+    def __init__(self, directory: str, ttl: float = DEFAULT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshots = {}  # {steam_id64: OwnedGamesSnapshot 或 None(无快照)}
+        self._migrate_legacy_json()
+
+    def _path(self, sid64: str) -> str:
+        return os.path.join(self.directory, f"{sid64}.snap")
+
+    def _migrate_legacy_json(self):
+        """旧版 owned_games.json（{steam_id64: {fetched_at, app_ids}}）转为快照文件"""
+        legacy = self.directory.rstrip("/\\") + ".json"
+        if not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for sid64, entry in data.items():
+                self._write(OwnedGamesSnapshot(
+                    sid64, entry.get('fetched_at', 0), entry.get('app_ids', [])))
+            os.remove(legacy)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[游戏库快照] 迁移旧缓存失败: {e}")
+
+    def _read(self, sid64: str):
+        try:
+            with open(self._path(sid64), 'rb') as f:
+                raw = f.read()
+            (magic, fetched_at, delta_base_at, delta_at,
+             n_ids, n_added, n_removed, names_len) = _SNAPSHOT_HEADER.unpack_from(raw, 0)
+            if magic != _SNAPSHOT_MAGIC:
+                return None
+            pos = _SNAPSHOT_HEADER.size
+            if pos + 4 * (n_ids + n_added + n_removed) + names_len > len(raw):
+                return None  # 文件被截断（写入中断等），视为无快照
+            arrays = []
+            for n in (n_ids, n_added, n_removed):
+                arrays.append(_le_array(raw[pos:pos + 4 * n]))
+                pos += 4 * n
+            names = None
+            if names_len:
+                names = raw[pos:pos + names_len].decode('utf-8', 'replace').split("\0")
+                if len(names) != n_ids:
+                    names = None
+        except (OSError, struct.error, ValueError):
+            return None
+        snap = OwnedGamesSnapshot(sid64, fetched_at, (), names, delta_base_at, delta_at)
+        snap.app_ids, snap.added, snap.removed = arrays
+        return snap
+
+    def _write(self, snap: OwnedGamesSnapshot):
+        names_blob = ("\0".join(snap.names).encode('utf-8')
+                      if snap.names is not None else b"")
+        header = _SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC, snap.fetched_at, snap.delta_base_at, snap.delta_at,
+            len(snap.app_ids), len(snap.added), len(snap.removed), len(names_blob))
+        path = self._path(snap.steam_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                for arr in (snap.app_ids, snap.added, snap.removed):
+                    f.write(_le_bytes(arr))
+                f.write(names_blob)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[游戏库快照] 保存失败: {e}")
+
+    def load(self, steam_id: str):
+        """读取账号的最新快照（不论是否过期），无快照返回 None"""
+        sid64 = to_steam_id64(steam_id)
+        with self._lock:
+            if sid64 not in self._snapshots:
+                self._snapshots[sid64] = self._read(sid64)
+            return self._snapshots[sid64]
+
+    def get(self, steam_id: str, max_age: float = None):
+        """返回未过期快照的 app_id 集合（int），无快照或已过期返回 None"""
+        max_age = self.ttl if max_age is None else max_age
+        snap = self.load(steam_id)
+        if snap is None or time.time() - snap.fetched_at > max_age:
+            return None
+        return snap.id_set()
+
+    def fetched_at(self, steam_id: str) -> float:
+        """上次成功获取的时间戳，从未获取返回 0"""
+        snap = self.load(steam_id)
+        return snap.fetched_at if snap else 0
+
+    def put(self, steam_id: str, app_ids, names: dict = None) -> OwnedGamesSnapshot:
+        """写入新快照并立即落盘，返回新快照
+
+        names: 可选 {app_id: 名称}（主用户需要，以便下次启动直接从快照载入游戏列表）
+        """
+        sid64 = to_steam_id64(steam_id)
+        ids = sorted({int(a) for a in app_ids})
+        name_list = None
+        if names is not None:
+            name_list = [names.get(str(a)) or f"AppID {a}" for a in ids]
+        old = self.load(sid64)
+        now = time.time()
+        if old is None:
+            snap = OwnedGamesSnapshot(sid64, now, ids, name_list)
+        else:
+            old_ids = old.id_set()
+            new_ids = set(ids)
+            if new_ids == old_ids:
+                # 无变化：保留最近一次变化的增减
+                snap = OwnedGamesSnapshot(sid64, now, ids, name_list or old.names,
+                                          old.delta_base_at, old.delta_at,
+                                          old.added, old.removed)
+            else:
+                snap = OwnedGamesSnapshot(sid64, now, ids, name_list,
+                                          old.fetched_at, now,
+                                          new_ids - old_ids, old_ids - new_ids)
+        with self._lock:
+            self._snapshots[sid64] = snap
+        self._write(snap)
+        return snap
+
+    def recent_additions(self, steam_ids) -> set:
+        """这些账号最近一次变化中新入库的 app_id 并集（int）"""
+        added = set()
+        for sid in steam_ids:
+            snap = self.load(sid)
+            if snap is not None:
+                added.update(snap.added)
+        return added
+
+    def clear(self):
+        with self._lock:
+            self._snapshots = {}
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if name.endswith(".snap"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def __len__(self):
+        try:
+            return sum(1 for n in os.listdir(self.directory) if n.endswith(".snap"))
+        except OSError:
+            return 0
+
 
 class SteamAccountScanner:
     """Steam 账号扫描器：自动发现系统中所有 Steam 账号及笔记路径"""
 
     @staticmethod
-    def get_steam_paths():
-        """获取所有可能的 Steam 安装路径"""
+    def get_steam_paths(check_exists: bool = True):
+        """获取所有可能的 Steam 安装路径
+
+        check_exists=False 时返回全部候选路径、不逐个检查是否存在
+        （WSL 下 /mnt/* 每次 stat 都很慢，由 scan_accounts 并行探测）
+        """
         system = platform.system()
         paths = []
 
@@ -79,6 +317,8 @@ class SteamAccountScanner:
                         f"/mnt/{drive}/Steam",
                     ])
 
+        if not check_exists:
+            return paths
         return [p for p in paths if os.path.exists(p)]
 
     @staticmethod
@@ -87,63 +327,105 @@ class SteamAccountScanner:
         localconfig_path = os.path.join(userdata_path, "config", "localconfig.vdf")
         if os.path.exists(localconfig_path):
             try:
-                with open(localconfig_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                match = re.search(r'"PersonaName"\s+"([^"]+)"', content)
-                if match:
-                    return match.group(1)
-            except:
+                # localconfig.vdf 可达数 MB，找到 PersonaName 即停止读取
+                found = vdf_parser.find_values(localconfig_path, ["PersonaName"])
+                if found.get("PersonaName"):
+                    return found["PersonaName"]
+            except OSError:
                 pass
         return f"Steam 用户 {friend_code}"
 
     @staticmethod
-    def scan_accounts():
-        """扫描所有 Steam 账号及其笔记目录"""
+    def count_notes(notes_dir: str) -> int:
+        """统计笔记目录下 notes_* 文件数（scandir 自带文件类型，无需逐个 stat）"""
+        try:
+            with os.scandir(notes_dir) as it:
+                return sum(1 for e in it
+                           if e.name.startswith("notes_") and e.is_file())
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _scan_userdata(steam_path: str) -> list:
+        """列出单个 Steam 路径下的账号（不读取昵称与笔记数）"""
+        userdata_path = os.path.join(steam_path, "userdata")
         accounts = []
-        seen_ids = set()
-        steam_paths = SteamAccountScanner.get_steam_paths()
+        try:
+            with os.scandir(userdata_path) as it:
+                entries = [e for e in it if e.name.isdigit() and e.is_dir()]
+        except OSError:
+            return accounts
+        for entry in sorted(entries, key=lambda e: e.name):
+            friend_code = entry.name
+            accounts.append({
+                'friend_code': friend_code,
+                'userdata_path': entry.path,
+                'notes_dir': os.path.join(entry.path, NOTES_APPID, "remote"),
+                'persona_name': f"Steam 用户 {friend_code}",
+                'steam_path': steam_path,
+                'notes_count': None,  # None = 尚未统计
+            })
+        return accounts
 
-        for steam_path in steam_paths:
-            userdata_path = os.path.join(steam_path, "userdata")
-            if not os.path.exists(userdata_path):
-                continue
+    @staticmethod
+    def load_account_details(account: dict) -> dict:
+        """读取账号昵称与笔记数量，原地填入 account 并返回"""
+        account['persona_name'] = SteamAccountScanner._get_persona_name(
+            account['userdata_path'], account['friend_code'])
+        account['notes_count'] = SteamAccountScanner.count_notes(account['notes_dir'])
+        return account
 
-            try:
-                for entry in os.listdir(userdata_path):
-                    entry_path = os.path.join(userdata_path, entry)
-                    if not os.path.isdir(entry_path) or not entry.isdigit():
-                        continue
+    @staticmethod
+    def load_details_async(accounts: list, on_detail=None, on_done=None):
+        """后台并行读取各账号的昵称与笔记数量
 
-                    friend_code = entry
-                    if friend_code in seen_ids:
-                        continue
-                    seen_ids.add(friend_code)
-
-                    notes_dir = os.path.join(entry_path, NOTES_APPID, "remote")
-                    persona_name = SteamAccountScanner._get_persona_name(
-                        entry_path, friend_code
-                    )
-
-                    # 计算已有笔记数量
-                    notes_count = 0
-                    if os.path.exists(notes_dir):
-                        notes_count = len([
-                            f for f in os.listdir(notes_dir)
-                            if f.startswith("notes_") and os.path.isfile(
-                                os.path.join(notes_dir, f))
-                        ])
-
-                    accounts.append({
-                        'friend_code': friend_code,
-                        'userdata_path': entry_path,
-                        'notes_dir': notes_dir,
-                        'persona_name': persona_name,
-                        'steam_path': steam_path,
-                        'notes_count': notes_count,
-                    })
-            except PermissionError:
-                continue
+        on_detail(account) 每个账号读取完成后调用，on_done() 全部完成后调用；
+        两者均在工作线程中执行，UI 调用方需自行切回主线程。
+        """
+        def _load(acc):
+            SteamAccountScanner.load_account_details(acc)
+            if on_detail:
+                on_detail(acc)
+
+        def _run():
+            if accounts:
+                with ThreadPoolExecutor(max_workers=min(_SCAN_WORKERS, len(accounts))) as pool:
+                    for future in [pool.submit(_load, acc) for acc in accounts]:
+                        try:
+                            future.result()
+                        except Exception as e:
+                            print(f"[账号扫描] 读取账号信息失败: {e}")
+            if on_done:
+                on_done()
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    @staticmethod
+    def scan_accounts(steam_paths: list = None, with_details: bool = True):
+        """扫描所有 Steam 账号及其笔记目录
+
+        各 Steam 路径并行扫描，结果按路径顺序合并（同一账号以先出现的路径为准）。
+        with_details=False 时只列出账号，persona_name 为占位名、notes_count 为 None，
+        由调用方稍后通过 load_account_details / load_details_async 补全。
+        """
+        if steam_paths is None:
+            steam_paths = SteamAccountScanner.get_steam_paths(check_exists=False)
+        if not steam_paths:
+            return []
+        with ThreadPoolExecutor(max_workers=min(_SCAN_WORKERS, len(steam_paths))) as pool:
+            per_path = list(pool.map(SteamAccountScanner._scan_userdata, steam_paths))
 
+        accounts = []
+        seen_ids = set()
+        for path_accounts in per_path:
+            for acc in path_accounts:
+                if acc['friend_code'] not in seen_ids:
+                    seen_ids.add(acc['friend_code'])
+                    accounts.append(acc)
+
+        if with_details and accounts:
+            with ThreadPoolExecutor(max_workers=min(_SCAN_WORKERS, len(accounts))) as pool:
+                list(pool.map(SteamAccountScanner.load_account_details, accounts))
         return accounts
 
     @staticmethod
@@ -170,11 +452,17 @@ class SteamAccountScanner:
             lf_path = os.path.join(sa_dir, "libraryfolders.vdf")
             if os.path.exists(lf_path):
                 try:
-                    with open(lf_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    # 匹配 "path" "..." 条目
-                    for m in re.finditer(r'"path"\s+"([^"]+)"', content):
-                        extra_path = m.group(1).replace("\\\\", "\\")
+                    root = vdf_parser.load(lf_path)
+                    folders = next((v for k, v in root.items()
+                                    if k.lower() == "libraryfolders" and isinstance(v, dict)), {})
+                    for key, folder in folders.items():
+                        # 新格式："0" { "path" "..." }；旧格式："1" "D:\\Games"
+                        if isinstance(folder, dict):
+                            extra_path = folder.get("path")
+                        else:
+                            extra_path = folder if key.isdigit() else None
+                        if not extra_path:
+                            continue
                         extra_sa = os.path.join(extra_path, "steamapps")
                         if os.path.isdir(extra_sa) and extra_sa not in steamapps_dirs:
                             steamapps_dirs.append(extra_sa)
@@ -189,13 +477,12 @@ class SteamAccountScanner:
                         continue
                     fpath = os.path.join(sa_dir, fname)
                     try:
-                        with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                        aid_m = re.search(r'"appid"\s+"(\d+)"', content)
-                        name_m = re.search(r'"name"\s+"([^"]+)"', content)
-                        if aid_m:
-                            aid = aid_m.group(1)
-                            name = name_m.group(1) if name_m else f"AppID {aid}"
+                        # appid/name 位于文件开头，读到即停止
+                        found = vdf_parser.find_values(
+                            fpath, ["appid", "name"], path=("AppState",))
+                        aid = found.get("appid", "")
+                        if aid.isdigit():
+                            name = found.get("name") or f"AppID {aid}"
                             # 过滤掉 Steam 自身和一些工具类 AppID
                             if aid not in games and aid not in (
                                 "228980",  # Steamworks Common Redistributables
@@ -307,43 +594,111 @@ class SteamAccountScanner:
 
         return result, "\n".join(debug_lines)
 
+    @staticmethod
+    def scan_family_online(steam_id: str, family_codes: list, api_key: str,
+                           cache: OwnedGamesCache = None, max_age: float = None,
+                           progress_callback=None) -> dict:
+        """并行获取主用户与全部家庭组成员的游戏库，总耗时约等于最慢的单个请求
+
+        主用户始终在线获取（需要游戏名称）；成员只需 app_id，缓存未过期时直接使用
+        cache 中的结果，max_age=0 表示全部重新获取。成功获取的结果（含主用户及其
+        游戏名称）都会作为新快照写入 cache。
+        progress_callback(done, total, code, count) 每个账号完成时调用，count 为
+        游戏数（失败为 None）；回调在调用本函数的线程中依次执行，不会并发。
+
+        Returns: {
+            'games': 主用户游戏列表, 'debug': 主用户调试信息,
+            'members': {好友代码: int 集合}（失败的成员不在其中）,
+            'failed': [失败的好友代码], 'from_cache': [命中缓存的好友代码],
+            'names': 本次在线获取到的成员游戏名称 {app_id 字符串: 名称},
+            'union': 主用户与成员 app_id 并集（int）,
+            'intersection': 成员 app_id 交集（int，不含主用户）,
+        }
+        """
+        members = {}
+        names = {}
+        failed = []
+        from_cache = []
+        total = 1 + len(family_codes)
+        done = [0]
+        progress_lock = threading.Lock()
+
+        def _report(code, count):
+            with progress_lock:
+                done[0] += 1
+                if progress_callback:
+                    try:
+                        progress_callback(done[0], total, code, count)
+                    except Exception as e:
+                        print(f"[家庭组] 进度回调异常: {e}")
+
+        to_fetch = []
+        for code in family_codes:
+            cached = cache.get(code, max_age) if cache is not None else None
+            if cached is not None:
+                members[code] = cached
+                from_cache.append(code)
+            else:
+                to_fetch.append(code)
+
+        def _fetch_member(code):
+            games, _ = SteamAccountScanner.scan_library_online(code, api_key)
+            return code, games
+
+        with ThreadPoolExecutor(max_workers=min(_SCAN_WORKERS, 1 + len(to_fetch))) as pool:
+            main_future = pool.submit(SteamAccountScanner.scan_library_online,
+                                      steam_id, api_key)
+            futures = [pool.submit(_fetch_member, code) for code in to_fetch]
+            # 命中缓存的成员立即计入进度
+            for code in from_cache:
+                _report(code, len(members[code]))
+            for future in as_completed(futures + [main_future]):
+                if future is main_future:
+                    main_games, main_debug = future.result()
+                    if main_games and cache is not None:
+                        cache.put(steam_id, [g['app_id'] for g in main_games],
+                                  names={g['app_id']: g['name'] for g in main_games})
+                    _report(steam_id, len(main_games))
+                    continue
+                code, games = future.result()
+                # scan_library_online 从不抛异常，空结果即视为失败（资料未公开、网络错误等）
+                if games:
+                    members[code] = {int(g['app_id']) for g in games}
+                    for g in games:
+                        names.setdefault(g['app_id'], g['name'])
+                    if cache is not None:
+                        cache.put(code, members[code])
+                    _report(code, len(games))
+                else:
+                    failed.append(code)
+                    _report(code, None)
+
+        member_sets = [members[c] for c in family_codes if c in members]
+        union = {int(g['app_id']) for g in main_games}.union(*member_sets)
+        intersection = set.intersection(*member_sets) if member_sets else set()
+        return {
+            'games': main_games, 'debug': main_debug,
+            'members': members, 'failed': failed, 'from_cache': from_cache,
+            'names': names,
+            'union': union, 'intersection': intersection,
+        }
+
+    @staticmethod
+    def get_collections_path(userdata_path: str) -> str:
+        """收藏夹数据文件 cloud-storage-namespace-1.json 的路径"""
+        return os.path.join(userdata_path, "config", "cloudstorage",
+                            "cloud-storage-namespace-1.json")
+
     @staticmethod
     def get_collections(userdata_path: str) -> list:
         """从 cloud-storage-namespace-1.json 获取用户的 Steam 收藏夹列表
 
-        Returns: [{'name': str, 'app_ids': [int, ...], 'is_dynamic': bool}, ...]
+        结果按文件 mtime 缓存（见 steam_collections.CollectionsReader），文件未变化时不重新解析。
+        Returns: [{'id': str, 'name': str, 'app_ids': [int, ...], 'is_dynamic': bool,
+                   'filter_spec': dict|None, ...}, ...]（缓存对象，不要修改）
         """
-        json_path = os.path.join(userdata_path, "config", "cloudstorage",
-                                 "cloud-storage-namespace-1.json")
-        if not os.path.exists(json_path):
-            return []
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except Exception:
-            return []
-
-        collections = []
-        for entry in data:
-            key = entry[0] if isinstance(entry, list) else ""
-            meta = entry[1] if isinstance(entry, list) and len(entry) > 1 else {}
-            if not key.startswith("user-collections."):
-                continue
-            if meta.get("is_deleted") is True or "value" not in meta:
-                continue
-            try:
-                val_obj = json.loads(meta['value'])
-                is_dynamic = "filterSpec" in val_obj
-                app_ids = [int(x) for x in val_obj.get("added", []) if str(x).isdigit()]
-                collections.append({
-                    "name": val_obj.get("name", "未命名"),
-                    "app_ids": app_ids,
-                    "is_dynamic": is_dynamic,
-                })
-            except Exception:
-                continue
-        collections.sort(key=lambda c: c['name'].lower())
-        return collections
+        return steam_collections.get_reader(
+            SteamAccountScanner.get_collections_path(userdata_path)).collections()
 
     @staticmethod
     def check_free_apps(app_ids: list, cache: dict = None) -> set:
@@ -381,50 +736,120 @@ class SteamAccountScanner:
                 cache[aid] = False  # 失败时保守地认为不是免费
         return free_ids
 
+    @staticmethod
+    def _load_app_list_checkpoint(path: str, if_modified_since: int):
+        """读取 GetAppList 分页断点，与本次请求参数不符或已过期时返回 None"""
+        if not path:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cp = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(cp, dict)
+                or cp.get('if_modified_since', 0) != if_modified_since
+                or time.time() - cp.get('updated_at', 0) > _APP_LIST_CHECKPOINT_MAX_AGE):
+            return None
+        return cp
+
+    @staticmethod
+    def _save_app_list_checkpoint(path: str, checkpoint: dict):
+        if not path:
+            return
+        checkpoint['updated_at'] = time.time()
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[游戏名称] 保存分页断点失败: {e}")
+
+    @staticmethod
+    def _fetch_app_list_page(url: str) -> dict:
+        """请求一页 GetAppList，失败按指数退避重试；4xx（429 除外）不重试"""
+        for attempt in range(_APP_LIST_RETRIES):
+            req = urllib.request.Request(url, headers={
+                "User-Agent": "SteamNotesGen/5.6"
+            })
+            try:
+                with _urlopen(req, timeout=60) as resp:
+                    return json.loads(resp.read().decode("utf-8"))
+            except Exception as e:
+                code = getattr(e, 'code', None)
+                if (code is not None and 400 <= code < 500 and code != 429) \
+                        or attempt == _APP_LIST_RETRIES - 1:
+                    raise
+                delay = min(_APP_LIST_BACKOFF * (2 ** attempt), 30)
+                print(f"[游戏名称] 第 {attempt + 1} 次请求失败: {e}，{delay:.0f} 秒后重试")
+                time.sleep(delay)
+
     @staticmethod
     def fetch_all_steam_app_names(api_key: str = "", progress_callback=None,
-                                   estimated_total: int = 0) -> dict:
+                                   estimated_total: int = 0, checkpoint_path: str = "",
+                                   if_modified_since: int = 0, info: dict = None) -> dict:
         """获取 Steam 全量应用名称列表
 
         优先使用 IStoreService/GetAppList/v1/（需要 API Key，分页请求），
         失败时回退到已弃用的 ISteamApps/GetAppList/v2/（无需 Key）。
 
+        IStoreService 分页以 last_appid 为游标，只能逐页顺序请求：每页失败单独重试（指数退避），
+        提供 checkpoint_path 时每页完成后把游标与已获取结果写入断点文件，
+        中断后再次调用（参数相同）从断点继续，全部完成后删除断点文件。
+
         Args:
             api_key: Steam Web API Key（可选，但强烈推荐提供）
             progress_callback: 可选回调函数
                 (fetched_count, page, is_done, estimated_total) -> None
             estimated_total: 估计总数（用于进度条，0=未知）
+            checkpoint_path: 分页断点文件路径（空=不保存断点）
+            if_modified_since: Unix 时间戳；非 0 时只获取此后有变化的应用（增量更新），
+                               返回结果只含变化部分，由调用方合并
+            info: 可选 dict，返回时填入 {'started_at': 本次（含断点前）开始获取的时间,
+                  'incremental': 是否为 IStoreService 增量结果}；
+                  下次增量更新应以 started_at 作为 if_modified_since
 
         Returns:
             {app_id_str: name_str, ...} 字典，失败时返回空字典。
         """
+        if info is None:
+            info = {}
+        info['started_at'] = int(time.time())
+        info['incremental'] = False
         # ── 方案 A: IStoreService/GetAppList/v1/（推荐，需要 API Key）──
         if api_key:
-            try:
+            cp = SteamAccountScanner._load_app_list_checkpoint(
+                checkpoint_path, if_modified_since)
+            if cp is not None:
+                result = cp.get('names', {})
+                last_appid = cp.get('last_appid', 0)
+                page = cp.get('page', 0)
+                info['started_at'] = cp.get('started_at', info['started_at'])
+                print(f"[游戏名称] 从断点继续: 已有 {len(result)} 条，last_appid={last_appid}")
+            else:
                 result = {}
                 last_appid = 0
-                max_results = 50000
                 page = 0
+            try:
+                max_results = 50000
                 while True:
                     page += 1
                     url = (f"https://api.steampowered.com/IStoreService/GetAppList/v1/"
                            f"?key={api_key}&max_results={max_results}"
                            f"&last_appid={last_appid}&include_games=1"
                            f"&include_dlc=0&include_software=1&include_videos=0&include_hardware=0")
-                    req = urllib.request.Request(url, headers={
-                        "User-Agent": "SteamNotesGen/5.6"
-                    })
-                    with _urlopen(req, timeout=60) as resp:
-                        data = json.loads(resp.read().decode("utf-8"))
+                    if if_modified_since:
+                        url += f"&if_modified_since={int(if_modified_since)}"
+                    data = SteamAccountScanner._fetch_app_list_page(url)
                     apps = data.get("response", {}).get("apps", [])
-                    if not apps:
-                        break
                     for app in apps:
                         aid = str(app.get("appid", ""))
                         name = app.get("name", "")
                         if aid and name:
                             result[aid] = name
-                    has_more = data.get("response", {}).get("have_more_results", False)
+                    has_more = bool(apps) and data.get("response", {}).get(
+                        "have_more_results", False)
                     # 动态更新估计总数：如果还有更多页，按当前均值估算
                     if has_more and estimated_total < len(result):
                         avg_per_page = len(result) / page
@@ -439,14 +864,27 @@ class SteamAccountScanner:
                                               estimated_total)
                         except Exception:
                             pass
-                    # 检查是否还有更多（have_more_results 字段）
                     if not has_more:
                         break
-                    last_appid = apps[-1].get("appid", 0)
-                    if page > 10:  # 安全上限，避免无限循环
+                    last_appid = data["response"].get("last_appid") or apps[-1].get("appid", 0)
+                    SteamAccountScanner._save_app_list_checkpoint(checkpoint_path, {
+                        'if_modified_since': if_modified_since,
+                        'started_at': info['started_at'],
+                        'last_appid': last_appid,
+                        'page': page,
+                        'names': result,
+                    })
+                    if page >= _APP_LIST_MAX_PAGES:  # 安全上限，避免无限循环
                         break
-                if result:
-                    print(f"[游戏名称] IStoreService 获取成功: {len(result)} 条 ({page} 页)")
+                if checkpoint_path:
+                    try:
+                        os.remove(checkpoint_path)
+                    except OSError:
+                        pass
+                if result or if_modified_since:
+                    info['incremental'] = bool(if_modified_since)
+                    print(f"[游戏名称] IStoreService 获取成功: {len(result)} 条 ({page} 页"
+                          f"{'，增量' if if_modified_since else ''})")
                     return result
             except Exception as e:
                 print(f"[游戏名称] IStoreService 获取失败: {e}，尝试回退方案...")
@@ -0,0 +1,250 @@
+"""Steam BBCode 解析 — 单遍词法扫描 + 嵌套语法树
+
+tokenize()：一个预编译正则在整个字符串上 finditer，依次产出文本 / 开标签 / 闭标签，
+不对剩余部分切片复制，整体为线性时间。
+parse()：基于栈一次构建语法树：
+  同名标签可以嵌套（[list] 套 [list]、[b] 套 [b]），闭合标签与栈中最近的同名标签配对；
+  未闭合的标签在外层标签闭合或文本结束时自动闭合，孤立的闭合标签丢弃；
+  [hr] 没有闭合标签；[*] 开始一个新列表项（同时结束上一项），[/*] 可省略，列表外的 [*] 丢弃；
+  [code] 内部不解析标签，原样保留到 [/code]。
+不在 TAGS 中的 [xxx] 按普通文本处理。
+serialize() 把语法树还原为 BBCode；strip_tags() 去除全部标签（含未知标签）得到纯文本；
+wrap_paragraphs() 把顶层的纯文本段落包裹为 [p]...[/p]。
+
+纯数据层模块，无 UI 依赖。
+"""
+
+import re
+
+# Steam 笔记支持的标签
+TAGS = frozenset(('p', 'h1', 'h2', 'h3', 'b', 'i', 'u', 'strike',
+                  'list', 'olist', 'hr', 'code', 'url', '*'))
+BLOCK_TAGS = frozenset(('p', 'h1', 'h2', 'h3', 'list', 'olist', 'hr', 'code'))
+INLINE_TAGS = frozenset(('b', 'i', 'u', 'strike', 'url'))
+LIST_TAGS = frozenset(('list', 'olist'))
+
+# 开/闭标签：[/?名称(=属性)?]，名称字符集与旧版 strip 正则一致
+_TAG_RE = re.compile(r'\[(/?)([a-z0-9*]+)(?:=([^\]]*))?\]')
+
+# 词法单元类型
+TEXT = "text"    # (TEXT, 文本, None, start, end)
+OPEN = "open"    # (OPEN, 标签名, 属性或 None, start, end)
+CLOSE = "close"  # (CLOSE, 标签名, None, start, end)
+
+
+def tokenize(text: str, tags=TAGS):
+    """单遍扫描 BBCode，产出 (类型, 值, 属性, start, end)
+
+    tags: 识别为标签的名称集合，其余 [xxx] 并入相邻文本；None 表示识别所有形如标签的片段
+    """
+    pos = 0
+    for m in _TAG_RE.finditer(text):
+        name = m.group(2)
+        if tags is not None and name not in tags:
+            continue
+        start = m.start()
+        if start > pos:
+            yield TEXT, text[pos:start], None, pos, start
+        if m.group(1):
+            yield CLOSE, name, None, start, m.end()
+        else:
+            yield OPEN, name, m.group(3), start, m.end()
+        pos = m.end()
+    if pos < len(text):
+        yield TEXT, text[pos:], None, pos, len(text)
+
+
+class Node:
+    """语法树节点；children 中的元素为 str（文本）或 Node
+
+    根节点 tag 为 None。start/end 为节点在源文本中的范围（含开闭标签），
+    自动闭合的节点 end 为闭合它的位置。
+    """
+
+    __slots__ = ('tag', 'attr', 'children', 'start', 'end')
+
+    def __init__(self, tag, attr=None, start=0, end=0, children=None):
+        self.tag = tag
+        self.attr = attr
+        self.children = children if children is not None else []
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Node({self.tag!r}, {self.attr!r}, {self.children!r})"
+
+    def plain_text(self) -> str:
+        """子树中的全部文本（不含标签）"""
+        out = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                out.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return ''.join(out)
+
+
+def parse(text: str) -> Node:
+    """将 BBCode 解析为语法树，返回根节点"""
+    root = Node(None, None, 0, len(text))
+    stack = [root]
+    tokens = tokenize(text)
+    for kind, value, attr, start, end in tokens:
+        if kind == TEXT:
+            stack[-1].children.append(value)
+            continue
+        if kind == CLOSE:
+            if value == 'hr':
+                continue
+            for depth in range(len(stack) - 1, 0, -1):
+                tag = stack[depth].tag
+                if tag == value:
+                    break
+                if value == '*' and tag in LIST_TAGS:
+                    depth = 0  # [/*] 不跨越列表边界
+                    break
+            else:
+                continue  # 孤立闭合标签
+            if depth == 0:
+                continue
+            for node in stack[depth + 1:]:
+                node.end = start
+            stack[depth].end = end
+            del stack[depth:]
+            continue
+        # OPEN
+        if value == 'hr':
+            stack[-1].children.append(Node('hr', attr, start, end))
+            continue
+        if value == '*':
+            for depth in range(len(stack) - 1, 0, -1):
+                if stack[depth].tag in LIST_TAGS:
+                    break
+            else:
+                continue  # 列表外的 [*]
+            for node in stack[depth + 1:]:
+                node.end = start
+            del stack[depth + 1:]
+        node = Node(value, attr, start)
+        stack[-1].children.append(node)
+        if value == 'code':
+            # 代码块内容原样保留，直接跳到 [/code]
+            for kind2, value2, _, start2, end2 in tokens:
+                if kind2 == CLOSE and value2 == 'code':
+                    if start2 > end:
+                        node.children.append(text[end:start2])
+                    node.end = end2
+                    break
+            else:
+                if len(text) > end:
+                    node.children.append(text[end:])
+                node.end = len(text)
+            continue
+        stack.append(node)
+    for node in stack[1:]:
+        node.end = len(text)
+    return root
+
+
+def unquote_attr(attr: str) -> str:
+    """去除属性值两端的空白与引号 "..." / '...'"""
+    return attr.strip().strip('"').strip("'") if attr else ''
+
+
+def url_target(node: Node) -> str:
+    """[url=目标]显示文本[/url] 的目标；无属性时为显示文本本身"""
+    return unquote_attr(node.attr) or node.plain_text().strip()
+
+
+def list_items(node: Node) -> list:
+    """列表节点的各项内容（每项为 children 列表，首尾空白已去除，空项忽略）
+
+    第一个 [*] 之前的非空内容同样算作一项，与旧版按 [*] 分割的行为一致。
+    """
+    items = []
+    loose = []
+    for child in node.children:
+        if isinstance(child, Node) and child.tag == '*':
+            items.append(loose)
+            loose = []
+            items.append(child.children)
+        else:
+            loose.append(child)
+    items.append(loose)
+    result = []
+    for children in items:
+        children = list(children)
+        if children and isinstance(children[0], str):
+            children[0] = children[0].lstrip()
+        if children and isinstance(children[-1], str):
+            children[-1] = children[-1].rstrip()
+        children = [c for c in children if not isinstance(c, str) or c]
+        if children and (any(isinstance(c, Node) for c in children) or ''.join(children)):
+            result.append(children)
+    return result
+
+
+def _serialize_into(node, out: list):
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            continue
+        if item.tag is None:
+            stack.extend(reversed(item.children))
+            continue
+        out.append(f'[{item.tag}={item.attr}]' if item.attr is not None else f'[{item.tag}]')
+        if item.tag == 'hr':
+            continue
+        if item.tag != '*':  # 列表项不写 [/*]，与编辑器一贯的输出一致
+            stack.append(f'[/{item.tag}]')
+        stack.extend(reversed(item.children))
+
+
+def serialize(node) -> str:
+    """语法树（或节点列表）→ BBCode 文本"""
+    out = []
+    if isinstance(node, list):
+        for child in node:
+            _serialize_into(child, out)
+    else:
+        _serialize_into(node, out)
+    return ''.join(out)
+
+
+def strip_tags(text: str) -> str:
+    """去除所有形如 BBCode 标签的片段（含未知标签），只保留文本"""
+    return _TAG_RE.sub('', text)
+
+
+def wrap_paragraphs(text: str) -> str:
+    """将顶层的纯文本按空行分段包裹为 [p]...[/p]，块级标签原样保留
+
+    整段内容本来就全部由块级标签构成时原样返回（去除首尾空白）。
+    """
+    stripped = text.strip()
+    root = parse(stripped)
+    parts = []  # (是否块级, start, end)
+    cursor = 0
+    for child in root.children:
+        if isinstance(child, Node) and child.tag in BLOCK_TAGS:
+            parts.append((False, cursor, child.start))
+            parts.append((True, child.start, child.end))
+            cursor = child.end
+    parts.append((False, cursor, len(stripped)))
+    has_block = len(parts) > 1
+    if has_block and not any(stripped[s:e].strip() for block, s, e in parts if not block):
+        return stripped
+    wrapped = []
+    for block, s, e in parts:
+        if block:
+            wrapped.append(stripped[s:e])
+            continue
+        for p in stripped[s:e].split('\n\n'):
+            p = p.strip()
+            if p:
+                wrapped.append(f'[p]{p}[/p]')
+    return ''.join(wrapped) if wrapped else f'[p]{stripped}[/p]'
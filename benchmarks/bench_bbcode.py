@@ -0,0 +1,137 @@
+"""BBCode 解析基准 — 对比旧版编辑器的切片式扫描与 bbcode_parser 的单遍解析
+
+用法：python benchmarks/bench_bbcode.py [目标 KB 数]
+生成接近真实结构的长笔记（段落 + 内联标签 + 链接 + 列表 + 代码块），
+另有一组标签全部位于顶层的未分段长文本（旧版扫描的最坏情况）。
+按 1/4、1/2、1、2 倍目标大小分别测量，观察耗时随长度的增长趋势。
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bbcode_parser  # noqa: E402
+
+_WORDS = ["开放世界", "roguelike", "剧情", "战斗系统", "像素风", "多人合作",
+          "难度曲线", "Steam Deck", "本地化", "成就", "DLC", "手感", "节奏"]
+
+
+def build_flat_note(target_kb: float, seed: int = 7) -> str:
+    """未分段的长文本（如粘贴的纯文本只加了少量粗体），标签都在顶层"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < target_kb * 1024:
+        word = rng.choice(_WORDS)
+        part = f"[b]{word}[/b]，" if rng.random() < 0.2 else word + "，"
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+    return "".join(parts)
+
+
+def build_note(target_kb: float, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < target_kb * 1024:
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 30))]
+        k = rng.randrange(len(words))
+        words[k] = f"[b]{words[k]}[/b]"
+        if rng.random() < 0.3:
+            words.append("[url=https://store.steampowered.com/app/10/]商店页[/url]")
+        block = f"[p]{'，'.join(words)}[/p]"
+        r = rng.random()
+        if r < 0.15:
+            block += "[h2]" + rng.choice(_WORDS) + "[/h2]"
+        elif r < 0.3:
+            block += "[list]" + "".join(f"[*]{rng.choice(_WORDS)}" for _ in range(4)) + "[/list]"
+        elif r < 0.35:
+            block += "[code]" + "\n".join(rng.choice(_WORDS) for _ in range(3)) + "[/code]"
+        parts.append(block)
+        size += len(block.encode("utf-8"))
+    return "".join(parts)
+
+
+_LEGACY_TAG_RE = r'\[(\/?)(h[123]|p|b|i|u|strike|list|olist|hr|code|url|\*)(?:=[^\]]*)?\]'
+
+
+def legacy_parse(text: str) -> list:
+    """旧版 SteamRichTextEditor._parse_bbcode 的扫描方式（每轮对 text[pos:] 切片重新搜索）"""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = re.search(_LEGACY_TAG_RE, text[pos:])
+        if not match:
+            if text[pos:].strip():
+                tokens.append(('text', text[pos:]))
+            break
+        before = text[pos:pos + match.start()]
+        if before.strip():
+            tokens.append(('text', before))
+        tag_name = match.group(2)
+        tag_end = pos + match.end()
+        if match.group(1) == '/' or tag_name in ('hr', '*'):
+            pos = tag_end
+            continue
+        close = f'[/{tag_name}]'
+        close_idx = text.find(close, tag_end)
+        if close_idx == -1:
+            close_idx = len(text)
+        inner = text[tag_end:close_idx]
+        tokens.append((tag_name, inner))
+        if tag_name in ('p', 'h1', 'h2', 'h3', 'b', 'i', 'u', 'strike'):
+            legacy_inline(inner)
+        pos = min(close_idx + len(close), len(text))
+    return tokens
+
+
+def legacy_inline(text: str):
+    """旧版 _insert_inline 的扫描方式（同样每轮切片，递归处理嵌套）"""
+    pos = 0
+    while pos < len(text):
+        match = re.search(r'\[(b|i|u|strike)\](.*?)\[/\1\]|\[url(?:=([^\]]*))?\](.*?)\[/url\]',
+                          text[pos:], re.DOTALL)
+        if not match:
+            break
+        if match.group(1):
+            legacy_inline(match.group(2))
+        pos += match.end()
+
+
+def legacy_strip(text: str) -> str:
+    return re.sub(r'\[/?[a-z0-9*]+(?:=[^\]]*)?\]', '', text)
+
+
+def timed(fn, arg, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(target_kb: float):
+    for kind, builder in (("分段笔记", build_note), ("顶层长文本", build_flat_note)):
+        for factor in (0.25, 0.5, 1, 2):
+            bench_one(kind, builder(target_kb * factor))
+
+
+def bench_one(kind: str, note: str):
+    kb = len(note.encode("utf-8")) / 1024
+    print(f"{kind} {kb:7.1f} KB（{len(note)} 字符）")
+    for label, fn in (("旧版切片扫描  ", legacy_parse),
+                      ("parse 语法树  ", bbcode_parser.parse),
+                      ("serialize     ", lambda t: bbcode_parser.serialize(bbcode_parser.parse(t))),
+                      ("正则 strip    ", legacy_strip),
+                      ("strip_tags    ", bbcode_parser.strip_tags)):
+        print(f"  {label} {timed(fn, note) * 1000:9.2f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,200 @@
+"""富文本编辑器渲染基准 — 对比逐段 insert + 全文 URL 重扫与批量渲染
+
+用法：python benchmarks/bench_editor_render.py [目标 KB 数] [--stub]
+默认需要图形界面（Tk 窗口在后台创建、不显示）。笔记由 bench_bbcode.build_note 生成，
+LegacyEditor 保留了改为批量渲染之前的逐节点 insert 与 _highlight_urls 实现。
+--stub：无图形界面时使用，Text widget 换成只记录调用的替身，
+统计每次渲染的 Tk 命令次数（每次都是一轮 Tcl 调用）与 Python 侧耗时，不含 Tk 自身的排版。
+"""
+
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bbcode_parser  # noqa: E402
+from bench_bbcode import build_note  # noqa: E402
+from rich_text_editor import SteamRichTextEditor  # noqa: E402
+
+
+class LegacyEditor(SteamRichTextEditor):
+    """批量渲染之前的实现"""
+
+    def _render_bbcode(self, bbcode: str):
+        """逐节点 insert，完成后重新读取全文做 URL 高亮"""
+        self._text.config(state=tk.NORMAL)
+        self._text.delete("1.0", tk.END)
+        # 重置 URL 映射
+        self._url_map.clear()
+        self._url_counter = 0
+
+        if not bbcode.strip():
+            return
+
+        # 解析为语法树，逐个顶层节点渲染
+        root = bbcode_parser.parse(bbcode)
+        for node in root.children:
+            self._insert_node(node)
+
+        # 渲染完成后高亮 URL
+        self._highlight_urls()
+
+    def _ensure_newline(self):
+        if self._text.get("end-2c", "end-1c") != "\n":
+            self._text.insert(tk.END, "\n")
+
+    def _insert_node(self, node):
+        """将一个顶层语法树节点插入到 Text widget"""
+        if isinstance(node, str):
+            if node.strip():
+                self._text.insert(tk.END, node, "paragraph")
+            return
+        t = node.tag
+        if t in ('h1', 'h2', 'h3'):
+            self._ensure_newline()
+            self._insert_inline(node.children, (t,))
+            self._text.insert(tk.END, "\n", t)
+        elif t == 'p':
+            # 段落内容可能含内联标签 [b] [i] [u] [strike] [url]
+            self._insert_inline(node.children, ("paragraph",))
+            self._text.insert(tk.END, "\n", "paragraph")
+        elif t in self._INLINE_VISUAL:
+            self._insert_inline(node.children, (self._INLINE_VISUAL[t],))
+        elif t == 'url':
+            self._insert_inline([node], ())
+        elif t == 'code':
+            self._ensure_newline()
+            self._text.insert(tk.END, node.plain_text() + "\n", "code")
+        elif t == 'hr':
+            self._ensure_newline()
+            self._text.insert(tk.END, "─" * 50 + "\n", "hr")
+        elif t in bbcode_parser.LIST_TAGS:
+            self._ensure_newline()
+            self._insert_list_node(node, 0)
+
+    def _insert_list_node(self, node, depth: int):
+        """渲染 [list] / [olist]，项内嵌套的列表缩进一层接在该项之后"""
+        tag = "bullet" if node.tag == 'list' else "olist"
+        for idx, item in enumerate(bbcode_parser.list_items(node)):
+            prefix = self._LIST_INDENT * depth + ("• " if node.tag == 'list' else f"{idx + 1}. ")
+            self._text.insert(tk.END, prefix, tag)
+            nested = [c for c in item if isinstance(c, bbcode_parser.Node)
+                      and c.tag in bbcode_parser.LIST_TAGS]
+            # 列表项内容可能含内联标签 [b][i][url] 及 [p] 包裹
+            self._insert_inline([c for c in item if not any(c is n for n in nested)], (tag,))
+            self._text.insert(tk.END, "\n", tag)
+            for sub in nested:
+                self._insert_list_node(sub, depth + 1)
+
+    def _insert_inline(self, children: list, tags: tuple):
+        """渲染段落/列表项内的内联内容，嵌套的 [b] [i] [u] [strike] 样式逐层叠加"""
+        for child in children:
+            if isinstance(child, str):
+                if child:
+                    self._text.insert(tk.END, child, tags)
+            elif child.tag == 'url':
+                target = bbcode_parser.url_target(child)
+                display = child.plain_text()
+                self._legacy_insert_url_link(display if display.strip() else target, target)
+            elif child.tag in self._INLINE_VISUAL:
+                self._insert_inline(child.children,
+                                    tags + (self._INLINE_VISUAL[child.tag],))
+            elif child.tag != 'hr':
+                # 内联位置上的块级标签（如列表项的 [p] 包裹）只展开其内容
+                self._insert_inline(child.children, tags)
+
+    def _legacy_insert_url_link(self, display_text: str, target_url: str):
+        tag = self._url_link_tag(display_text, target_url)
+        self._text.insert(tk.END, display_text, tag)
+
+    def _highlight_urls(self):
+        self._text.tag_remove("url", "1.0", tk.END)
+        content = self._text.get("1.0", tk.END)
+        for m in self._URL_RE.finditer(content):
+            self._text.tag_add("url", f"1.0+{m.start()}c", f"1.0+{m.end()}c")
+
+
+class CountingText:
+    """Text widget 替身：记录 Tk 命令次数，只维护纯文本（够 LegacyEditor 的 get 使用）"""
+
+    def __init__(self):
+        self.calls = 0
+        self._chunks = []
+
+    def _count(self, *_, **__):
+        self.calls += 1
+
+    config = tag_configure = tag_bind = tag_remove = tag_add = _count
+
+    def delete(self, *_):
+        self.calls += 1
+        self._chunks = []
+
+    def insert(self, index, *args):
+        self.calls += 1
+        self._chunks.extend(args[0::2])
+
+    def get(self, start, end):
+        self.calls += 1
+        text = "".join(self._chunks)
+        if start == "end-2c":
+            return text[-1:]
+        return text + "\n"
+
+
+def stub_editor(cls):
+    """不创建 Tk 窗口的编辑器实例（只初始化渲染用到的属性）"""
+    editor = object.__new__(cls)
+    editor._text = CountingText()
+    editor._url_map = {}
+    editor._url_counter = 0
+    editor._render_cache = {}
+    return editor
+
+
+def bench_stub(target_kb: float):
+    for factor in (0.5, 1, 2):
+        note = build_note(target_kb * factor)
+        print(f"笔记 {len(note.encode('utf-8')) / 1024:7.1f} KB")
+        for label, cls in (("逐段 insert + 全文重扫", LegacyEditor),
+                           ("批量渲染              ", SteamRichTextEditor)):
+            best = float("inf")
+            for _ in range(3):
+                editor = stub_editor(cls)  # 每次新建，避免命中渲染缓存
+                t0 = time.perf_counter()
+                editor._render_bbcode(note)
+                best = min(best, time.perf_counter() - t0)
+            print(f"  {label} {best * 1000:9.1f} ms  Tk 命令 {editor._text.calls:6d} 次")
+        print()
+
+
+def timed(editor, note: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        editor.set_content(note)
+        editor.update_idletasks()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(target_kb: float):
+    root = tk.Tk()
+    root.withdraw()
+    editors = (("逐段 insert + 全文重扫", LegacyEditor(root)),
+               ("批量渲染              ", SteamRichTextEditor(root)))
+    for factor in (0.5, 1, 2):
+        note = build_note(target_kb * factor)
+        print(f"笔记 {len(note.encode('utf-8')) / 1024:7.1f} KB")
+        for label, editor in editors:
+            print(f"  {label} {timed(editor, note) * 1000:9.1f} ms")
+        print()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--stub"]
+    (bench_stub if "--stub" in sys.argv else bench)(float(args[0]) if args else 50)
@@ -0,0 +1,71 @@
+"""批量导出基准 — 对比旧版逐个 read_notes + 多次小 write 与并行读取的导出引擎
+
+用法：python benchmarks/bench_export.py [游戏数]
+语料复用 bench_note_format 的随机笔记；分别测量纯文本 / gzip 输出，
+以及逐条导出为独立文件 / 单个 zip 的耗时。冷缓存下（网络盘、机械硬盘）并行读取的优势更明显。
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_note_format import build_corpus  # noqa: E402
+from core import SteamNotesManager  # noqa: E402
+
+
+def legacy_export_batch(mgr: SteamNotesManager, app_ids: list, output_path: str):
+    """旧版 export_batch：串行读取，每个片段单独 f.write"""
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(f"{mgr.BATCH_EXPORT_HEADER}\n")
+        f.write(f"# 包含游戏数: {len(app_ids)}\n\n")
+        for app_id in app_ids:
+            notes = mgr.read_notes(app_id).get("notes", [])
+            if not notes:
+                continue
+            f.write(f"{mgr.BATCH_APP_HEADER}{app_id}===\n")
+            f.write(f"# 笔记数量: {len(notes)}\n\n")
+            for i, note in enumerate(notes):
+                if i > 0:
+                    f.write(f"\n{mgr.BATCH_NOTE_SEP}\n\n")
+                f.write(f"## {note.get('title', '(无标题)')}\n\n")
+                f.write(note.get("content", "") + "\n")
+            f.write("\n")
+
+
+def bench(n_apps: int):
+    corpus = build_corpus(n_apps)
+    app_ids = list(corpus)
+    print(f"语料：{n_apps} 个游戏，{sum(len(d['notes']) for d in corpus.values())} 条笔记\n")
+    with tempfile.TemporaryDirectory() as d:
+        mgr = SteamNotesManager(os.path.join(d, "notes"), compact_json=True)
+        os.makedirs(mgr.notes_dir)
+        with mgr.buffered():
+            for app_id, data in corpus.items():
+                mgr.write_notes(app_id, data)
+
+        for label, fn, out in (
+                ("旧版串行导出    ", lambda p: legacy_export_batch(mgr, app_ids, p), "legacy.txt"),
+                ("export_batch    ", lambda p: mgr.export_batch(app_ids, p), "batch.txt"),
+                ("export_batch gz ", lambda p: mgr.export_batch(app_ids, p), "batch.txt.gz")):
+            path = os.path.join(d, out)
+            t0 = time.perf_counter()
+            fn(path)
+            elapsed = time.perf_counter() - t0
+            print(f"  {label} {elapsed * 1000:9.1f} ms  {os.path.getsize(path) / 1024:9.1f} KB")
+
+        t0 = time.perf_counter()
+        n_files, _ = mgr.export_individual_files(app_ids, os.path.join(d, "individual"))
+        print(f"  逐条导出        {(time.perf_counter() - t0) * 1000:9.1f} ms  {n_files} 个文件")
+
+        t0 = time.perf_counter()
+        mgr.export_individual_files(app_ids, os.path.join(d, "individual.zip"), as_zip=True)
+        print(f"  逐条导出为 zip  {(time.perf_counter() - t0) * 1000:9.1f} ms  "
+              f"{os.path.getsize(os.path.join(d, 'individual.zip')) / 1024:9.1f} KB")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,85 @@
+"""笔记文件格式基准 — 对比缩进格式与紧凑格式的体积、序列化与哈希耗时
+
+用法：python benchmarks/bench_note_format.py [游戏数]
+语料为随机生成的、接近真实规模的笔记（每个游戏 1~4 条，AI 笔记为主，
+中英文混排 BBCode，单条 1~4 KB）。
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import SteamNotesManager  # noqa: E402
+
+_WORDS = ["开放世界", "roguelike", "剧情", "战斗系统", "像素风", "多人合作",
+          "难度曲线", "Steam Deck", "本地化", "成就", "DLC", "手感", "节奏",
+          "探索", "解谜", "build", "画面", "配乐", "优化", "内容量"]
+
+
+def _paragraph(rng: random.Random) -> str:
+    return "".join(rng.choice(_WORDS) + rng.choice("，。、；") for _ in range(rng.randint(20, 60)))
+
+
+def build_corpus(n_apps: int, seed: int = 42) -> dict:
+    """生成 {app_id: notes_data} 语料"""
+    rng = random.Random(seed)
+    corpus = {}
+    for i in range(n_apps):
+        app_id = str(10 + i * 10)
+        notes = []
+        for k in range(rng.randint(1, 4)):
+            body = "".join(f"[p]{_paragraph(rng)}[/p]" for _ in range(rng.randint(2, 6)))
+            if rng.random() < 0.3:
+                body += "[list][*]" + "[/*][*]".join(_paragraph(rng)[:40] for _ in range(3)) + "[/*][/list]"
+            notes.append({
+                "id": f"{rng.getrandbits(32):08x}",
+                "appid": int(app_id),
+                "ordinal": k,
+                "time_created": 1700000000 + i,
+                "time_modified": 1700000000 + i,
+                "title": f"🤖AI: 📚训练数据与Steam评测 | 相关信息量：较多 ⚠️ 以下内容由 model-{k} 生成",
+                "content": body,
+            })
+        corpus[app_id] = {"notes": notes}
+    return corpus
+
+
+def bench(n_apps: int):
+    corpus = build_corpus(n_apps)
+    print(f"语料：{n_apps} 个游戏，{sum(len(d['notes']) for d in corpus.values())} 条笔记\n")
+    results = {}
+    for compact in (False, True):
+        name = "紧凑" if compact else "缩进"
+        with tempfile.TemporaryDirectory() as d:
+            mgr = SteamNotesManager(d, compact_json=compact)
+            t0 = time.perf_counter()
+            blobs = [mgr._serialize(data) for data in corpus.values()]
+            t_ser = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            with mgr.buffered():
+                for app_id, data in corpus.items():
+                    mgr.write_notes(app_id, data)
+            t_write = time.perf_counter() - t0
+
+            paths = [mgr._get_note_file(a) for a in corpus]
+            t0 = time.perf_counter()
+            for p in paths:
+                mgr._compute_file_hash(p)
+            t_hash = time.perf_counter() - t0
+
+            size = sum(len(b) for b in blobs)
+            results[name] = size
+            print(f"[{name}] 总体积 {size / 1024:9.1f} KB | 序列化 {t_ser * 1000:7.1f} ms | "
+                  f"批量写入 {t_write * 1000:7.1f} ms | 全量哈希 {t_hash * 1000:7.1f} ms")
+    saved = results["缩进"] - results["紧凑"]
+    print(f"\n紧凑格式节省 {saved / 1024:.1f} KB（{saved / results['缩进']:.1%}），"
+          f"即每次全量上传少传的字节数")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
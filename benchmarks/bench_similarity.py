@@ -0,0 +1,66 @@
+"""近似重复检测基准 — 对比两两比较与 LSH 分桶找候选对的耗时增长
+
+用法：python benchmarks/bench_similarity.py [笔记数]
+语料为随机生成的长笔记，其中约 5% 是对其他笔记做了局部改动的近似副本。
+按 1/4、1/2、1 倍笔记数分别测量：签名计算、LSH 聚类，以及（笔记数不大时）两两比较。
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import note_similarity  # noqa: E402
+
+_WORDS = ["开放世界", "roguelike", "剧情", "战斗系统", "像素风", "多人合作",
+          "难度曲线", "Steam Deck", "本地化", "成就", "DLC", "手感", "节奏",
+          "探索", "解谜", "build", "画面", "配乐", "优化", "内容量"]
+
+_PAIRWISE_LIMIT = 3000  # 超过此数量时跳过两两比较（耗时过长）
+
+
+def build_corpus(n_notes: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n_notes):
+        if texts and rng.random() < 0.05:
+            src = rng.choice(texts)
+            pos = rng.randrange(max(1, len(src) - 40))
+            texts.append(src[:pos] + "（更新：补充了一段说明）" + src[pos + 20:])
+        else:
+            texts.append("".join(rng.choice(_WORDS) + rng.choice("，。、")
+                                 for _ in range(rng.randint(100, 400))))
+    return texts
+
+
+def pairwise(items, threshold):
+    pairs = 0
+    for i in range(len(items)):
+        for j in range(i + 1, len(items)):
+            if note_similarity.similarity(items[i][1], items[j][1]) >= threshold:
+                pairs += 1
+    return pairs
+
+
+def bench(n_notes: int):
+    for factor in (0.25, 0.5, 1):
+        texts = build_corpus(int(n_notes * factor))
+        t0 = time.perf_counter()
+        items = [(i, note_similarity.signature(t)) for i, t in enumerate(texts)]
+        t_sig = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        clusters = note_similarity.find_clusters(items)
+        t_lsh = time.perf_counter() - t0
+        line = (f"{len(texts):6d} 条  签名 {t_sig * 1000:8.1f} ms  "
+                f"LSH 聚类 {t_lsh * 1000:8.1f} ms（{len(clusters)} 簇）")
+        if len(texts) <= _PAIRWISE_LIMIT:
+            t0 = time.perf_counter()
+            pairwise(items, note_similarity.DEFAULT_THRESHOLD)
+            line += f"  两两比较 {(time.perf_counter() - t0) * 1000:9.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
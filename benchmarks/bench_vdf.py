@@ -0,0 +1,87 @@
+"""VDF 解析基准 — 大型 localconfig.vdf 上对比旧版正则扫描与 vdf_parser
+
+用法：python benchmarks/bench_vdf.py [目标 MB 数]
+生成一个接近真实结构的 localconfig.vdf（大量 apps / friends 子块），
+PersonaName 分别放在文件前部与尾部，测量耗时与内存峰值。
+"""
+
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vdf_parser  # noqa: E402
+
+
+def build_localconfig(path: str, target_mb: float, persona_first: bool):
+    rng = random.Random(1)
+    persona = '\t\t"PersonaName"\t\t"基准用户"\n'
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('"UserLocalConfigStore"\n{\n\t"friends"\n\t{\n')
+        if persona_first:
+            f.write(persona)
+        for i in range(2000):
+            f.write(f'\t\t"{76561197960265728 + i}"\n\t\t{{\n\t\t\t"name"\t\t"friend{i}"\n'
+                    f'\t\t\t"NameHistory"\n\t\t\t{{\n\t\t\t\t"0"\t\t"old{i}"\n\t\t\t}}\n\t\t}}\n')
+        f.write('\t}\n\t"Software"\n\t{\n\t\t"Valve"\n\t\t{\n\t\t\t"Steam"\n\t\t\t{\n\t\t\t\t"apps"\n\t\t\t\t{\n')
+        app_id = 10
+        while f.tell() < target_mb * 1024 * 1024:
+            f.write(f'\t\t\t\t\t"{app_id}"\n\t\t\t\t\t{{\n'
+                    f'\t\t\t\t\t\t"LastPlayed"\t\t"{rng.randint(1e9, 2e9)}"\n'
+                    f'\t\t\t\t\t\t"Playtime"\t\t"{rng.randint(0, 9999)}"\n'
+                    f'\t\t\t\t\t\t"cloud"\n\t\t\t\t\t\t{{\n'
+                    f'\t\t\t\t\t\t\t"last_sync_state"\t\t"synchronized"\n'
+                    f'\t\t\t\t\t\t}}\n\t\t\t\t\t}}\n')
+            app_id += 10
+        f.write('\t\t\t\t}\n\t\t\t}\n\t\t}\n\t}\n')
+        if not persona_first:
+            f.write('\t"friends_tail"\n\t{\n' + persona + '\t}\n')
+        f.write('}\n')
+
+
+def regex_persona(path: str):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+    m = re.search(r'"PersonaName"\s+"([^"]+)"', content)
+    return m.group(1) if m else None
+
+
+def parser_persona(path: str):
+    return vdf_parser.find_values(path, ["PersonaName"]).get("PersonaName")
+
+
+def measure(fn, *args):
+    """耗时与内存峰值分两次测量（tracemalloc 会显著拖慢纯 Python 代码）"""
+    t0 = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench(target_mb: float):
+    with tempfile.TemporaryDirectory() as d:
+        for persona_first in (True, False):
+            path = os.path.join(d, "localconfig.vdf")
+            build_localconfig(path, target_mb, persona_first)
+            size = os.path.getsize(path) / 1024 / 1024
+            where = "前部" if persona_first else "尾部"
+            print(f"localconfig.vdf {size:.1f} MB，PersonaName 位于{where}")
+            for label, fn in (("正则全文扫描", regex_persona),
+                              ("find_values  ", parser_persona),
+                              ("load 完整解析", vdf_parser.load)):
+                _, elapsed, peak = measure(fn, path)
+                print(f"  {label} {elapsed * 1000:9.1f} ms   内存峰值 {peak / 1024 / 1024:7.2f} MB")
+            print()
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 8)
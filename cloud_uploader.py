@@ -289,34 +289,136 @@ class SteamCloudUploader:
         except Exception:
             return False
     
+    # 上次检测到的 Steam 进程 PID；后续检测只需验证该 PID 是否仍存活
+    _steam_pid = None
+    # macOS libproc（按 PID 取进程名），首次使用时加载；加载失败为 False
+    _libproc = None
+
     @staticmethod
-    def is_steam_running() -> bool:
-        """检测 Steam 客户端是否正在运行（跨平台）"""
+    def _linux_proc_name(pid: int) -> str:
+        """读取 /proc/<pid>/stat 中的进程名；进程不存在或为僵尸进程时返回空字符串"""
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            return ""
+        # 格式：pid (comm) state ...，comm 本身可能含空格或括号，取最后一个 ")"
+        lp, rp = stat.find(b"("), stat.rfind(b")")
+        if lp < 0 or rp < 0 or stat[rp + 2:rp + 3] == b"Z":
+            return ""
+        return stat[lp + 1:rp].decode("utf-8", "replace")
+
+    @staticmethod
+    def _find_steam_pid_linux():
+        """定位 Linux 上的 Steam 进程：先读 ~/.steam/steam.pid，失败再扫描 /proc"""
+        try:
+            with open(os.path.expanduser("~/.steam/steam.pid"), "r") as f:
+                pid = int(f.read().strip())
+            if SteamCloudUploader._linux_proc_name(pid) == "steam":
+                return pid
+        except (OSError, ValueError):
+            pass
+        try:
+            entries = os.listdir("/proc")
+        except OSError:
+            return None
+        for name in entries:
+            if name.isdigit() and SteamCloudUploader._linux_proc_name(int(name)) == "steam":
+                return int(name)
+        return None
+
+    @staticmethod
+    def _darwin_proc_name(pid: int):
+        """macOS：经 libproc 的 proc_name 取进程名；libproc 不可用时返回 None"""
+        if SteamCloudUploader._libproc is None:
+            try:
+                SteamCloudUploader._libproc = ctypes.CDLL("/usr/lib/libproc.dylib")
+            except OSError:
+                SteamCloudUploader._libproc = False
+        if not SteamCloudUploader._libproc:
+            return None
+        buf = ctypes.create_string_buffer(256)
+        n = SteamCloudUploader._libproc.proc_name(pid, buf, ctypes.sizeof(buf))
+        return buf.value.decode("utf-8", "replace") if n > 0 else ""
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        """验证缓存的 PID 是否仍是存活的 Steam 进程（不创建子进程）
+
+        PID 可能已被系统回收给其他进程，因此除存活外还要核对进程名。
+        """
+        system = platform.system()
+        if system == "Linux":
+            return SteamCloudUploader._linux_proc_name(pid) == "steam"
+        if system == "Windows":
+            # PROCESS_QUERY_LIMITED_INFORMATION = 0x1000, STILL_ACTIVE = 259
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(0x1000, False, pid)
+            if not handle:
+                return False
+            try:
+                code = ctypes.c_ulong()
+                if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                    return False
+                if code.value != 259:
+                    return False
+                path = ctypes.create_unicode_buffer(1024)
+                size = ctypes.c_ulong(len(path))
+                if not kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(size)):
+                    return False
+                return os.path.basename(path.value).lower() == "steam.exe"
+            finally:
+                kernel32.CloseHandle(handle)
+        try:
+            os.kill(pid, 0)
+        except PermissionError:
+            pass
+        except OSError:
+            return False
+        name = SteamCloudUploader._darwin_proc_name(pid)
+        # steam_osx 主进程，或 _find_steam_pid 回退找到的 Steam Helper 等进程
+        return name is None or "steam" in name.lower()
+
+    @staticmethod
+    def _find_steam_pid():
+        """查找 Steam 进程 PID（跨平台）。Returns: pid 或 None"""
         system = platform.system()
+        if system == "Linux":
+            return SteamCloudUploader._find_steam_pid_linux()
+        if system == "Windows":
+            result = subprocess.run(
+                ["tasklist", "/FI", "IMAGENAME eq steam.exe", "/FO", "CSV", "/NH"],
+                capture_output=True, text=True, timeout=5)
+            for line in result.stdout.splitlines():
+                parts = [p.strip('"') for p in line.split('","')]
+                if len(parts) > 1 and parts[0].lower() == "steam.exe" and parts[1].isdigit():
+                    return int(parts[1])
+            return None
+        # macOS：steam_osx 主进程，fallback 检查 Steam Helper 进程
+        for args in (["pgrep", "-x", "steam_osx"], ["pgrep", "-f", "Steam.app"]):
+            result = subprocess.run(args, capture_output=True, text=True, timeout=5)
+            pids = result.stdout.split()
+            if result.returncode == 0 and pids and pids[0].isdigit():
+                return int(pids[0])
+        return None
+
+    @staticmethod
+    def is_steam_running() -> bool:
+        """检测 Steam 客户端是否正在运行（跨平台）
+
+        首次检测定位 Steam 的 PID 并缓存，之后只验证该 PID 是否存活
+        （Linux 读 /proc/<pid>/stat，Windows OpenProcess，macOS kill(pid, 0)），
+        不再每次创建 pgrep/tasklist 子进程。PID 失效时才重新查找。
+        """
+        pid = SteamCloudUploader._steam_pid
         try:
-            if system == "Windows":
-                result = subprocess.run(
-                    ["tasklist", "/FI", "IMAGENAME eq steam.exe"],
-                    capture_output=True, text=True, timeout=5)
-                return "steam.exe" in result.stdout.lower()
-            elif system == "Darwin":
-                result = subprocess.run(
-                    ["pgrep", "-x", "steam_osx"],
-                    capture_output=True, timeout=5)
-                if result.returncode == 0:
-                    return True
-                # fallback: 也检查 Steam Helper 进程
-                result = subprocess.run(
-                    ["pgrep", "-f", "Steam.app"],
-                    capture_output=True, timeout=5)
-                return result.returncode == 0
-            else:  # Linux
-                result = subprocess.run(
-                    ["pgrep", "-x", "steam"],
-                    capture_output=True, timeout=5)
-                return result.returncode == 0
+            if pid is not None and SteamCloudUploader._pid_alive(pid):
+                return True
+            pid = SteamCloudUploader._find_steam_pid()
         except Exception:
             return True  # 检测失败时保守地认为 Steam 在运行
+        SteamCloudUploader._steam_pid = pid
+        return pid is not None
 
     def shutdown(self):
         """断开 Steam Cloud 连接，终止子进程。
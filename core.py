@@ -1,16 +1,33 @@
 """核心业务逻辑 — 笔记读写、常量、AI 笔记识别工具函数"""
 
+import gzip
 import hashlib
+import io
 import json
 import os
 import random
 import re
 import string
+import threading
 import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 
+import bbcode_parser
+import note_similarity
+import vdf_parser
 from cloud_uploader import SteamCloudUploader
 
+try:
+    import zstandard
+    _HAS_ZSTD = True
+except ImportError:
+    _HAS_ZSTD = False
+
 
 NOTES_APPID = "2371090"
 
@@ -101,6 +118,20 @@ def is_insufficient_info_note(note: dict) -> bool:
     return INSUFFICIENT_INFO_MARKER in title
 
 
+@lru_cache(maxsize=4096)
+def _title_meta(title: str) -> tuple:
+    note = {"title": title}
+    return is_ai_note(note), extract_ai_model_from_note(note)
+
+
+def note_meta(note: dict) -> tuple:
+    """(是否 AI 笔记, AI 模型名)，只取决于标题，按标题缓存
+
+    笔记列表逐行显示时使用，同一标题的正则匹配只做一次。
+    """
+    return _title_meta(note.get("title", "") or "")
+
+
 # AI 确信度对应 emoji（用于列表显示，直观表示 AI 自评可靠程度）
 CONFIDENCE_EMOJI = {
     "很高": "🟢",
@@ -136,17 +167,342 @@ INFO_SOURCE_LOCAL = "📚训练数据与Steam评测"
 INSUFFICIENT_INFO_MARKER = "⛔信息过少"
 
 
+class SyncStateTracker:
+    """remotecache.vdf 中笔记文件 syncstate 的缓存视图
+
+    只在文件大小或 mtime 变化时重新解析，其余时候 get() 只需一次 stat + dict 查找。
+    状态变化时以 {app_id: (旧值, 新值)} 通知监听器（在调用 refresh 的线程中回调，
+    UI 监听器需自行切回主线程）。syncstate：1=已同步，3=上传中。
+    """
+
+    UPLOADING = 3
+
+    def __init__(self, vdf_path: str):
+        self.vdf_path = vdf_path
+        self._states = {}     # {app_id: syncstate}
+        self._stamp = None    # (size, mtime_ns)，None 表示尚未解析或文件不存在
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def for_notes_dir(notes_dir: str) -> "SyncStateTracker":
+        """remotecache.vdf 与笔记所在的 remote 目录同级"""
+        return SyncStateTracker(os.path.join(os.path.dirname(notes_dir), "remotecache.vdf"))
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _parse(self) -> dict:
+        states = {}
+        # 结构："2371090" { "notes_570" { ... "syncstate" "1" ... } ... }
+        for fname, block in vdf_parser.iter_subtrees(self.vdf_path, (None,)):
+            if not fname.startswith("notes_"):
+                continue
+            state = block.get("syncstate")
+            if isinstance(state, str) and state.isdigit():
+                # 去掉 notes_ 前缀（与 list_all_games 一致）："notes_shortcut_X" → "shortcut_X"
+                states[fname[6:]] = int(state)
+        return states
+
+    def refresh(self) -> dict:
+        """文件有变化时重新解析，返回本次变化 {app_id: (旧值, 新值)}（无变化返回空 dict）"""
+        with self._lock:
+            try:
+                st = os.stat(self.vdf_path)
+                stamp = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                stamp = None
+            if stamp == self._stamp:
+                return {}
+            try:
+                states = self._parse() if stamp else {}
+            except OSError:
+                return {}
+            self._stamp = stamp
+            old = self._states
+            changes = {aid: (old.get(aid), states.get(aid))
+                       for aid in old.keys() | states.keys()
+                       if old.get(aid) != states.get(aid)}
+            self._states = states
+        if changes:
+            for callback in list(self._listeners):
+                callback(changes)
+        return changes
+
+    def get(self, app_id: str):
+        """返回指定 app 的 syncstate（先做一次 stat 检查），不存在返回 None"""
+        self.refresh()
+        return self._states.get(app_id)
+
+    def is_uploading(self, app_id: str) -> bool:
+        return self.get(app_id) == self.UPLOADING
+
+    def snapshot(self) -> dict:
+        """返回当前 {app_id: syncstate} 的副本"""
+        self.refresh()
+        return dict(self._states)
+
+
+class NotesEdit:
+    """SteamNotesManager.edit() 的事务对象
+
+    在内存中对单个游戏的笔记做任意多次增删改/移动，退出上下文时一次写入。
+    """
+
+    def __init__(self, manager: "SteamNotesManager", app_id: str, data: dict):
+        self.manager = manager
+        self.app_id = app_id
+        self.data = data
+        self.changed = False
+
+    @property
+    def notes(self) -> list:
+        return self.data.setdefault("notes", [])
+
+    def create_note(self, title: str, content: str) -> dict:
+        """追加一条笔记，返回新建的条目"""
+        entry = self.manager._build_entry(self.app_id, title, content)
+        self.notes.append(entry)
+        self.changed = True
+        return entry
+
+    def update_note(self, index: int, title: str, content: str) -> bool:
+        notes = self.notes
+        if not 0 <= index < len(notes):
+            return False
+        notes[index]["title"] = title
+        notes[index]["content"] = self.manager._wrap_content(content)
+        notes[index]["time_modified"] = int(time.time())
+        self.changed = True
+        return True
+
+    def delete_note(self, index: int) -> bool:
+        notes = self.notes
+        if not 0 <= index < len(notes):
+            return False
+        notes.pop(index)
+        self.changed = True
+        return True
+
+    def move_note(self, index: int, direction: int) -> bool:
+        """direction: -1=上移, +1=下移"""
+        notes = self.notes
+        new_index = index + direction
+        if not (0 <= index < len(notes) and 0 <= new_index < len(notes)):
+            return False
+        notes[index], notes[new_index] = notes[new_index], notes[index]
+        self.changed = True
+        return True
+
+    def remove_notes(self, predicate) -> int:
+        """删除所有满足 predicate(note) 的笔记（如 is_ai_note），返回删除数量"""
+        notes = self.notes
+        kept = [n for n in notes if not predicate(n)]
+        removed = len(notes) - len(kept)
+        if removed:
+            self.data["notes"] = kept
+            self.changed = True
+        return removed
+
+
+def note_fingerprint(title: str, content: str) -> bytes:
+    """笔记 (标题, 内容) 的指纹（BLAKE2b-128），相同即视为字面重复"""
+    return hashlib.blake2b(
+        title.encode("utf-8") + b"\0" + content.encode("utf-8"), digest_size=16).digest()
+
+
+class AppNotesIndex:
+    """单个游戏笔记的指纹摘要：每条笔记的指纹与 AI 标记（与笔记顺序一致）"""
+
+    __slots__ = ('stamp', 'fingerprints', 'ai_flags', 'fingerprint_set', 'has_ai',
+                 'signatures')
+
+    def __init__(self, notes: list, stamp=None):
+        self.stamp = stamp  # 笔记文件 (size, mtime_ns)，按写缓冲内容计算时为 None
+        self.fingerprints = tuple(
+            note_fingerprint(n.get("title", "") or "", n.get("content", "") or "")
+            for n in notes)
+        self.ai_flags = tuple(note_meta(n)[0] for n in notes)
+        self.fingerprint_set = frozenset(self.fingerprints)
+        self.has_ai = any(self.ai_flags)
+        # 近似重复检测用的 MinHash 签名（note_similarity.signature），按需计算
+        self.signatures = None
+
+    def compute_signatures(self, notes: list):
+        """按笔记正文（正文为空时用标题）计算 MinHash 签名"""
+        self.signatures = tuple(
+            note_similarity.signature(n.get("content", "") or n.get("title", "") or "")
+            for n in notes)
+
+
+class NotesIndex:
+    """笔记指纹索引 {app_id: AppNotesIndex}（线程安全）
+
+    按笔记文件 (size, mtime_ns) 缓存：文件未变化时 get() 只需一次 stat，不打开文件。
+    全量扫描（scan_ai_notes / find_duplicate_notes）读到的内容顺带写入索引，
+    之后的导入冲突检测对未变化的文件都是纯集合运算。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._apps = {}
+
+    def get(self, app_id: str, path: str, signatures: bool = False):
+        """返回 AppNotesIndex；文件不存在或无法解析时返回 None
+
+        signatures=True 时保证结果带有 MinHash 签名（缓存中没有时读取文件补算）
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.discard(app_id)
+            return None
+        with self._lock:
+            cached = self._apps.get(app_id)
+        if (cached is not None and cached.stamp == (st.st_size, st.st_mtime_ns)
+                and (not signatures or cached.signatures is not None)):
+            return cached
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                st = os.fstat(f.fileno())
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return self.put(app_id, data.get("notes", []), (st.st_size, st.st_mtime_ns),
+                        signatures)
+
+    def put(self, app_id: str, notes: list, stamp,
+            signatures: bool = False) -> AppNotesIndex:
+        entry = AppNotesIndex(notes, stamp)
+        if signatures:
+            entry.compute_signatures(notes)
+        with self._lock:
+            self._apps[app_id] = entry
+        return entry
+
+    def discard(self, app_id: str):
+        with self._lock:
+            self._apps.pop(app_id, None)
+
+
+# 批量导出文件中每个游戏段的起始行：===APP_ID:xxx===
+_BATCH_APP_RE = re.compile(r'===APP_ID:(\S+?)===')
+
+# 导出时并行读取笔记文件的线程数（主要是等待磁盘 I/O）与写入缓冲大小
+_EXPORT_WORKERS = 8
+_EXPORT_BUFFER_SIZE = 1 << 20
+
+# 内存中保留的待上传文件内容总量上限，超出时淘汰最久未写入的（上传时改为读盘）
+_UPLOAD_CACHE_BYTES = 16 << 20
+
+
+@contextmanager
+def _atomic_output(path: str):
+    """产出同目录下的临时文件路径，正常退出时 os.replace 到 path
+
+    出错或取消（上下文内抛出任何异常）时删除临时文件，目标路径上不会留下半截文件，
+    已有的同名文件保持原样。临时文件名保留原扩展名（压缩格式按扩展名识别）。
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".tmp{os.getpid()}_{name}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def batch_compression(path: str) -> str:
+    """按扩展名判断批量导出文件的压缩格式："gzip" / "zstd" / ""（纯文本）"""
+    lower = path.lower()
+    if lower.endswith(".gz"):
+        return "gzip"
+    if lower.endswith(".zst"):
+        return "zstd"
+    return ""
+
+
+def supported_compressions() -> tuple:
+    """当前环境可用的批量导出压缩格式"""
+    return ("gzip", "zstd") if _HAS_ZSTD else ("gzip",)
+
+
+def open_batch_text(path: str, mode: str = "r"):
+    """以 UTF-8 文本流打开批量导出文件，.gz / .zst 透明压缩解压
+
+    mode: "r" 或 "w"；写入端带 _EXPORT_BUFFER_SIZE 大小的缓冲。
+    zstd 需要可选依赖 zstandard，未安装时抛出 RuntimeError。
+    """
+    kind = batch_compression(path)
+    if kind == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=1)
+    if kind == "zstd":
+        if not _HAS_ZSTD:
+            raise RuntimeError("读写 .zst 文件需要安装 zstandard（pip install zstandard）")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = io.BufferedWriter(zstandard.ZstdCompressor().stream_writer(raw),
+                                       _EXPORT_BUFFER_SIZE)
+        else:
+            stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8", buffering=_EXPORT_BUFFER_SIZE)
+
+
+class BatchFile:
+    """批量导出文件的可重复迭代视图
+
+    每次迭代都重新流式读取文件（SteamNotesManager.iter_batch_file），
+    产出 (app_id, entry)；可直接传给 apply_batch_import / iter_batch_chunks，
+    供「先检测冲突、再正式导入」这类需要读两遍的流程使用，内存占用与文件大小无关。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self):
+        return SteamNotesManager.iter_batch_file(self.path)
+
+
 class SteamNotesManager:
     """Steam 笔记的核心读写逻辑"""
 
     def __init__(self, notes_dir: str, cloud_uploader: SteamCloudUploader = None,
-                 uploaded_hashes: dict = None):
+                 uploaded_hashes: dict = None, compact_json: bool = False):
         self.notes_dir = notes_dir
         self.cloud_uploader = cloud_uploader
         self._dirty_apps = set()  # 有本地改动但尚未上传至云的 app_id 集合
-        self._uploaded_hashes = uploaded_hashes or {}  # {app_id: md5} 持久化上传记录
-        # 启动时根据持久化哈希重建 dirty 状态
-        self._rebuild_dirty_from_hashes()
+        # 持久化上传记录 {app_id: [size, mtime_ns, digest]}，兼容旧版 {app_id: md5_hex}
+        self._uploaded_hashes = uploaded_hashes or {}
+        # 本程序最近一次写入、尚未上传的文件 stat {app_id: (size, mtime_ns)}，用于识别自身写入
+        self._pending_uploads = {}
+        # 其中部分文件的内容 {app_id: bytes}（LRU，总量不超过 _UPLOAD_CACHE_BYTES），
+        # 上传时文件未被外部改动则直接复用，免去重新读盘；批量导入时不会占用无界内存
+        self._upload_cache = OrderedDict()
+        self._upload_cache_bytes = 0
+        # 写缓冲 {app_id: 序列化后的字节}：buffered() 上下文内或启用写延迟时暂存，
+        # 同一 app 的多次写入合并为一次落盘；存字节即为快照，调用方之后修改 data 不影响落盘内容
+        self._write_buffer = {}
+        self._buffer_depth = 0
+        self._flush_timer = None
+        self._write_lock = threading.RLock()
+        # 写延迟（秒），>0 时 write_notes 只进缓冲，窗口结束后统一落盘
+        self.write_behind_delay = 0
+        # 笔记文件序列化格式：True 为 Steam 原生紧凑格式，False 为缩进 2 格
+        self.compact_json = compact_json
+        # 每条笔记的 (标题+内容) 指纹与 AI 标记，供导入冲突检测免读盘比对
+        self._notes_index = NotesIndex()
+        # 启动时根据持久化哈希重建 dirty 状态；
+        # hashes_upgraded 为 True 时有记录被升级，调用方应持久化 get_uploaded_hashes()
+        self.hashes_upgraded = self._rebuild_dirty_from_hashes()
 
     @staticmethod
     def _gen_id():
@@ -155,21 +511,8 @@ class SteamNotesManager:
 
     @staticmethod
     def _wrap_content(text: str) -> str:
-        """将纯文本包裹为 [p]...[/p] 格式（如果尚未包裹）"""
-        stripped = text.strip()
-        # 如果已经包含富文本标签，不做处理
-        if stripped.startswith('[p]') or stripped.startswith('[h1]') or \
-           stripped.startswith('[h2]') or stripped.startswith('[h3]') or \
-           stripped.startswith('[list]') or stripped.startswith('[olist]'):
-            return stripped
-        # 按段落分割并包裹
-        paragraphs = stripped.split('\n\n')
-        wrapped = []
-        for p in paragraphs:
-            p = p.strip()
-            if p:
-                wrapped.append(f'[p]{p}[/p]')
-        return ''.join(wrapped) if wrapped else f'[p]{stripped}[/p]'
+        """将纯文本段落包裹为 [p]...[/p] 格式（已是块级标签的部分原样保留）"""
+        return bbcode_parser.wrap_paragraphs(text)
 
     def _build_entry(self, app_id: str, title: str, content: str) -> dict:
         """构建一条符合 Steam 原生格式的笔记条目"""
@@ -188,7 +531,11 @@ class SteamNotesManager:
         return os.path.join(self.notes_dir, f"notes_{app_id}")
 
     def read_notes(self, app_id: str) -> dict:
-        """读取指定游戏的笔记文件"""
+        """读取指定游戏的笔记文件（写缓冲中有未落盘的版本时优先返回缓冲内容）"""
+        with self._write_lock:
+            buffered = self._write_buffer.get(app_id)
+        if buffered is not None:
+            return json.loads(buffered.decode("utf-8"))
         path = self._get_note_file(app_id)
         if os.path.exists(path):
             try:
@@ -198,40 +545,286 @@ class SteamNotesManager:
                 pass
         return {"notes": []}
 
-    def write_notes(self, app_id: str, data: dict):
-        """写入笔记文件（仅本地），并标记为需要上传到云"""
+    def note_index(self, app_id: str):
+        """单个游戏笔记的指纹摘要（AppNotesIndex），没有笔记文件时返回 None
+
+        写缓冲中有未落盘的版本时按缓冲内容即时计算；否则文件未变化时不重新读取。
+        """
+        with self._write_lock:
+            buffered = self._write_buffer.get(app_id)
+        if buffered is not None:
+            return AppNotesIndex(json.loads(buffered.decode("utf-8")).get("notes", []))
+        return self._notes_index.get(app_id, self._get_note_file(app_id))
+
+    def write_notes(self, app_id: str, data: dict) -> bool:
+        """写入笔记文件（仅本地），并标记为需要上传到云
+
+        序列化结果与磁盘文件完全相同时跳过写入；与上次上传的内容相同时
+        （如撤销移动、AI 替换生成了相同笔记）不标记 dirty。
+        处于 buffered() 上下文或启用了 write_behind_delay 时只把序列化结果放入写缓冲，
+        由 flush() 统一落盘。
+        Returns: True 表示实际写入了磁盘（或已放入写缓冲）；内容与现有版本相同时为 False
+        """
+        raw = self._serialize(data)
+        with self._write_lock:
+            if self._buffer_depth or self.write_behind_delay > 0:
+                previous = self._write_buffer.get(app_id)
+                if previous == raw:
+                    return False
+                if (previous is None and self._hash_bytes(raw)
+                        == self._compute_file_hash(self._get_note_file(app_id))):
+                    return False
+                self._write_buffer[app_id] = raw
+                self._schedule_flush()
+                return True
+            return bool(self._commit_writes({app_id: raw}))
+
+    @contextmanager
+    def edit(self, app_id: str):
+        """单个游戏笔记的事务上下文：只读取一次，任意多次修改后只写入一次
+
+            with manager.edit(app_id) as tx:
+                tx.remove_notes(is_ai_note)
+                tx.create_note(title, content)
+
+        上下文内抛出异常时放弃全部修改；没有任何修改时不写盘。
+        """
+        with self._write_lock:
+            tx = NotesEdit(self, app_id, self.read_notes(app_id))
+            yield tx
+            if tx.changed:
+                self.write_notes(app_id, tx.data)
+
+    @contextmanager
+    def buffered(self):
+        """批量写入上下文：期间的 write_notes 只进缓冲，退出时一次性落盘
+
+        同一 app 的多次写入只落盘最后一次，fsync 与目录同步按批合并。可嵌套。
+        """
+        with self._write_lock:
+            self._buffer_depth += 1
+        try:
+            yield self
+        finally:
+            with self._write_lock:
+                self._buffer_depth -= 1
+                if not self._buffer_depth:
+                    self.flush()
+
+    def flush(self) -> int:
+        """将写缓冲中的笔记落盘，返回实际写入的文件数"""
+        with self._write_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._write_buffer:
+                return 0
+            pending, self._write_buffer = self._write_buffer, {}
+            try:
+                return len(self._commit_writes(pending))
+            except OSError:
+                # 写入失败时保留缓冲，避免丢失改动（期间的新写入优先）
+                pending.update(self._write_buffer)
+                self._write_buffer = pending
+                raise
+
+    def _schedule_flush(self):
+        """写延迟模式下安排一次定时落盘（buffered() 上下文内由退出时负责）"""
+        if self._buffer_depth or self.write_behind_delay <= 0:
+            return
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.write_behind_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _commit_writes(self, items: dict) -> list:
+        """原子写入一批笔记文件：先全部写入同目录临时文件并 fsync，再逐个
+        os.replace 替换，最后同步一次目录。崩溃或 Steam 同步期间都不会读到半截文件。
+        items 的值为笔记数据 dict 或已序列化的字节。
+        与磁盘内容相同的条目直接跳过。Returns: 实际写入的 app_id 列表
+        """
         os.makedirs(self.notes_dir, exist_ok=True)
+        staged = []  # [(app_id, path, tmp_path, raw, digest)]
+        try:
+            for app_id, data in items.items():
+                path = self._get_note_file(app_id)
+                raw = data if isinstance(data, bytes) else self._serialize(data)
+                digest = self._hash_bytes(raw)
+                if digest == self._compute_file_hash(path):
+                    continue
+                tmp_path = os.path.join(self.notes_dir, f".notes_{app_id}.tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+                staged.append((app_id, path, tmp_path, raw, digest))
+            for app_id, path, tmp_path, _, _ in staged:
+                os.replace(tmp_path, path)
+                self._notes_index.discard(app_id)
+        except OSError:
+            for _, _, tmp_path, _, _ in staged:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            raise
+        if staged:
+            self._fsync_dir()
+        for app_id, path, _, raw, digest in staged:
+            if self._matches_uploaded(app_id, raw, digest):
+                # 内容回到了云端版本，无需再次上传（同时刷新文件指纹）
+                self._dirty_apps.discard(app_id)
+                self._forget_pending_upload(app_id)
+                self._record_uploaded(app_id, raw)
+            else:
+                self._dirty_apps.add(app_id)
+                self._remember_pending_upload(app_id, raw, os.stat(path))
+        return [item[0] for item in staged]
+
+    def _remember_pending_upload(self, app_id: str, raw: bytes, st):
+        """登记刚写入的文件 stat，并把内容放入上传缓存（超出总量上限时淘汰最旧的）"""
+        with self._write_lock:
+            self._forget_pending_upload(app_id)
+            self._pending_uploads[app_id] = (st.st_size, st.st_mtime_ns)
+            if len(raw) > _UPLOAD_CACHE_BYTES:
+                return
+            self._upload_cache[app_id] = raw
+            self._upload_cache_bytes += len(raw)
+            while self._upload_cache_bytes > _UPLOAD_CACHE_BYTES:
+                _, old = self._upload_cache.popitem(last=False)
+                self._upload_cache_bytes -= len(old)
+
+    def _forget_pending_upload(self, app_id: str):
+        with self._write_lock:
+            self._pending_uploads.pop(app_id, None)
+            raw = self._upload_cache.pop(app_id, None)
+            if raw is not None:
+                self._upload_cache_bytes -= len(raw)
+
+    def _serialize(self, data: dict) -> bytes:
+        """按当前格式将笔记数据序列化为 UTF-8 字节"""
+        if self.compact_json:
+            text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        else:
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+        return text.encode("utf-8")
+
+    def migrate_note_format(self, compact: bool = True) -> tuple:
+        """一次性将已有笔记文件全部转换为指定格式，并同步更新上传指纹
+
+        转换前与云端版本一致的文件转换后仍视为已同步（JSON 内容不变，
+        无需因格式变化重新上传）；原本就有改动的文件保持 dirty。
+        无法解析的文件原样跳过。
+        Returns: (转换文件数, 节省字节数)
+        """
+        self.flush()
+        self.compact_json = compact
+        try:
+            entries = list(os.scandir(self.notes_dir))
+        except OSError:
+            return 0, 0
+        items = {}
+        clean = {}  # {app_id: 转换后的字节}
+        old_size = new_size = 0
+        for entry in entries:
+            if not entry.name.startswith("notes_") or not entry.is_file():
+                continue
+            app_id = entry.name.replace("notes_", "")
+            try:
+                with open(entry.path, "rb") as f:
+                    raw = f.read()
+                data = json.loads(raw.decode("utf-8"))
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+                continue
+            new_raw = self._serialize(data)
+            if new_raw == raw:
+                continue
+            items[app_id] = data
+            old_size += len(raw)
+            new_size += len(new_raw)
+            if app_id not in self._dirty_apps and app_id in self._uploaded_hashes:
+                clean[app_id] = new_raw
+        with self._write_lock:
+            written = self._commit_writes(items) if items else []
+        for app_id in written:
+            if app_id in clean:
+                self._dirty_apps.discard(app_id)
+                self._forget_pending_upload(app_id)
+                self._record_uploaded(app_id, clean[app_id])
+        return len(written), old_size - new_size
+
+    def _fsync_dir(self):
+        """同步笔记目录，确保 rename 持久化（Windows 不支持打开目录，直接跳过）"""
+        if os.name != "posix":
+            return
+        try:
+            fd = os.open(self.notes_dir, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _get_upload_bytes(self, app_id: str):
+        """获取待上传的文件内容：优先复用 write_notes 留在内存中的字节，
+        文件已被外部改动（大小或 mtime 不符）时回退为读盘。文件不存在返回 None"""
         path = self._get_note_file(app_id)
-        content = json.dumps(data, ensure_ascii=False, indent=2)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
-        self._dirty_apps.add(app_id)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._write_lock:
+            raw = self._upload_cache.get(app_id)
+            if raw is not None and self._pending_uploads.get(app_id) == (
+                    st.st_size, st.st_mtime_ns):
+                return raw
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
 
     def cloud_upload(self, app_id: str) -> bool:
         """上传指定 app 的笔记到 Steam Cloud，成功后清除 dirty 标记并记录哈希"""
         if not self.cloud_uploader or not self.cloud_uploader.initialized:
             return False
-        path = self._get_note_file(app_id)
-        if not os.path.exists(path):
+        with self._write_lock:
+            if app_id in self._write_buffer:
+                self.flush()
+        raw = self._get_upload_bytes(app_id)
+        if raw is None:
             return False
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
         filename = f"notes_{app_id}"
-        if self.cloud_uploader.file_write(filename, content.encode("utf-8")):
-            self._dirty_apps.discard(app_id)
-            # 记录上传后的文件哈希，用于跨会话检测 dirty
-            self._uploaded_hashes[app_id] = self._compute_file_hash(path)
+        if self.cloud_uploader.file_write(filename, raw):
+            with self._write_lock:
+                # 上传期间又有写入时保留 dirty 标记，只记录云端现在的内容
+                current = (app_id not in self._write_buffer
+                           and self._get_upload_bytes(app_id) == raw)
+                if current:
+                    self._dirty_apps.discard(app_id)
+                    self._forget_pending_upload(app_id)
+                # 记录上传内容的指纹，用于跨会话检测 dirty
+                self._record_uploaded(app_id, raw, on_disk=current)
             return True
         return False
 
-    def cloud_upload_all_dirty(self) -> tuple:
-        """上传所有有改动的笔记到云，返回 (成功数, 失败数)"""
+    def cloud_upload_all_dirty(self, progress_callback=None) -> tuple:
+        """上传所有有改动的笔记到云，返回 (成功数, 失败数)
+
+        progress_callback: 可选 (done, total)，每上传一个游戏调用一次（在调用线程中）
+        """
         ok = fail = 0
-        for app_id in list(self._dirty_apps):
+        app_ids = list(self._dirty_apps)
+        for done, app_id in enumerate(app_ids, 1):
             if self.cloud_upload(app_id):
                 ok += 1
             else:
                 fail += 1
+            if progress_callback:
+                progress_callback(done, len(app_ids))
         return ok, fail
 
     def is_dirty(self, app_id: str) -> bool:
@@ -240,36 +833,137 @@ class SteamNotesManager:
     def dirty_count(self) -> int:
         return len(self._dirty_apps)
 
+    def dirty_app_ids(self) -> set:
+        """有本地改动尚未上传的 app_id 集合（副本）"""
+        return set(self._dirty_apps)
+
+    @staticmethod
+    def _hash_bytes(raw: bytes) -> str:
+        """计算字节内容的摘要（BLAKE2b-64，比 MD5 快，仅用于变更检测）"""
+        return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
     @staticmethod
     def _compute_file_hash(filepath: str) -> str:
-        """计算文件内容的 MD5 哈希"""
+        """计算文件内容的摘要，文件不存在或不可读时返回空字符串"""
         try:
             with open(filepath, "rb") as f:
-                return hashlib.md5(f.read()).hexdigest()
+                return SteamNotesManager._hash_bytes(f.read())
         except Exception:
             return ""
 
-    def _rebuild_dirty_from_hashes(self):
-        """根据持久化的上传哈希与本地文件对比，重建 dirty 状态"""
-        if not os.path.exists(self.notes_dir):
-            return
-        for f in os.listdir(self.notes_dir):
-            fp = os.path.join(self.notes_dir, f)
-            if not os.path.isfile(fp) or not f.startswith("notes_"):
+    def _matches_uploaded(self, app_id: str, raw: bytes, digest: str = None) -> bool:
+        """判断内容是否与上次上传的版本一致（兼容旧版 MD5 字符串记录）"""
+        record = self._uploaded_hashes.get(app_id)
+        if not record:
+            return False
+        if isinstance(record, str):
+            return hashlib.md5(raw).hexdigest() == record
+        return record[2] == (digest or self._hash_bytes(raw))
+
+    def _record_uploaded(self, app_id: str, raw: bytes, on_disk: bool = True):
+        """记录已上传内容的指纹 [size, mtime_ns, digest]，供启动时免读盘比对
+
+        on_disk: raw 已不是磁盘上的当前内容时传 False，此时不记录文件的 stat，
+        下次启动会重新哈希比对（否则改动后的文件会被误判为已同步）。
+        """
+        try:
+            if not on_disk:
+                raise OSError
+            st = os.stat(self._get_note_file(app_id))
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime_ns = len(raw), 0
+        self._uploaded_hashes[app_id] = [size, mtime_ns, self._hash_bytes(raw)]
+
+    def _rebuild_dirty_from_hashes(self) -> bool:
+        """根据持久化的上传指纹与本地文件对比，重建 dirty 状态
+
+        文件大小和 mtime 与记录一致时直接视为未改动，不读取内容；
+        仅 stat 不符或旧版 MD5 记录才重新哈希，命中后升级为新格式指纹。
+        Returns: True 表示有记录被升级（需要持久化，否则下次启动仍要重新哈希）
+        """
+        try:
+            entries = list(os.scandir(self.notes_dir))
+        except OSError:
+            return False
+        self._dirty_apps.clear()
+        upgraded = False
+        for entry in entries:
+            if not entry.name.startswith("notes_") or not entry.is_file():
                 continue
-            app_id = f.replace("notes_", "")
-            local_hash = self._compute_file_hash(fp)
-            stored_hash = self._uploaded_hashes.get(app_id, "")
-            if not stored_hash or local_hash != stored_hash:
-                self._dirty_apps.add(app_id)
+            app_id = entry.name.replace("notes_", "")
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if self._check_file_state(app_id, entry.path, st):
+                upgraded = True
+        return upgraded
 
-    def mark_as_synced(self, app_id: str) -> bool:
-        """手动将指定 app 标记为已同步（记录当前文件哈希，清除 dirty 状态）"""
+    def _check_file_state(self, app_id: str, path: str, st) -> bool:
+        """按上传指纹判断单个笔记文件是否 dirty（stat 一致时不读内容）
+
+        Returns: True 表示内容与上传记录一致、记录已升级为当前 stat 的新格式指纹
+        """
+        record = self._uploaded_hashes.get(app_id)
+        if not record:
+            self._dirty_apps.add(app_id)
+            return False
+        if (not isinstance(record, str) and record[0] == st.st_size
+                and record[1] == st.st_mtime_ns):
+            self._dirty_apps.discard(app_id)
+            return False
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            self._dirty_apps.add(app_id)
+            return False
+        if self._matches_uploaded(app_id, raw):
+            self._uploaded_hashes[app_id] = [
+                st.st_size, st.st_mtime_ns, self._hash_bytes(raw)]
+            self._dirty_apps.discard(app_id)
+            return True
+        self._dirty_apps.add(app_id)
+        return False
+
+    def sync_external_change(self, app_id: str) -> bool:
+        """笔记文件变更通知（来自文件监视）：重新判断该游戏的 dirty 状态
+
+        本程序自身写入引起的变更（文件 stat 与写入/上传时记录的一致）直接忽略。
+        Returns: True 表示确有外部改动（如 Steam 客户端从云端同步、文件被删除）
+        """
         path = self._get_note_file(app_id)
-        if not os.path.exists(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._dirty_apps.discard(app_id)
+            self._forget_pending_upload(app_id)
+            return True
+        stamp = (st.st_size, st.st_mtime_ns)
+        if self._pending_uploads.get(app_id) == stamp:
+            return False
+        record = self._uploaded_hashes.get(app_id)
+        if isinstance(record, list) and tuple(record[:2]) == stamp:
             return False
-        self._uploaded_hashes[app_id] = self._compute_file_hash(path)
-        self._dirty_apps.discard(app_id)
+        self._forget_pending_upload(app_id)
+        self._check_file_state(app_id, path, st)
+        return True
+
+    def mark_as_synced(self, app_id: str) -> bool:
+        """手动将指定 app 标记为已同步（记录当前文件指纹，清除 dirty 状态）"""
+        with self._write_lock:
+            if app_id in self._write_buffer:
+                self.flush()
+            path = self._get_note_file(app_id)
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            except OSError:
+                return False
+            self._record_uploaded(app_id, raw)
+            self._dirty_apps.discard(app_id)
+            self._forget_pending_upload(app_id)
         return True
 
     def get_uploaded_hashes(self) -> dict:
@@ -277,44 +971,33 @@ class SteamNotesManager:
         return dict(self._uploaded_hashes)
 
     def create_note(self, app_id: str, title: str, content: str) -> dict:
-        """创建一条笔记（始终追加）"""
-        entry = self._build_entry(app_id, title, content)
-        data = self.read_notes(app_id)
-        data["notes"].append(entry)
-        self.write_notes(app_id, data)
-        return self.read_notes(app_id)
+        """创建一条笔记（始终追加），返回写入后的笔记数据"""
+        with self.edit(app_id) as tx:
+            tx.create_note(title, content)
+        return tx.data
 
     def update_note(self, app_id: str, index: int, title: str, content: str):
         """更新指定索引的笔记"""
-        data = self.read_notes(app_id)
-        notes = data.get("notes", [])
-        if 0 <= index < len(notes):
-            notes[index]["title"] = title
-            notes[index]["content"] = self._wrap_content(content)
-            notes[index]["time_modified"] = int(time.time())
-            self.write_notes(app_id, data)
-            return True
-        return False
+        with self.edit(app_id) as tx:
+            return tx.update_note(index, title, content)
 
     def delete_note(self, app_id: str, index: int) -> bool:
         """删除指定索引的笔记
         
         Returns: True if deleted, False if invalid index
         """
-        data = self.read_notes(app_id)
-        notes = data.get("notes", [])
-        if 0 <= index < len(notes):
-            notes.pop(index)
-            self.write_notes(app_id, data)
-            return True
-        return False
+        with self.edit(app_id) as tx:
+            return tx.delete_note(index)
 
     def delete_all_notes(self, app_id: str) -> bool:
         """删除指定游戏的所有笔记"""
+        with self._write_lock:
+            self._write_buffer.pop(app_id, None)
         path = self._get_note_file(app_id)
         if os.path.exists(path):
             os.remove(path)
             self._dirty_apps.discard(app_id)
+            self._forget_pending_upload(app_id)
             # 同时从 Steam Cloud 删除
             if self.cloud_uploader and self.cloud_uploader.initialized:
                 self.cloud_uploader.file_delete(f"notes_{app_id}")
@@ -326,21 +1009,12 @@ class SteamNotesManager:
         
         Returns: True if moved, False if invalid move
         """
-        data = self.read_notes(app_id)
-        notes = data.get("notes", [])
-        new_index = index + direction
-        
-        # 检查索引是否有效
-        if not (0 <= index < len(notes) and 0 <= new_index < len(notes)):
-            return False
-        
-        # 执行移动
-        notes[index], notes[new_index] = notes[new_index], notes[index]
-        self.write_notes(app_id, data)
-        return True
+        with self.edit(app_id) as tx:
+            return tx.move_note(index, direction)
 
     def list_all_games(self) -> list:
         """列出所有有笔记的游戏 [{app_id, note_count, file_path}]"""
+        self.flush()
         if not os.path.exists(self.notes_dir):
             return []
         result = []
@@ -377,130 +1051,297 @@ class SteamNotesManager:
             with open(output_path, "w", encoding="utf-8") as f:
                 f.write(note.get("content", ""))
 
-    def export_batch(self, app_ids: list, output_path: str, note_filter=None):
+    def iter_notes_parallel(self, app_ids, note_filter=None,
+                            workers: int = _EXPORT_WORKERS):
+        """多线程预读笔记文件，按 app_ids 的顺序产出 (app_id, notes)
+
+        note_filter: 可选的过滤函数，接受 note dict，返回 True 表示保留（在工作线程中执行）
+        同时在途的读取不超过 workers * 4 个，已读未取走的结果数量有上限，与游戏总数无关。
+        """
+        app_ids = list(app_ids)
+        if not app_ids:
+            return
+
+        def _load(app_id):
+            notes = self.read_notes(app_id).get("notes", [])
+            if note_filter:
+                notes = [n for n in notes if note_filter(n)]
+            return notes
+
+        ahead = max(1, workers) * 4
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(app_ids)))) as pool:
+            pending = deque()
+            next_index = 0
+            while pending or next_index < len(app_ids):
+                while next_index < len(app_ids) and len(pending) < ahead:
+                    app_id = app_ids[next_index]
+                    pending.append((app_id, pool.submit(_load, app_id)))
+                    next_index += 1
+                app_id, future = pending.popleft()
+                yield app_id, future.result()
+
+    @classmethod
+    def format_batch_section(cls, app_id: str, notes: list) -> str:
+        """单个游戏在批量导出文件中的完整文本段"""
+        parts = [f"{cls.BATCH_APP_HEADER}{app_id}===\n",
+                 f"# 笔记数量: {len(notes)}\n\n"]
+        for i, note in enumerate(notes):
+            if i > 0:
+                parts.append(f"\n{cls.BATCH_NOTE_SEP}\n\n")
+            parts.append(f"## {note.get('title', '(无标题)')}\n\n")
+            parts.append(note.get("content", "") + "\n")
+        parts.append("\n")
+        return "".join(parts)
+
+    def export_batch(self, app_ids: list, output_path: str, note_filter=None,
+                     progress_callback=None) -> tuple:
         """批量导出多个游戏的笔记为一个结构化文件
         note_filter: 可选的过滤函数，接受 note dict，返回 True 表示导出
+        progress_callback: 可选 (done, total)，每处理完一个游戏调用一次（在调用线程中）
+        output_path 以 .gz / .zst 结尾时输出压缩文件（导入时自动识别）。
+        笔记文件由线程池并行读取，每个游戏的文本段拼好后一次写入大缓冲。
+        先写入同目录临时文件，完成后才替换 output_path；失败或取消时不留下不完整的文件。
+        Returns: (导出的游戏数, 导出的笔记数)
+        """
+        total = len(app_ids)
+        n_apps = 0
+        n_notes = 0
+        with _atomic_output(output_path) as tmp_path, open_batch_text(tmp_path, "w") as f:
+            f.write(f"{self.BATCH_EXPORT_HEADER}\n"
+                    f"# 导出时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                    f"# 包含游戏数: {total}\n\n")
+            for done, (app_id, notes) in enumerate(
+                    self.iter_notes_parallel(app_ids, note_filter), 1):
+                if notes:
+                    f.write(self.format_batch_section(app_id, notes))
+                    n_apps += 1
+                    n_notes += len(notes)
+                if progress_callback:
+                    progress_callback(done, total)
+        return n_apps, n_notes
+
+    def import_single_note(self, app_id: str, title: str, file_path: str,
+                           skip_identical: bool = False):
+        """从文件导入单条笔记（始终追加），返回写入后的笔记数据
+
+        skip_identical: 已有标题和内容与文件完全相同的笔记时不导入，返回 None
         """
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(f"{self.BATCH_EXPORT_HEADER}\n")
-            f.write(f"# 导出时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# 包含游戏数: {len(app_ids)}\n\n")
-
-            for app_id in app_ids:
-                data = self.read_notes(app_id)
-                notes = data.get("notes", [])
-                if note_filter:
-                    notes = [n for n in notes if note_filter(n)]
-                if not notes:
-                    continue
-                f.write(f"{self.BATCH_APP_HEADER}{app_id}===\n")
-                f.write(f"# 笔记数量: {len(notes)}\n\n")
-                for i, note in enumerate(notes):
-                    if i > 0:
-                        f.write(f"\n{self.BATCH_NOTE_SEP}\n\n")
-                    f.write(f"## {note.get('title', '(无标题)')}\n\n")
-                    f.write(note.get("content", "") + "\n")
-                f.write("\n")
-
-    def import_single_note(self, app_id: str, title: str, file_path: str) -> dict:
-        """从文件导入单条笔记（始终追加）"""
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
-        entry = self._build_entry(app_id, title, content)
-        data = self.read_notes(app_id)
-        data["notes"].append(entry)
-        self.write_notes(app_id, data)
-        # 重新读取以返回最新数据
-        return self.read_notes(app_id)
+        same = (content, self._wrap_content(content))
+        with self.edit(app_id) as tx:
+            if skip_identical and any(
+                    n.get("title", "") == title and n.get("content", "") in same
+                    for n in tx.notes):
+                return None
+            tx.create_note(title, content)
+        return tx.data
 
     def import_batch(self, file_path: str) -> dict:
         """从批量导出文件导入笔记（始终追加，按 AppID 自动分发）
         Returns: {app_id: count, ...}
         """
-        parsed = self.parse_batch_file(file_path)
-        return self.apply_batch_import(parsed)
+        return self.apply_batch_import(BatchFile(file_path))
+
+    # 流式导入时每批处理的游戏数（每批一次 buffered() 落盘，写缓冲大小随之受限）
+    BATCH_IMPORT_CHUNK = 200
+
+    @staticmethod
+    def iter_batch_file(file_path: str):
+        """逐行流式解析批量导出文件（支持 .gz / .zst），每读完一条笔记产出一次 (app_id, entry)
+
+        entry 为 {title, content}（原始文本，尚未 build_entry）。
+        内存中只保留当前这一条笔记的行，与文件总大小无关。
+        解析规则与整体读取时一致：「# 」开头的行为注释，块内第一个「## 」行为标题，
+        其余行去除首尾空白后为正文；没有标题的块忽略。
+        """
+        app_id = None
+        title = None
+        lines = []
+        started = False  # 当前块是否已出现非空行
+
+        def _entry():
+            if app_id is None or not title:
+                return None
+            return app_id, {"title": title, "content": '\n'.join(lines).strip()}
+
+        with open_batch_text(file_path) as f:
+            for line in f:
+                line = line.rstrip('\n')
+                m = _BATCH_APP_RE.match(line)
+                if m or line.strip() == SteamNotesManager.BATCH_NOTE_SEP:
+                    item = _entry()
+                    if item:
+                        yield item
+                    if m:
+                        app_id = m.group(1)
+                    title = None
+                    lines = []
+                    started = False
+                    continue
+                if app_id is None:
+                    continue
+                if not started:
+                    if not line.strip():
+                        continue
+                    line = line.lstrip()
+                    started = True
+                if line.startswith('# '):
+                    continue
+                if line.startswith('## ') and title is None:
+                    title = line[3:].strip()
+                    continue
+                lines.append(line)
+        item = _entry()
+        if item:
+            yield item
+
+    @staticmethod
+    def iter_batch_chunks(source, chunk_size: int = None):
+        """将 (app_id, entry) 流按游戏分组，每凑满 chunk_size 个游戏产出一个 {app_id: [entry, ...]}
+
+        source: iter_batch_file() / BatchFile 等 (app_id, entry) 可迭代对象，
+                也可以是 {app_id: [entry, ...]} 字典（按原样整体产出）
+        连续属于同一游戏的条目不会被拆到两批中。
+        """
+        if isinstance(source, dict):
+            if source:
+                yield source
+            return
+        if chunk_size is None:
+            chunk_size = SteamNotesManager.BATCH_IMPORT_CHUNK
+        chunk = {}
+        last = None
+        for app_id, entry in source:
+            if app_id != last and app_id not in chunk and len(chunk) >= chunk_size:
+                yield chunk
+                chunk = {}
+            chunk.setdefault(app_id, []).append(entry)
+            last = app_id
+        if chunk:
+            yield chunk
 
     @staticmethod
     def parse_batch_file(file_path: str) -> dict:
-        """解析批量导出文件但不写入。
+        """解析批量导出文件但不写入（整体读入内存；大文件请用 iter_batch_file / BatchFile）
         Returns: {app_id: [entry_dict, ...], ...}
         每个 entry_dict 包含 title, content (原始文本，尚未 build_entry)
         """
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
         result = {}
-        app_sections = re.split(r'===APP_ID:(\S+?)===', content)
-        i = 1
-        while i < len(app_sections) - 1:
-            app_id = app_sections[i].strip()
-            section = app_sections[i + 1]
-            i += 2
-
-            note_blocks = section.split(SteamNotesManager.BATCH_NOTE_SEP)
-            entries = []
-            for block in note_blocks:
-                lines = block.strip().split('\n')
-                title = None
-                content_lines = []
-                for line in lines:
-                    if line.startswith('# '):
-                        continue
-                    if line.startswith('## ') and title is None:
-                        title = line[3:].strip()
-                        continue
-                    content_lines.append(line)
-                body = '\n'.join(content_lines).strip()
-                if title and body:
-                    entries.append({"title": title, "content": body})
-                elif title:
-                    entries.append({"title": title, "content": ""})
+        for app_id, entry in SteamNotesManager.iter_batch_file(file_path):
+            result.setdefault(app_id, []).append(entry)
+        return result
 
-            if entries:
-                result[app_id] = entries
+    def iter_new_entries(self, source, skipped: dict = None):
+        """过滤掉标题+内容与已有笔记完全相同的条目（字面重复检测），产出其余 (app_id, entry)
 
-        return result
+        source: (app_id, entry) 可迭代对象；skipped: 可选的 {app_id: 跳过数量}，就地累加
+        比对的是指纹索引（note_index），文件未变化的游戏不会被重新读取。
+        """
+        current = None
+        existing = frozenset()
+        for app_id, entry in source:
+            if app_id != current:
+                current = app_id
+                index = self.note_index(app_id)
+                existing = index.fingerprint_set if index is not None else frozenset()
+            if existing and note_fingerprint(entry["title"], entry["content"]) in existing:
+                if skipped is not None:
+                    skipped[app_id] = skipped.get(app_id, 0) + 1
+                continue
+            yield app_id, entry
+
+    def plan_batch_import(self, source, mode: str = "ai") -> dict:
+        """导入前的冲突检测（只读不写，可在后台线程执行）
+
+        source: BatchFile 或其他 (app_id, entry) 可迭代对象
+        mode:
+            "ai"      — AI 笔记冲突检测：导入条目含 AI 笔记、且指纹索引显示本地也有
+                        AI 笔记的游戏才读取笔记文件，得到 conflicts
+            "literal" — 字面重复检测：按指纹统计 skipped 与 n_new
+        Returns: {"n_apps", "n_entries",
+                  "conflicts": {app_id: {existing_ai: [note_dict], incoming_ai: [entry_dict]}},
+                  "skipped": {app_id: 跳过数量}, "n_new": 不重复的条目数}
+        """
+        plan = {"n_apps": 0, "n_entries": 0, "conflicts": {}, "skipped": {}, "n_new": 0}
+        if mode == "literal":
+            apps = set()
+            for app_id, _ in self.iter_new_entries(source, plan["skipped"]):
+                apps.add(app_id)
+                plan["n_new"] += 1
+            apps.update(plan["skipped"])
+            plan["n_apps"] = len(apps)
+            plan["n_entries"] = plan["n_new"] + sum(plan["skipped"].values())
+            return plan
+
+        conflicts = plan["conflicts"]
+        for chunk in self.iter_batch_chunks(source):
+            for app_id, entries in chunk.items():
+                plan["n_apps"] += 1
+                plan["n_entries"] += len(entries)
+                incoming_ai = [e for e in entries if note_meta(e)[0]]
+                if not incoming_ai:
+                    continue
+                index = self.note_index(app_id)
+                if index is None or not index.has_ai:
+                    continue
+                existing = self.read_notes(app_id).get("notes", [])
+                existing_ai = [n for n in existing if is_ai_note(n)]
+                if existing_ai:
+                    conflicts[app_id] = {
+                        "existing_ai": existing_ai,
+                        "incoming_ai": incoming_ai,
+                    }
+        return plan
 
-    def apply_batch_import(self, parsed: dict, ai_policy: str = "append",
-                           per_app_policy: dict = None) -> dict:
+    def apply_batch_import(self, parsed, ai_policy: str = "append",
+                           per_app_policy: dict = None, progress_callback=None) -> dict:
         """将解析后的数据写入笔记文件。
-        parsed: {app_id: [{title, content}, ...]}
+        parsed: {app_id: [{title, content}, ...]}，或 iter_batch_file() / BatchFile
+                产出的 (app_id, entry) 流（按 BATCH_IMPORT_CHUNK 个游戏一批写入）
         ai_policy: 全局 AI 冲突策略
             "append"  — AI 笔记追加在已有笔记之后
             "replace" — 删除已有 AI 笔记，再写入新 AI 笔记
             "skip_ai" — 跳过导入文件中的 AI 笔记（仅导入非 AI 笔记）
         per_app_policy: {app_id: "replace"/"append"/"skip"} 逐一覆盖全局策略
+        progress_callback: 可选 (已写入的游戏数, 总数)，每批落盘后调用一次（在调用线程中）；
+            parsed 为流时总数未知，传 0。回调抛出异常即中止导入，已落盘的批次保留。
         Returns: {app_id: imported_count, ...}
         """
         if per_app_policy is None:
             per_app_policy = {}
         results = {}
-
-        for app_id, entries in parsed.items():
-            policy = per_app_policy.get(app_id, ai_policy)
-            data = self.read_notes(app_id)
-            existing = data.get("notes", [])
-
-            to_import = []
-            for e in entries:
-                note = self._build_entry(app_id, e["title"], e["content"])
-                is_ai = is_ai_note(note)
-                if is_ai and policy == "skip_ai":
-                    continue
-                to_import.append((note, is_ai))
-
-            if policy == "replace":
-                # 移除已有 AI 笔记
-                existing = [n for n in existing if not is_ai_note(n)]
-
-            for note, _ in to_import:
-                existing.append(note)
-
-            data["notes"] = existing
-            self.write_notes(app_id, data)
-            imported = len(to_import)
-            if imported > 0:
-                results[app_id] = imported
+        replaced = set()  # 已清理过旧 AI 笔记的游戏（同一游戏分在多批时只清理一次）
+        total = len(parsed) if isinstance(parsed, dict) else 0
+        done = 0
+
+        for chunk in self.iter_batch_chunks(parsed):
+            with self.buffered():
+                for app_id, entries in chunk.items():
+                    policy = per_app_policy.get(app_id, ai_policy)
+                    to_import = []
+                    for e in entries:
+                        note = self._build_entry(app_id, e["title"], e["content"])
+                        is_ai = is_ai_note(note)
+                        if is_ai and policy == "skip_ai":
+                            continue
+                        to_import.append((note, is_ai))
+
+                    # 读改写放在事务内，避免与其他窗口同时保存的笔记互相覆盖
+                    with self.edit(app_id) as tx:
+                        if policy == "replace" and app_id not in replaced:
+                            # 移除已有 AI 笔记
+                            tx.remove_notes(is_ai_note)
+                            replaced.add(app_id)
+                        if to_import:
+                            tx.notes.extend(note for note, _ in to_import)
+                            tx.changed = True
+                    imported = len(to_import)
+                    if imported > 0:
+                        results[app_id] = results.get(app_id, 0) + imported
+            done += len(chunk)
+            if progress_callback:
+                progress_callback(done, total)
 
         return results
 
@@ -514,41 +1355,147 @@ class SteamNotesManager:
             sanitized = "untitled"
         return sanitized[:200]  # 限制长度
 
+    @staticmethod
+    def _claim_filename(base: str, taken: set, next_suffix: dict) -> str:
+        """为 base 找一个未占用的文件名（不含 .txt）并登记到 taken
+
+        taken 为已占用的小写文件名集合（忽略大小写，兼容 Windows/macOS 文件系统），
+        同名时依次追加 _1、_2…；next_suffix 记录每个 base 下一次尝试的序号，避免重复探测。
+        """
+        key = base.lower()
+        n = next_suffix.get(key, 0)
+        name = base if n == 0 else f"{base}_{n}"
+        while f"{name}.txt".lower() in taken:
+            n += 1
+            name = f"{base}_{n}"
+        next_suffix[key] = n + 1
+        taken.add(f"{name}.txt".lower())
+        return name
+
     def export_individual_files(self, app_ids: list, output_dir: str,
-                               note_filter=None) -> tuple:
+                               note_filter=None, progress_callback=None,
+                               as_zip: bool = False) -> tuple:
         """逐条导出：每条笔记导出为独立 txt 文件（文件名=笔记标题，内容=BBCode 源码）
 
         note_filter: 可选的过滤函数，接受 note dict，返回 True 表示导出
-        为避免文件名冲突，同名笔记自动追加序号后缀。
+        progress_callback: 可选 (done, total)，每处理完一个游戏调用一次（在调用线程中）
+        as_zip: 为 True 时 output_dir 是 zip 文件路径，写入单个 zip 文件（每条笔记一个成员）。
+        文件名在写入前统一规划：与目录中已有的文件及本次导出的其他笔记同名（忽略大小写）时
+        自动追加序号后缀，不会覆盖已有文件；目录模式下由线程池并行写入。
         Returns: (total_files: int, total_notes: int)
         """
+        if as_zip:
+            return self._export_individual_zip(app_ids, output_dir, note_filter,
+                                               progress_callback)
         os.makedirs(output_dir, exist_ok=True)
-        used_names = {}  # {safe_name: count} 用于去重
+        taken = {name.lower() for name in os.listdir(output_dir)}
+        next_suffix = {}
+        names_lock = threading.Lock()
+
+        def _write(base, name, content):
+            # 以独占方式创建；规划之后才出现的同名文件同样不覆盖，改用下一个序号
+            while True:
+                path = os.path.join(output_dir, f"{name}.txt")
+                try:
+                    with open(path, "x", encoding="utf-8") as f:
+                        f.write(content)
+                    return
+                except FileExistsError:
+                    with names_lock:
+                        name = self._claim_filename(base, taken, next_suffix)
+
         total_files = 0
         total_notes = 0
-        for app_id in app_ids:
-            data = self.read_notes(app_id)
-            notes = data.get("notes", [])
-            if note_filter:
-                notes = [n for n in notes if note_filter(n)]
-            for note in notes:
-                total_notes += 1
-                title = note.get("title", "untitled")
-                content = note.get("content", title)
-                safe_name = self.sanitize_filename(title)
-                # 去重：如果同名则追加序号
-                if safe_name in used_names:
-                    used_names[safe_name] += 1
-                    final_name = f"{safe_name}_{used_names[safe_name]}"
-                else:
-                    used_names[safe_name] = 0
-                    final_name = safe_name
-                filepath = os.path.join(output_dir, f"{final_name}.txt")
-                with open(filepath, "w", encoding="utf-8") as f:
-                    f.write(content)
-                total_files += 1
+        total = len(app_ids)
+        ahead = _EXPORT_WORKERS * 4
+        with ThreadPoolExecutor(max_workers=_EXPORT_WORKERS) as pool:
+            pending = deque()
+            for done, (app_id, notes) in enumerate(
+                    self.iter_notes_parallel(app_ids, note_filter), 1):
+                for note in notes:
+                    total_notes += 1
+                    title = note.get("title", "untitled")
+                    content = note.get("content", title)
+                    base = self.sanitize_filename(title)
+                    with names_lock:
+                        name = self._claim_filename(base, taken, next_suffix)
+                    if len(pending) >= ahead:
+                        pending.popleft().result()
+                    pending.append(pool.submit(_write, base, name, content))
+                    total_files += 1
+                if progress_callback:
+                    progress_callback(done, total)
+            while pending:
+                pending.popleft().result()
         return total_files, total_notes
 
+    def _export_individual_zip(self, app_ids: list, zip_path: str, note_filter=None,
+                               progress_callback=None) -> tuple:
+        """逐条导出到单个 zip 文件，成员名规则与目录模式相同（同样先写临时文件再替换）"""
+        taken = set()
+        next_suffix = {}
+        total_files = 0
+        total_notes = 0
+        total = len(app_ids)
+        with _atomic_output(zip_path) as tmp_path, zipfile.ZipFile(
+                tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for done, (app_id, notes) in enumerate(
+                    self.iter_notes_parallel(app_ids, note_filter), 1):
+                for note in notes:
+                    total_notes += 1
+                    title = note.get("title", "untitled")
+                    content = note.get("content", title)
+                    name = self._claim_filename(self.sanitize_filename(title),
+                                                taken, next_suffix)
+                    zf.writestr(f"{name}.txt", content)
+                    total_files += 1
+                if progress_callback:
+                    progress_callback(done, total)
+        return total_files, total_notes
+
+    @staticmethod
+    def summarize_ai_notes(notes: list):
+        """汇总单个游戏的 AI 笔记信息（scan_ai_notes 的单游戏版本），没有 AI 笔记返回 None"""
+        models = []
+        indices = []
+        confidences = []
+        info_volumes = []
+        info_sources = []
+        qualities = []
+        has_insufficient = False
+        for i, note in enumerate(notes):
+            if is_ai_note(note):
+                model = extract_ai_model_from_note(note)
+                if model and model not in models:
+                    models.append(model)
+                conf = extract_ai_confidence_from_note(note)
+                if conf and conf not in confidences:
+                    confidences.append(conf)
+                vol = extract_ai_info_volume_from_note(note)
+                if vol and vol not in info_volumes:
+                    info_volumes.append(vol)
+                src = extract_ai_info_source_from_note(note)
+                if src and src not in info_sources:
+                    info_sources.append(src)
+                qual = extract_ai_quality_from_note(note)
+                if qual and qual not in qualities:
+                    qualities.append(qual)
+                if is_insufficient_info_note(note):
+                    has_insufficient = True
+                indices.append(i)
+        if not indices:
+            return None
+        return {
+            'models': models,
+            'note_indices': indices,
+            'note_count': len(indices),
+            'confidences': confidences,
+            'info_volumes': info_volumes,
+            'info_sources': info_sources,
+            'qualities': qualities,
+            'has_insufficient': has_insufficient,
+        }
+
     def scan_ai_notes(self) -> dict:
         """扫描所有笔记，识别 AI 处理过的游戏
 
@@ -557,6 +1504,7 @@ class SteamNotesManager:
                             'info_sources': [str], 'qualities': [str],
                             'has_insufficient': bool}, ...}
         """
+        self.flush()
         result = {}
         if not os.path.exists(self.notes_dir):
             return result
@@ -567,68 +1515,42 @@ class SteamNotesManager:
             app_id = f.replace("notes_", "")
             try:
                 with open(fp, "r", encoding="utf-8") as fh:
+                    st = os.fstat(fh.fileno())
                     data = json.load(fh)
-                notes = data.get("notes", [])
-                models = []
-                indices = []
-                confidences = []
-                info_volumes = []
-                info_sources = []
-                qualities = []
-                has_insufficient = False
-                for i, note in enumerate(notes):
-                    if is_ai_note(note):
-                        model = extract_ai_model_from_note(note)
-                        if model and model not in models:
-                            models.append(model)
-                        conf = extract_ai_confidence_from_note(note)
-                        if conf and conf not in confidences:
-                            confidences.append(conf)
-                        vol = extract_ai_info_volume_from_note(note)
-                        if vol and vol not in info_volumes:
-                            info_volumes.append(vol)
-                        src = extract_ai_info_source_from_note(note)
-                        if src and src not in info_sources:
-                            info_sources.append(src)
-                        qual = extract_ai_quality_from_note(note)
-                        if qual and qual not in qualities:
-                            qualities.append(qual)
-                        if is_insufficient_info_note(note):
-                            has_insufficient = True
-                        indices.append(i)
-                if indices:
-                    result[app_id] = {
-                        'models': models,
-                        'note_indices': indices,
-                        'note_count': len(indices),
-                        'confidences': confidences,
-                        'info_volumes': info_volumes,
-                        'info_sources': info_sources,
-                        'qualities': qualities,
-                        'has_insufficient': has_insufficient,
-                    }
+                self._notes_index.put(app_id, data.get("notes", []),
+                                      (st.st_size, st.st_mtime_ns))
+                info = self.summarize_ai_notes(data.get("notes", []))
+                if info:
+                    result[app_id] = info
             except Exception:
                 continue
         return result
 
-    def find_duplicate_notes(self) -> list:
+    def find_duplicate_notes(self, progress_callback=None) -> list:
         """扫描所有笔记，找到标题+内容完全相同的重复项。
 
+        progress_callback: 可选 (done, total)，开始处理每个文件时调用一次（在调用线程中）
         Returns: [{app_id, title, content, indices: [int], count: int}, ...]
         每个条目代表一组重复笔记（同一游戏内），indices 为该组所有副本的索引。
         """
+        self.flush()
         duplicates = []
         if not os.path.exists(self.notes_dir):
             return duplicates
-        for f in os.listdir(self.notes_dir):
+        names = os.listdir(self.notes_dir)
+        for done, f in enumerate(names, 1):
+            if progress_callback:
+                progress_callback(done, len(names))
             fp = os.path.join(self.notes_dir, f)
             if not os.path.isfile(fp) or not f.startswith("notes_"):
                 continue
             app_id = f.replace("notes_", "")
             try:
                 with open(fp, "r", encoding="utf-8") as fh:
+                    st = os.fstat(fh.fileno())
                     data = json.load(fh)
                 notes = data.get("notes", [])
+                self._notes_index.put(app_id, notes, (st.st_size, st.st_mtime_ns))
                 # 按 (title, content) 分组
                 seen = {}  # {(title, content): [index, ...]}
                 for i, note in enumerate(notes):
@@ -649,6 +1571,79 @@ class SteamNotesManager:
                 continue
         return duplicates
 
+    def find_similar_notes(self, threshold: float = note_similarity.DEFAULT_THRESHOLD,
+                           progress_callback=None) -> list:
+        """跨游戏（含同一游戏内）的近似重复笔记检测
+
+        每条笔记的 MinHash 签名保存在笔记索引中，文件未变化时不重新读取与计算；
+        候选对由 LSH 分桶得到，不做两两比较。
+        threshold: 估计 Jaccard 相似度下限（0~1）
+        progress_callback: 可选 (done, total)，每处理完一个笔记文件调用一次（在调用线程中）
+        Returns: [{'members': [{'app_id', 'index', 'title', 'preview', 'fingerprint',
+                                'similarity'}], 'count': int}, ...]
+        每个条目为一簇，members[0] 为簇首，similarity 为与簇首的相似度估计；
+        preview 为去除标签后的正文前 300 字，fingerprint 为 note_fingerprint（供删除前核对）。
+        """
+        self.flush()
+        try:
+            names = [f for f in sorted(os.listdir(self.notes_dir))
+                     if f.startswith("notes_")]
+        except OSError:
+            return []
+        items = []
+        for done, f in enumerate(names, 1):
+            app_id = f.replace("notes_", "")
+            index = self._notes_index.get(app_id, os.path.join(self.notes_dir, f),
+                                          signatures=True)
+            if index is not None:
+                items.extend(((app_id, i), sig) for i, sig in enumerate(index.signatures))
+            if progress_callback:
+                progress_callback(done, len(names))
+
+        clusters = []
+        app_notes = {}  # {app_id: [笔记]}，只为结果中出现的游戏读取
+        for cluster in note_similarity.find_clusters(items, threshold):
+            members = []
+            for (app_id, i), sim in cluster:
+                if app_id not in app_notes:
+                    app_notes[app_id] = self.read_notes(app_id).get("notes", [])
+                notes = app_notes[app_id]
+                note = notes[i] if i < len(notes) else {}
+                title = note.get("title", "") or ""
+                content = note.get("content", "") or ""
+                members.append({
+                    'app_id': app_id,
+                    'index': i,
+                    'title': title,
+                    'preview': bbcode_parser.strip_tags(content)[:300],
+                    'fingerprint': note_fingerprint(title, content) if note else None,
+                    'similarity': sim,
+                })
+            clusters.append({'members': members, 'count': len(members)})
+        return clusters
+
+    def delete_notes_by_fingerprint(self, targets) -> int:
+        """按 (app_id, 笔记索引, 指纹) 批量删除笔记
+
+        删除前重新读取文件，只删除该索引处指纹仍一致的笔记；检测之后文件被改动
+        （笔记已移动、修改或删除）的条目跳过，不会误删其他笔记。
+        Returns: 实际删除的数量
+        """
+        by_app = {}
+        for app_id, index, fingerprint in targets:
+            by_app.setdefault(app_id, []).append((index, fingerprint))
+        removed = 0
+        for app_id, wanted in by_app.items():
+            with self._write_lock:
+                notes = self.read_notes(app_id).get("notes", [])
+                indices = [i for i, fp in wanted
+                           if fp is not None and 0 <= i < len(notes)
+                           and note_fingerprint(notes[i].get("title", "") or "",
+                                                notes[i].get("content", "") or "") == fp]
+                if indices:
+                    removed += self.delete_duplicate_notes(app_id, indices)
+        return removed
+
     def delete_duplicate_notes(self, app_id: str, indices_to_remove: list) -> int:
         """删除指定游戏中的重复笔记（按索引列表，从大到小删除避免索引偏移）
 
@@ -667,10 +1662,13 @@ class SteamNotesManager:
                 self.write_notes(app_id, data)
             else:
                 # 没有笔记了，删除文件
+                with self._write_lock:
+                    self._write_buffer.pop(app_id, None)
                 path = self._get_note_file(app_id)
                 if os.path.exists(path):
                     os.remove(path)
                 self._dirty_apps.discard(app_id)
+                self._forget_pending_upload(app_id)
                 if self.cloud_uploader and self.cloud_uploader.initialized:
                     self.cloud_uploader.file_delete(f"notes_{app_id}")
         return removed
@@ -0,0 +1,245 @@
+"""文件系统监视 — Linux 上使用 inotify（ctypes 直接调用 libc），其他平台退化为 stat 轮询
+
+用法：
+    watcher = create_watcher(callback)
+    watcher.watch_dir(notes_dir)                        # 目录下任意文件
+    watcher.watch_file(remotecache_path)                # 单个文件（监视其所在目录并按文件名过滤）
+    watcher.start()
+    ...
+    watcher.stop()
+
+callback(path, kind) 在监视线程中调用，kind 为 "changed" / "deleted" / "overflow"：
+  changed  — 文件被创建、写入完成或重命名到此
+  deleted  — 文件被删除或重命名离开
+  overflow — 事件队列溢出（或无法继续监视），path 为目录，调用方应对该目录全量重扫
+监视的是目录而不是文件本身，因此原子替换（写临时文件再 rename）同样能被捕获。
+
+纯数据层模块，无 UI 依赖；UI 回调需自行切回主线程。
+"""
+
+import os
+import select
+import struct
+import sys
+import threading
+
+try:
+    import ctypes
+    import ctypes.util
+    _HAS_CTYPES = True
+except ImportError:
+    _HAS_CTYPES = False
+
+CHANGED = "changed"
+DELETED = "deleted"
+OVERFLOW = "overflow"
+
+
+class _BaseWatcher:
+    """监视目标登记：{目录: 文件名集合 或 None(目录内全部文件)}"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def watch_dir(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._targets[path] = None
+        self._on_target_added(path)
+
+    def watch_file(self, path: str):
+        path = os.path.abspath(path)
+        d, name = os.path.split(path)
+        with self._lock:
+            names = self._targets.get(d, set())
+            if names is None:
+                return  # 整个目录已在监视中
+            names.add(name)
+            self._targets[d] = names
+        self._on_target_added(d)
+
+    def _wants(self, directory: str, name: str) -> bool:
+        names = self._targets.get(directory, ())
+        return names is None or name in names
+
+    def _emit(self, path: str, kind: str):
+        try:
+            self.callback(path, kind)
+        except Exception as e:
+            print(f"[文件监视] 回调异常: {e}")
+
+    def _on_target_added(self, directory: str):
+        pass
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class PollingWatcher(_BaseWatcher):
+    """stat 轮询：每 interval 秒对比一次目录内文件的 (size, mtime_ns)"""
+
+    def __init__(self, callback, interval: float = 2.0):
+        super().__init__(callback)
+        self.interval = interval
+        self._snapshots = {}  # {目录: {文件名: (size, mtime_ns)}}
+
+    def _scan(self, directory: str) -> dict:
+        snap = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not self._wants(directory, entry.name):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if not entry.is_dir():
+                        snap[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            pass
+        return snap
+
+    def _on_target_added(self, directory: str):
+        snap = self._scan(directory)
+        with self._lock:
+            self._snapshots[directory] = snap
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                directories = list(self._targets)
+            for directory in directories:
+                new = self._scan(directory)
+                old = self._snapshots.get(directory, {})
+                self._snapshots[directory] = new
+                for name, stamp in new.items():
+                    if old.get(name) != stamp:
+                        self._emit(os.path.join(directory, name), CHANGED)
+                for name in old.keys() - new.keys():
+                    self._emit(os.path.join(directory, name), DELETED)
+
+
+# inotify 常量（<sys/inotify.h>）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+               | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _load_libc():
+    if not _HAS_CTYPES or not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyWatcher(_BaseWatcher):
+    """Linux inotify：按目录注册监视，事件由内核推送，无轮询开销"""
+
+    def __init__(self, callback, libc):
+        super().__init__(callback)
+        self._libc = libc
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._wd_dirs = {}  # {wd: 目录}
+
+    def _on_target_added(self, directory: str):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            # 目录暂不存在等情况：无法监视，交由调用方的全量刷新兜底
+            return
+        with self._lock:
+            self._wd_dirs[wd] = directory
+
+    def stop(self):
+        started = self._thread is not None
+        super().stop()
+        if not started and self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 0.5)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._dispatch(data)
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _dispatch(self, data: bytes):
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            if mask & _IN_Q_OVERFLOW:
+                with self._lock:
+                    dirs = list(self._wd_dirs.values())
+                for directory in dirs:
+                    self._emit(directory, OVERFLOW)
+                continue
+            directory = self._wd_dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                with self._lock:
+                    self._wd_dirs.pop(wd, None)
+                self._emit(directory, OVERFLOW)
+                continue
+            if not name or mask & _IN_ISDIR or not self._wants(directory, name):
+                continue
+            kind = DELETED if mask & (_IN_DELETE | _IN_MOVED_FROM) else CHANGED
+            self._emit(os.path.join(directory, name), kind)
+
+
+def create_watcher(callback, poll_interval: float = 2.0):
+    """创建当前平台可用的最佳监视器：inotify 优先，不可用时退化为 stat 轮询"""
+    libc = _load_libc()
+    if libc is not None:
+        try:
+            return InotifyWatcher(callback, libc)
+        except OSError:
+            pass
+    return PollingWatcher(callback, poll_interval)
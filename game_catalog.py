@@ -0,0 +1,208 @@
+"""游戏目录 — 以整数 AppID 为键的紧凑游戏表 + 成员集合
+
+游戏表：并行的 array('I') AppID 与驻留（sys.intern）后的名称列表，
+AppID → 行号 字典用于去重与按 ID 取名称。
+成员集合：游戏库、家庭组并集/交集、各收藏夹、有笔记、AI 笔记各属性……
+均以 frozenset[int] 保存，筛选即集合交/并/差，不再逐行查字典。
+
+纯数据层模块，无 UI 依赖。AppID 对外接受 str 或 int，集合内部一律为 int；
+非数字 AppID（如非 Steam 游戏快捷方式的 shortcut_xxx 笔记）不进入 GameCatalog，
+需要保留它们的场合（主界面笔记列表）使用以原始 str AppID 为键的 ai_note_sets()。
+"""
+
+import sys
+from array import array
+
+# 预定义的成员集合键
+LIBRARY = "library"                          # 当前扫描用户的游戏库
+FAMILY_UNION = "family_union"                # 家庭组所有人拥有的游戏（含主用户）
+FAMILY_INTERSECTION = "family_intersection"  # 家庭组成员都拥有的游戏
+HAS_NOTES = "has_notes"                      # 有笔记文件的游戏
+HAS_AI = "has_ai"                            # 有 AI 笔记的游戏
+AI_INSUFFICIENT = "ai_insufficient"          # 有「信息过少」AI 笔记的游戏
+
+# scan_ai_notes 结果中按值建立索引的列表字段
+AI_INDEX_FIELDS = ("models", "confidences", "qualities", "info_volumes", "info_sources")
+
+_EMPTY = frozenset()
+
+
+def collection_key(name: str) -> tuple:
+    """收藏夹成员集合的键"""
+    return ("collection", name)
+
+
+def ai_key(field: str, value: str) -> tuple:
+    """AI 笔记属性成员集合的键，如 ai_key("models", "claude-sonnet")"""
+    return ("ai", field, value)
+
+
+def to_app_int(app_id):
+    """str/int AppID → int，非法值返回 None"""
+    if isinstance(app_id, int):
+        return app_id if 0 <= app_id <= 0xFFFFFFFF else None
+    s = str(app_id)
+    if s.isdigit():
+        n = int(s)
+        if n <= 0xFFFFFFFF:
+            return n
+    return None
+
+
+def to_id_set(app_ids) -> frozenset:
+    """任意 AppID 可迭代对象 → frozenset[int]"""
+    result = set()
+    for a in app_ids:
+        n = to_app_int(a)
+        if n is not None:
+            result.add(n)
+    return frozenset(result)
+
+
+def ai_note_sets(ai_notes_map: dict) -> dict:
+    """scan_ai_notes() 结果 → {HAS_AI / AI_INSUFFICIENT / ai_key(字段, 值): frozenset[app_id]}
+
+    集合元素为原样的 str AppID，不做 int 转换，非数字 AppID 同样保留。
+    """
+    index = {}
+    has_ai = set()
+    insufficient = set()
+    for app_id, info in ai_notes_map.items():
+        has_ai.add(app_id)
+        if info.get('has_insufficient'):
+            insufficient.add(app_id)
+        for field in AI_INDEX_FIELDS:
+            for value in info.get(field, ()):
+                index.setdefault(ai_key(field, value), set()).add(app_id)
+    sets = {key: frozenset(ids) for key, ids in index.items()}
+    sets[HAS_AI] = frozenset(has_ai)
+    sets[AI_INSUFFICIENT] = frozenset(insufficient)
+    return sets
+
+
+class GameCatalog:
+    """紧凑游戏表 + 具名成员集合"""
+
+    def __init__(self):
+        self._ids = array('I')
+        self._names = []   # 与 _ids 平行，未知名称为 None
+        self._lower = []   # 小写名称（搜索用）
+        self._rows = {}    # {app_id(int): 行号}
+        self._sets = {}    # {键: frozenset[int]}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, app_id):
+        return to_app_int(app_id) in self._rows
+
+    # ── 游戏表 ──
+
+    def add(self, app_id, name: str = None):
+        """登记一个游戏；已存在时仅在提供了名称的情况下更新名称。返回 int AppID"""
+        aid = to_app_int(app_id)
+        if aid is None:
+            return None
+        if name is not None:
+            name = sys.intern(name)
+        row = self._rows.get(aid)
+        if row is None:
+            self._rows[aid] = len(self._ids)
+            self._ids.append(aid)
+            self._names.append(name)
+            self._lower.append(name.lower() if name else None)
+        elif name is not None and self._names[row] != name:
+            self._names[row] = name
+            self._lower[row] = name.lower()
+        return aid
+
+    def add_games(self, games) -> frozenset:
+        """登记 [{'app_id', 'name'}] 列表，返回其 AppID 集合"""
+        ids = set()
+        for g in games:
+            aid = self.add(g['app_id'], g.get('name'))
+            if aid is not None:
+                ids.add(aid)
+        return frozenset(ids)
+
+    def name(self, app_id, default: str = None) -> str:
+        row = self._rows.get(to_app_int(app_id))
+        if row is None or self._names[row] is None:
+            return default
+        return self._names[row]
+
+    # ── 成员集合 ──
+
+    def set_members(self, key, app_ids) -> frozenset:
+        ids = app_ids if isinstance(app_ids, frozenset) else to_id_set(app_ids)
+        self._sets[key] = ids
+        return ids
+
+    def members(self, key) -> frozenset:
+        """键不存在时返回空集合"""
+        return self._sets.get(key, _EMPTY)
+
+    def has_members(self, key) -> bool:
+        return key in self._sets
+
+    def drop_members(self, kind: str):
+        """删除某一类元组键的全部集合，如 drop_members("collection")"""
+        for key in [k for k in self._sets if isinstance(k, tuple) and k[0] == kind]:
+            del self._sets[key]
+
+    def index_ai_notes(self, ai_notes_map: dict):
+        """根据 scan_ai_notes() 结果重建 HAS_AI / AI_INSUFFICIENT 及各属性集合"""
+        self.drop_members("ai")
+        for key, ids in ai_note_sets(ai_notes_map).items():
+            self._sets[key] = to_id_set(ids)
+
+    def ai_members(self, field: str, value: str) -> frozenset:
+        return self._sets.get(ai_key(field, value), _EMPTY)
+
+    def ai_values(self, field: str) -> list:
+        """某个 AI 属性当前出现过的全部取值（已排序），如全部模型名"""
+        return sorted(k[2] for k in self._sets
+                      if isinstance(k, tuple) and k[0] == "ai" and k[1] == field)
+
+    # ── 查询 ──
+
+    def search(self, app_ids, text: str, name_resolver=None) -> frozenset:
+        """保留名称（忽略大小写）或 AppID 包含 text 的游戏；text 为空时原样返回
+
+        name_resolver(app_id_str) 用于表中没有名称的游戏
+        """
+        text = text.strip().lower()
+        if not text:
+            return app_ids if isinstance(app_ids, frozenset) else frozenset(app_ids)
+        result = set()
+        rows = self._rows
+        lower = self._lower
+        for aid in app_ids:
+            if text in str(aid):
+                result.add(aid)
+                continue
+            row = rows.get(aid)
+            name_l = lower[row] if row is not None else None
+            if name_l is None and name_resolver is not None:
+                name_l = name_resolver(str(aid)).lower()
+            if name_l is not None and text in name_l:
+                result.add(aid)
+        return frozenset(result)
+
+    def sorted_by_name(self, app_ids, name_resolver=None) -> list:
+        """按名称（忽略大小写）排序，返回 [(app_id_str, name)]
+
+        表中没有名称的游戏由 name_resolver(app_id_str) 提供，未提供时显示 "AppID xxx"
+        """
+        rows = self._rows
+        names = self._names
+        items = []
+        for aid in app_ids:
+            sid = str(aid)
+            row = rows.get(aid)
+            name = names[row] if row is not None else None
+            if name is None:
+                name = name_resolver(sid) if name_resolver else f"AppID {sid}"
+            items.append((name.lower(), aid, sid, name))
+        items.sort()
+        return [(sid, name) for _, _, sid, name in items]
@@ -1,6 +1,6 @@
 """
 ╔══════════════════════════════════════════════════════════════════════════════╗
-║                     STEAM NOTES GENERATOR v6.0                              ║
+║                     STEAM NOTES GENERATOR v6.1                              ║
 ╚══════════════════════════════════════════════════════════════════════════════╝
 ================================================================================
 【AI 协作系统提示词 / System Prompt for AI Maintainers】
@@ -39,12 +39,27 @@ utils.py             — 公共工具函数（SSL 上下文、HTTP 请求封装
 
 ── 数据层（无 UI 依赖，可独立测试） ──
 core.py              — 笔记核心读写逻辑 + 常量 + AI 笔记识别工具函数
-                       包含：SteamNotesManager, is_ai_note(), extract_ai_*() 等
+                       包含：SteamNotesManager, NotesEdit, SyncStateTracker, is_ai_note(), extract_ai_*() 等
                        包含：CONFIDENCE_EMOJI, INFO_VOLUME_EMOJI, QUALITY_EMOJI 等常量
 account_manager.py   — Steam 账号发现、游戏库扫描（本地+在线）、收藏夹读取
-                       包含：SteamAccountScanner
+                       包含：SteamAccountScanner, OwnedGamesCache（游戏库快照 + 增减检测）
 cloud_uploader.py    — Steam Cloud 直接上传（Steamworks API 封装，子进程隔离）
                        包含：SteamCloudUploader
+vdf_parser.py        — Valve KeyValues 解析：文本 VDF/ACF 流式解析（可提前终止、惰性子块）
+                       + 二进制 VDF（shortcuts.vdf / appinfo.vdf）读取
+                       ⚠️ 读取 Steam 的 .vdf/.acf 文件统一使用本模块，禁止正则抓取
+bbcode_parser.py     — Steam BBCode 解析：单遍词法扫描 + 嵌套语法树、序列化、去标签、段落包裹
+                       编辑器渲染/序列化、_wrap_content、笔记预览去标签统一使用本模块
+fs_watcher.py        — 文件系统监视（Linux inotify via ctypes，其他平台 stat 轮询）
+                       包含：create_watcher(), InotifyWatcher, PollingWatcher
+steam_collections.py — Steam 收藏夹读取：按 mtime 缓存 + 逐条 version 增量解析、app_id→收藏夹反向索引、
+                       动态收藏夹（filterSpec）基于 appinfo.vdf 的本地求值
+                       包含：CollectionsReader, get_reader(), AppInfoIndex, evaluate_filter_spec()
+note_similarity.py   — 笔记近似重复检测：字符 shingle + 单次置换 MinHash 签名 + LSH 分桶 + 并查集聚类
+                       包含：signature(), similarity(), find_clusters()
+game_catalog.py      — 游戏目录：array('I') AppID + 驻留名称 + 具名成员集合（frozenset[int]）
+                       游戏库/家庭组/收藏夹/AI 属性筛选统一用集合运算
+                       包含：GameCatalog, collection_key(), to_id_set()
 steam_data.py        — Steam 数据获取（游戏详情、评测、名称）
                        包含：get_game_name/details/reviews_from_steam()
                        包含：format_game_context(), format_review_context()
@@ -68,8 +83,18 @@ ui_ai_batch.py       — AI 批量生成窗口（AIBatchMixin）
                        ui_ai_batch_gen.py     — 生成任务（暂停/继续/停止）
 ui_import_export.py  — 导入/导出/去重对话框（ImportExportMixin）
 ui_settings.py       — API 配置、缓存管理、关于（SettingsMixin）
+ui_tasks.py          — 后台任务执行与进度/取消遮罩（TaskRunnerMixin）
 rich_text_editor.py  — BBCode 富文本编辑器组件（独立 Tk 组件）
 
+── 性能基准（开发用，不参与程序运行） ──
+benchmarks/          — 独立运行的基准脚本：python benchmarks/bench_xxx.py
+  bench_bbcode.py      — 100 KB 级长笔记上旧版切片式 BBCode 扫描与 bbcode_parser 的耗时对比
+  bench_editor_render.py — 富文本编辑器逐段 insert 与批量渲染的耗时对比（需要图形界面）
+  bench_export.py      — 上万个游戏的合并导出（纯文本/gzip）与逐条导出（目录/zip）耗时，对比旧版串行导出
+  bench_note_format.py — 笔记文件缩进/紧凑格式的体积与读写耗时对比
+  bench_similarity.py  — 近似重复检测：MinHash 签名、LSH 聚类与两两比较的耗时增长对比
+  bench_vdf.py         — 大型 localconfig.vdf 上正则扫描与 vdf_parser 的耗时/内存对比
+
 Mixin 工作方式：各 Mixin 类的方法 self 指向 SteamNotesApp 实例。
 SteamNotesApp 通过多继承组合所有 Mixin，共享以下关键属性：
   self.root              — tk.Tk 主窗口
@@ -228,7 +253,8 @@ Steam 笔记 content 字段支持以下富文本标签（类似 BBCode）：
 13.【配置持久化】：AI 令牌配置保存为 ai_tokens 列表（每项含 name/key/provider/
    model/api_url），并通过 ai_active_token_index 记录默认令牌。
 14.【AI 笔记识别】：AI 生成的笔记以固定前缀 "🤖AI:" 开头。同时兼容旧版 "⚠️ 以下内容由"。
-15.【笔记创建统一性】：无论手动还是 AI 生成，笔记文件创建都必须使用同一 create_note 方法。
+15.【笔记创建统一性】：无论手动还是 AI 生成，笔记文件创建都必须使用同一 create_note 方法
+   （批量修改时使用 manager.edit() 事务中的 tx.create_note，二者共用 _build_entry）。
 16.【Steam 分类集成】：AI 批量生成支持按 Steam 收藏夹筛选游戏。
 17.【延迟上传与 dirty 状态跟踪】：所有笔记改动仅写入本地并标记 dirty，
    用户显式点击上传按钮后才调用 Steamworks API 上传到 Steam Cloud。
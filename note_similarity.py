@@ -0,0 +1,153 @@
+"""笔记近似重复检测 — 字符 shingle + 单次置换 MinHash（OPH）签名 + LSH 分桶
+
+signature(text)：去除 BBCode 标签、统一大小写与空白后取长度 SHINGLE 的字符片段，
+  每个片段只哈希一次：低位决定落入 NUM_BINS 个桶中的哪一个，高位作为取值，每桶保留最小值
+  （one permutation hashing）；空桶用右侧最近的非空桶按距离偏移填充（轮转致密化）。
+  两个签名逐位相等的比例即 Jaccard 相似度的估计值。中文没有空格分词，按字符取片段。
+find_clusters(items, threshold)：签名切成 bands 段（每段 rows 位），任一段完全相同的笔记
+  才成为候选对，即相似度 J 的笔记成为候选的概率为 1-(1-J^rows)^bands；banding(threshold)
+  取使阈值处该概率不低于 MIN_RECALL 的最大 rows（默认 0.8 时为 16×8，阈值越低段越多越短），
+  候选对按估计相似度过滤后并查集合并成簇，不做两两比较，耗时与笔记数近似线性。
+签名使用内置 hash()，只在同一进程内有效（随笔记索引缓存在内存中，不持久化）。
+
+纯数据层模块，无 UI 依赖。
+"""
+
+import re
+
+import bbcode_parser
+
+SHINGLE = 5        # 字符片段长度
+NUM_BINS = 128     # 签名长度（须为 2 的幂）
+MIN_RECALL = 0.9   # 相似度恰为阈值的笔记对成为 LSH 候选的最低概率
+
+DEFAULT_THRESHOLD = 0.8
+
+_MASK = (1 << 64) - 1
+_EMPTY = 1 << 64             # 空桶标记（大于任何取值）
+_ROTATE = 0x9E3779B97F4A7C15  # 致密化时按距离叠加的偏移
+_WS_RE = re.compile(r'\s+')
+_FALLBACK_PROBES = 8  # 与桶首不相似时，桶内最多再比较的条目数
+
+
+def normalize(text: str) -> str:
+    """去除 BBCode 标签，转小写并把连续空白压成一个空格"""
+    return _WS_RE.sub(' ', bbcode_parser.strip_tags(text).lower()).strip()
+
+
+def signature(text: str):
+    """文本的 MinHash 签名（长度 NUM_BINS 的 int 元组），规范化后为空时返回 None"""
+    text = normalize(text)
+    if not text:
+        return None
+    if len(text) <= SHINGLE:
+        hashes = {hash(text) & _MASK}
+    else:
+        hashes = {hash(text[i:i + SHINGLE]) & _MASK
+                  for i in range(len(text) - SHINGLE + 1)}
+    bins = [_EMPTY] * NUM_BINS
+    low = NUM_BINS - 1
+    shift = NUM_BINS.bit_length() - 1
+    for h in hashes:
+        b = h & low
+        v = h >> shift
+        if v < bins[b]:
+            bins[b] = v
+    filled = list(bins)
+    for i in range(NUM_BINS):
+        if bins[i] != _EMPTY:
+            continue
+        for dist in range(1, NUM_BINS):
+            v = bins[(i + dist) % NUM_BINS]
+            if v != _EMPTY:
+                filled[i] = (v + dist * _ROTATE) & _MASK
+                break
+    return tuple(filled)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """两个签名的 Jaccard 相似度估计（0~1）"""
+    same = 0
+    for a, b in zip(sig_a, sig_b):
+        if a == b:
+            same += 1
+    return same / NUM_BINS
+
+
+def banding(threshold: float):
+    """按阈值选 LSH 分段 (bands, rows)：rows 取 NUM_BINS 的因子，
+    在阈值处候选概率 1-(1-t^rows)^bands ≥ MIN_RECALL 的前提下取最大（候选越少越快）"""
+    rows = NUM_BINS
+    while rows > 1:
+        bands = NUM_BINS // rows
+        if 1 - (1 - threshold ** rows) ** bands >= MIN_RECALL:
+            break
+        rows //= 2
+    return NUM_BINS // rows, rows
+
+
+class _DisjointSet:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def find_clusters(items, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """在 [(key, 签名)] 中找近似重复的簇
+
+    Returns: [[(key, 与簇首的相似度), ...], ...]，每簇至少 2 条，簇首为其中最靠前的条目，
+    簇内按相似度从高到低、簇之间按大小从大到小排列。签名为 None 的条目忽略。
+    同一 LSH 桶内的条目只与桶首（及少量靠前条目）比较，已在同一簇中的不再比较，
+    避免大量相同笔记时退化为平方级。
+    """
+    items = [(key, sig) for key, sig in items if sig is not None]
+    sigs = [sig for _, sig in items]
+    ds = _DisjointSet(len(items))
+    bands, rows = banding(threshold)
+    for band in range(bands):
+        lo = band * rows
+        buckets = {}
+        for i, sig in enumerate(sigs):
+            buckets.setdefault(sig[lo:lo + rows], []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            head = members[0]
+            for i in members[1:]:
+                if ds.find(i) == ds.find(head):
+                    continue
+                if similarity(sigs[head], sigs[i]) >= threshold:
+                    ds.union(head, i)
+                else:
+                    # 与桶首不够相似时，再在桶内靠前的少量条目中找足够相似的
+                    for j in members[1:_FALLBACK_PROBES]:
+                        if j >= i:
+                            break
+                        if ds.find(j) != ds.find(i) and similarity(sigs[j], sigs[i]) >= threshold:
+                            ds.union(j, i)
+                            break
+    groups = {}
+    for i in range(len(items)):
+        groups.setdefault(ds.find(i), []).append(i)
+    clusters = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        head = sigs[root]
+        scored = [(items[i][0], 1.0 if i == root else similarity(head, sigs[i]))
+                  for i in members]
+        scored.sort(key=lambda m: -m[1])
+        clusters.append(scored)
+    clusters.sort(key=len, reverse=True)
+    return clusters
@@ -6,6 +6,8 @@ import tkinter as tk
 from tkinter import ttk
 import tkinter.font as tkfont
 
+import bbcode_parser
+
 class SteamRichTextEditor(tk.Frame):
     """支持 Steam BBCode 的富文本编辑器
 
@@ -80,6 +82,12 @@ class SteamRichTextEditor(tk.Frame):
 
         # 绑定键盘事件用于"预设模式"
         self._text.bind("<Key>", self._on_key_press, add=True)
+        # 编辑时只对改动所在的行重新识别 URL
+        self._text.bind("<<Modified>>", self._on_modified, add=True)
+        for seq in ("<<Paste>>", "<<Cut>>", "<<Clear>>"):
+            self._text.bind(seq, self._remember_edit_anchor, add=True)
+        for seq in ("<<Undo>>", "<<Redo>>"):
+            self._text.bind(seq, self._remember_full_rescan, add=True)
 
         # ── 配置富文本标签样式 ──
         # 解析 Text widget 实际使用的字体族名，确保 italic 等样式有效
@@ -120,11 +128,19 @@ class SteamRichTextEditor(tk.Frame):
         self._text.tag_bind("url", "<Leave>",
                             lambda e: self._text.config(cursor=""))
         self._text.tag_bind("url", "<Button-1>", self._on_url_click)
+        # 正文中自动识别出的 URL（样式同 url，编辑时按行增量维护）
+        self._text.tag_configure("autolink", foreground="#1a73e8", underline=True,
+                                  font=("", 11))
+        self._text.tag_bind("autolink", "<Enter>",
+                            lambda e: self._text.config(cursor="hand2"))
+        self._text.tag_bind("autolink", "<Leave>",
+                            lambda e: self._text.config(cursor=""))
+        self._text.tag_bind("autolink", "<Button-1>", self._on_url_click)
 
         # ── 关键: 设置 tag 优先级 ──
         # 内联样式必须高于块级样式，否则 paragraph 的 font 会覆盖 bold 等
         # tag_raise(a, b) 表示 a 的优先级高于 b
-        for inline_tag in ("bold", "italic", "underline", "strike", "url"):
+        for inline_tag in ("bold", "italic", "underline", "strike", "url", "autolink"):
             self._text.tag_raise(inline_tag, "paragraph")
             self._text.tag_raise(inline_tag, "bullet")
             self._text.tag_raise(inline_tag, "olist")
@@ -134,6 +150,10 @@ class SteamRichTextEditor(tk.Frame):
         # 用于存储 [url=...] 标签的 URL 目标映射: tag_name → url
         self._url_map = {}
         self._url_counter = 0
+        # 渲染片段缓存: BBCode 源码 → ((文本, 标签, ...), 该内容用到的 url 映射)
+        self._render_cache = {}
+        # 本次编辑开始前光标（及选区起点）所在行；None 表示只看编辑后的光标行，0 表示全文
+        self._edit_anchor_line = None
 
     # ────────── URL 点击 & 预设模式 ──────────
 
@@ -148,34 +168,37 @@ class SteamRichTextEditor(tk.Frame):
             if tag in self._url_map:
                 webbrowser.open(self._url_map[tag])
                 return
-        # 回退：获取该位置 url tag 的完整范围，用显示文本作为 URL
-        tag_range = self._text.tag_prevrange("url", f"{idx}+1c")
+        # 回退：获取该位置 url / autolink tag 的完整范围，用显示文本作为 URL
+        link_tag = "url" if "url" in tags_at_pos else "autolink"
+        tag_range = self._text.tag_prevrange(link_tag, f"{idx}+1c")
         if tag_range:
             url = self._text.get(tag_range[0], tag_range[1]).strip()
             if url:
                 webbrowser.open(url)
 
-    def _insert_url_link(self, display_text: str, target_url: str):
-        """插入一个 URL 链接。如果 display_text != target_url，使用唯一标签存储映射"""
+    def _url_link_tag(self, display_text: str, target_url: str) -> str:
+        """URL 链接使用的标签。display_text != target_url 时创建唯一标签并记录映射"""
         if display_text.strip() == target_url.strip() or not target_url.strip():
             # 显示文本就是 URL，直接用通用 url tag
-            self._text.insert(tk.END, display_text, "url")
-        else:
-            # 显示文本与 URL 不同，创建唯一标签
-            self._url_counter += 1
-            unique_tag = f"url_{self._url_counter}"
-            self._url_map[unique_tag] = target_url
-            self._text.tag_configure(unique_tag, foreground="#1a73e8",
-                                      underline=True, font=("", 11))
-            self._text.tag_bind(unique_tag, "<Enter>",
-                                lambda e: self._text.config(cursor="hand2"))
-            self._text.tag_bind(unique_tag, "<Leave>",
-                                lambda e: self._text.config(cursor=""))
-            self._text.tag_bind(unique_tag, "<Button-1>", self._on_url_click)
-            self._text.insert(tk.END, display_text, unique_tag)
+            return "url"
+        # 显示文本与 URL 不同，创建唯一标签
+        self._url_counter += 1
+        unique_tag = f"url_{self._url_counter}"
+        self._url_map[unique_tag] = target_url
+        self._text.tag_configure(unique_tag, foreground="#1a73e8",
+                                  underline=True, font=("", 11))
+        self._text.tag_bind(unique_tag, "<Enter>",
+                            lambda e: self._text.config(cursor="hand2"))
+        self._text.tag_bind(unique_tag, "<Leave>",
+                            lambda e: self._text.config(cursor=""))
+        self._text.tag_bind(unique_tag, "<Button-1>", self._on_url_click)
+        return unique_tag
 
     def _on_key_press(self, event):
         """处理预设模式: 输入字符时自动附加 pending tags"""
+        # 方向键/翻页/Ctrl 组合键等只移动光标，不记锚点，否则锚点会停在跳过的最前一行
+        if (event.char and event.char.isprintable()) or event.keysym in self._EDIT_KEYSYMS:
+            self._remember_edit_anchor()
         if self._source_mode or not self._pending_tags:
             return
         # 只处理普通可打印字符
@@ -187,17 +210,60 @@ class SteamRichTextEditor(tk.Frame):
         self._text.insert(tk.INSERT, ch, tags)
         return "break"
 
-    def _highlight_urls(self):
-        """在 Text widget 中查找所有 URL 并添加 url tag"""
-        self._text.tag_remove("url", "1.0", tk.END)
-        content = self._text.get("1.0", tk.END)
-        for m in self._URL_RE.finditer(content):
-            # 计算 Text widget 中的位置
-            start_offset = m.start()
-            end_offset = m.end()
-            start_idx = f"1.0+{start_offset}c"
-            end_idx = f"1.0+{end_offset}c"
-            self._text.tag_add("url", start_idx, end_idx)
+    # ────────── URL 增量高亮 ──────────
+
+    # 重新识别 URL 时在改动行前后额外检查的行数
+    _URL_RESCAN_CONTEXT = 1
+    # 不产生 event.char 但会修改文本的按键
+    _EDIT_KEYSYMS = frozenset(("BackSpace", "Delete", "Return", "KP_Enter", "Tab"))
+
+    def _line_of(self, index) -> int:
+        return int(self._text.index(index).split(".")[0])
+
+    def _remember_edit_anchor(self, event=None):
+        """编辑前记录光标/选区起点所在行（widget 绑定先于 Text 类绑定执行）"""
+        line = self._line_of(tk.INSERT)
+        if self._text.tag_ranges(tk.SEL):
+            line = min(line, self._line_of(tk.SEL_FIRST))
+        if self._edit_anchor_line is None:
+            self._edit_anchor_line = line
+        elif self._edit_anchor_line:
+            self._edit_anchor_line = min(self._edit_anchor_line, line)
+
+    def _remember_full_rescan(self, event=None):
+        """撤销/重做的改动位置不可预知，退化为全文重新识别"""
+        self._edit_anchor_line = 0
+
+    def _on_modified(self, event=None):
+        """内容变化后只重新识别改动涉及的行（编辑前锚点行 ~ 编辑后光标行）"""
+        if not self._text.edit_modified():
+            return  # 下面复位修改标志时 Tk 会再发一次 <<Modified>>
+        self._text.edit_modified(False)
+        anchor = self._edit_anchor_line
+        self._edit_anchor_line = None
+        if self._source_mode:
+            return
+        if anchor == 0:
+            first, last = 1, self._line_of("end-1c")
+        else:
+            current = self._line_of(tk.INSERT)
+            first = min(current, anchor or current)
+            last = max(current, anchor or current)
+        self._rehighlight_lines(first - self._URL_RESCAN_CONTEXT,
+                                last + self._URL_RESCAN_CONTEXT)
+
+    def _rehighlight_lines(self, first: int, last: int):
+        """重新识别 first~last 行中的 URL（URL 不跨行，按行用 line.column 索引打标签）"""
+        first = max(first, 1)
+        last = min(last, self._line_of("end-1c"))
+        if first > last:
+            return
+        self._text.tag_remove("autolink", f"{first}.0", f"{last}.end")
+        content = self._text.get(f"{first}.0", f"{last}.end")
+        for offset, line in enumerate(content.split("\n")):
+            for m in self._URL_RE.finditer(line):
+                ln = first + offset
+                self._text.tag_add("autolink", f"{ln}.{m.start()}", f"{ln}.{m.end()}")
 
     # ────────── 源码模式切换 ──────────
 
@@ -221,310 +287,299 @@ class SteamRichTextEditor(tk.Frame):
 
     # ────────── BBCode 解析 → 渲染 ──────────
 
+    # 内联 BBCode 标签 ↔ Text widget 标签
+    _INLINE_VISUAL = {'b': 'bold', 'i': 'italic', 'u': 'underline', 'strike': 'strike'}
+    # 嵌套列表每层的缩进
+    _LIST_INDENT = "    "
+
+    # 最近渲染过的内容的片段缓存条数（在几条笔记之间来回切换时无需重新解析）
+    _RENDER_CACHE_SIZE = 16
+
     def _render_bbcode(self, bbcode: str):
-        """将 BBCode 解析并渲染到 Text widget"""
+        """将 BBCode 解析并渲染到 Text widget
+
+        先在 Python 中算出全部 (文本, 标签) 片段（URL 高亮在此阶段完成），
+        再用一次 Text.insert(index, 文本1, 标签1, 文本2, 标签2, ...) 写入，
+        不再逐段 insert 后重新读取全文做 tag_add。
+        片段连同其用到的 [url=...] 唯一标签映射按内容缓存（LRU）；
+        唯一标签编号单调递增、标签配置保留在 widget 中，缓存的片段可直接复用。
+        """
         self._text.config(state=tk.NORMAL)
         self._text.delete("1.0", tk.END)
         # 重置 URL 映射
         self._url_map.clear()
-        self._url_counter = 0
 
         if not bbcode.strip():
             return
 
-        # 解析 token 流
-        tokens = self._parse_bbcode(bbcode)
-        for token in tokens:
-            self._insert_token(token)
-
-        # 渲染完成后高亮 URL
-        self._highlight_urls()
-
-    def _parse_bbcode(self, bbcode: str) -> list:
-        """将 BBCode 解析为 token 列表
-        每个 token: {'type': ..., 'content': ..., 'items': [...], 'url': ...}
-        """
-        tokens = []
-        pos = 0
-        text = bbcode
-
-        while pos < len(text):
-            # 查找下一个标签（包括 [url] 和 [url=...] 和 [/*]）
-            match = re.search(
-                r'\[(\/?)(h[123]|p|b|i|u|strike|list|olist|hr|code|url|\*)(?:=[^\]]*)?\]',
-                text[pos:])
-            if not match:
-                # 剩余纯文本
-                remaining = text[pos:]
-                if remaining.strip():
-                    tokens.append({'type': 'text', 'content': remaining})
-                break
-
-            # 标签前的纯文本
-            before = text[pos:pos + match.start()]
-            if before.strip():
-                tokens.append({'type': 'text', 'content': before})
-
-            tag_name = match.group(2)
-            is_close = match.group(1) == '/'
-            tag_pos = pos + match.start()
-            tag_end = pos + match.end()
-
-            if tag_name == 'hr' and not is_close:
-                tokens.append({'type': 'hr', 'content': ''})
-                pos = tag_end
-                continue
-
-            if tag_name == '*':
-                # [*] 和 [/*] 只在列表内部有意义，在顶层跳过
-                pos = tag_end
-                continue
-
-            if is_close:
-                # 孤立闭合标签 → 跳过
-                pos = tag_end
-                continue
-
-            # 寻找对应的闭合标签
-            if tag_name in ('list', 'olist'):
-                close_pattern = f'[/{tag_name}]'
-                close_idx = text.find(close_pattern, tag_end)
-                if close_idx == -1:
-                    close_idx = len(text)
-                inner = text[tag_end:close_idx]
-                # 解析 [*] 项
-                raw_items = [item.strip() for item in re.split(r'\[\*\]', inner) if item.strip()]
-                # 去除列表项中可能的 [/*] 闭合标签和 [p]...[/p] 包裹
-                items = []
-                for it in raw_items:
-                    # 先去除尾部的 [/*]
-                    it = re.sub(r'\[/\*\]\s*$', '', it).strip()
-                    # 再去除 [p]...[/p] 包裹
-                    it = re.sub(r'^\[p\](.*)\[/p\]$', r'\1', it, flags=re.DOTALL).strip()
-                    if it:
-                        items.append(it)
-                tokens.append({'type': tag_name, 'content': '', 'items': items})
-                pos = close_idx + len(close_pattern) if close_idx < len(text) else len(text)
-            elif tag_name == 'url':
-                # 处理 [url=...]...[/url] 和 [url]...[/url]
-                # 重新匹配完整开标签以提取可能的 url= 属性（含引号）
-                url_attr = None
-                full_open_match = re.match(
-                    r'\[url(?:=([^\]]*))?\]', text[tag_pos:])
-                if full_open_match:
-                    tag_end = tag_pos + full_open_match.end()
-                    raw_attr = full_open_match.group(1)
-                    # 去除属性值两端的引号 "..." 或 '...'
-                    if raw_attr:
-                        url_attr = raw_attr.strip().strip('"').strip("'")
-                close_pattern = '[/url]'
-                close_idx = text.find(close_pattern, tag_end)
-                if close_idx == -1:
-                    close_idx = len(text)
-                inner = text[tag_end:close_idx]
-                # url_attr 存在时：显示文本=inner，链接=url_attr
-                # url_attr 不存在时：显示文本=inner，链接=inner
-                link_url = url_attr if url_attr else inner.strip()
-                tokens.append({'type': 'url_link', 'content': inner, 'url': link_url})
-                pos = close_idx + len(close_pattern) if close_idx < len(text) else len(text)
-            else:
-                close_pattern = f'[/{tag_name}]'
-                close_idx = text.find(close_pattern, tag_end)
-                if close_idx == -1:
-                    close_idx = len(text)
-                inner = text[tag_end:close_idx]
-                tokens.append({'type': tag_name, 'content': inner})
-                pos = close_idx + len(close_pattern) if close_idx < len(text) else len(text)
-
-        return tokens
-
-    def _insert_token(self, token):
-        """将一个 token 插入到 Text widget"""
-        t = token['type']
-        content = token.get('content', '')
-
-        if t == 'text':
-            self._text.insert(tk.END, content, "paragraph")
-        elif t in ('h1', 'h2', 'h3'):
-            if self._text.get("end-2c", "end-1c") != "\n":
-                self._text.insert(tk.END, "\n")
-            self._insert_inline(content, t)
-            self._text.insert(tk.END, "\n", t)
+        cached = self._render_cache.pop(bbcode, None)
+        if cached is None:
+            root = bbcode_parser.parse(bbcode)
+            runs = []
+            for node in root.children:
+                self._collect_node(node, runs)
+            runs = self._highlight_url_runs(runs)
+            args = []
+            for text, tags in runs:
+                args.append(text)
+                args.append(tags)
+            cached = (tuple(args), dict(self._url_map))
+        self._render_cache[bbcode] = cached
+        while len(self._render_cache) > self._RENDER_CACHE_SIZE:
+            del self._render_cache[next(iter(self._render_cache))]
+
+        args, url_map = cached
+        self._url_map.update(url_map)
+        if args:
+            self._text.insert("1.0", *args)
+
+    @staticmethod
+    def _ensure_newline(runs: list):
+        if not runs or not runs[-1][0].endswith("\n"):
+            runs.append(("\n", ()))
+
+    def _collect_node(self, node, runs: list):
+        """将一个顶层语法树节点转换为 (文本, 标签元组) 片段追加到 runs"""
+        if isinstance(node, str):
+            if node.strip():
+                runs.append((node, ("paragraph",)))
+            return
+        t = node.tag
+        if t in ('h1', 'h2', 'h3'):
+            self._ensure_newline(runs)
+            self._collect_inline(node.children, (t,), runs)
+            runs.append(("\n", (t,)))
         elif t == 'p':
-            # 段落内容可能含内联标签 [b] [i] [u] [strike]
-            self._insert_inline(content, "paragraph")
-            self._text.insert(tk.END, "\n", "paragraph")
-        elif t == 'b':
-            self._insert_inline(content, "bold")
-        elif t == 'i':
-            self._insert_inline(content, "italic")
-        elif t == 'u':
-            self._insert_inline(content, "underline")
-        elif t == 'strike':
-            self._insert_inline(content, "strike")
+            # 段落内容可能含内联标签 [b] [i] [u] [strike] [url]
+            self._collect_inline(node.children, ("paragraph",), runs)
+            runs.append(("\n", ("paragraph",)))
+        elif t in self._INLINE_VISUAL:
+            self._collect_inline(node.children, (self._INLINE_VISUAL[t],), runs)
+        elif t == 'url':
+            self._collect_inline([node], (), runs)
         elif t == 'code':
-            if self._text.get("end-2c", "end-1c") != "\n":
-                self._text.insert(tk.END, "\n")
-            self._text.insert(tk.END, content + "\n", "code")
+            self._ensure_newline(runs)
+            runs.append((node.plain_text() + "\n", ("code",)))
         elif t == 'hr':
-            if self._text.get("end-2c", "end-1c") != "\n":
-                self._text.insert(tk.END, "\n")
-            self._text.insert(tk.END, "─" * 50 + "\n", "hr")
-        elif t in ('list', 'olist'):
-            if self._text.get("end-2c", "end-1c") != "\n":
-                self._text.insert(tk.END, "\n")
-            items = token.get('items', [])
-            tag = "bullet" if t == 'list' else "olist"
-            for idx, item in enumerate(items):
-                prefix = "• " if t == 'list' else f"{idx + 1}. "
-                self._text.insert(tk.END, prefix, tag)
-                # 列表项内容可能含内联标签 [b][i][url] 等，需要解析
-                self._insert_inline(item, tag)
-                self._text.insert(tk.END, "\n", tag)
-        elif t == 'url_link':
-            # [url=...]显示文本[/url] 或 [url]链接[/url]
-            display = content if content.strip() else token.get('url', '')
-            self._insert_url_link(display, token.get('url', display))
-
-    def _insert_inline(self, text: str, base_tag: str):
-        """解析段落/列表项内的内联标签 [b] [i] [u] [strike] [url] 并渲染（递归支持嵌套）"""
+            self._ensure_newline(runs)
+            runs.append(("─" * 50 + "\n", ("hr",)))
+        elif t in bbcode_parser.LIST_TAGS:
+            self._ensure_newline(runs)
+            self._collect_list(node, 0, runs)
+
+    def _collect_list(self, node, depth: int, runs: list):
+        """[list] / [olist] 的片段，项内嵌套的列表缩进一层接在该项之后"""
+        tag = "bullet" if node.tag == 'list' else "olist"
+        for idx, item in enumerate(bbcode_parser.list_items(node)):
+            prefix = self._LIST_INDENT * depth + ("• " if node.tag == 'list' else f"{idx + 1}. ")
+            runs.append((prefix, (tag,)))
+            nested = [c for c in item if isinstance(c, bbcode_parser.Node)
+                      and c.tag in bbcode_parser.LIST_TAGS]
+            # 列表项内容可能含内联标签 [b][i][url] 及 [p] 包裹
+            self._collect_inline([c for c in item if not any(c is n for n in nested)],
+                                 (tag,), runs)
+            runs.append(("\n", (tag,)))
+            for sub in nested:
+                self._collect_list(sub, depth + 1, runs)
+
+    def _collect_inline(self, children: list, tags: tuple, runs: list):
+        """段落/列表项内的内联内容，嵌套的 [b] [i] [u] [strike] 样式逐层叠加"""
+        for child in children:
+            if isinstance(child, str):
+                if child:
+                    runs.append((child, tags))
+            elif child.tag == 'url':
+                target = bbcode_parser.url_target(child)
+                display = child.plain_text()
+                display = display if display.strip() else target
+                runs.append((display, (self._url_link_tag(display, target),)))
+            elif child.tag in self._INLINE_VISUAL:
+                self._collect_inline(child.children,
+                                     tags + (self._INLINE_VISUAL[child.tag],), runs)
+            elif child.tag != 'hr':
+                # 内联位置上的块级标签（如列表项的 [p] 包裹）只展开其内容
+                self._collect_inline(child.children, tags, runs)
+
+    def _highlight_url_runs(self, runs: list) -> list:
+        """在拼接后的全文上匹配 URL，把命中的片段切开并加上 autolink 标签
+
+        已是链接（[url] 标签）的片段保持不变。
+        """
+        text = ''.join(t for t, _ in runs)
+        matches = [(m.start(), m.end()) for m in self._URL_RE.finditer(text)]
+        if not matches:
+            return runs
+        result = []
         pos = 0
-        while pos < len(text):
-            # 匹配内联标签：[b]...[/b] 以及 [url=...]...[/url] 或 [url]...[/url]
-            match = re.search(
-                r'\[(b|i|u|strike)\](.*?)\[/\1\]|\[url(?:=([^\]]*))?\](.*?)\[/url\]',
-                text[pos:], re.DOTALL)
-            if not match:
-                self._text.insert(tk.END, text[pos:], base_tag)
-                break
-            # 标签前文本
-            before = text[pos:pos + match.start()]
-            if before:
-                self._text.insert(tk.END, before, base_tag)
-            if match.group(1):
-                # [b]/[i]/[u]/[strike] 匹配
-                inline_tag = match.group(1)
-                inline_content = match.group(2)
-                tag_map = {'b': 'bold', 'i': 'italic', 'u': 'underline', 'strike': 'strike'}
-                visual_tag = tag_map.get(inline_tag, base_tag)
-                # 递归解析内部可能的嵌套内联标签
-                self._insert_inline(inline_content, visual_tag)
-            else:
-                # [url] 匹配
-                raw_attr = match.group(3)  # [url=VALUE] 的 VALUE，可能为 None
-                url_content = match.group(4)
-                # 去除引号
-                url_attr = raw_attr.strip().strip('"').strip("'") if raw_attr else None
-                display = url_content if url_content.strip() else (url_attr or '')
-                target = url_attr if url_attr else url_content.strip()
-                self._insert_url_link(display, target)
-            pos = pos + match.end()
+        mi = 0
+        for t, tags in runs:
+            start = pos
+            end = pos + len(t)
+            pos = end
+            if any(tag == "url" or tag in self._url_map for tag in tags):
+                result.append((t, tags))
+                continue
+            cur = start
+            while mi < len(matches) and matches[mi][0] < end:
+                ms, me = matches[mi]
+                if me <= cur:
+                    mi += 1
+                    continue
+                a = max(ms, cur)
+                b = min(me, end)
+                if a > cur:
+                    result.append((t[cur - start:a - start], tags))
+                result.append((t[a - start:b - start], tags + ("autolink",)))
+                cur = b
+                if me > end:
+                    break
+                mi += 1
+            if cur < end:
+                result.append((t[cur - start:], tags))
+        return result
 
     # ────────── 可视模式 → BBCode 序列化 ──────────
 
-    def _serialize_to_bbcode(self) -> str:
-        """将 Text widget 的内容及标签序列化为 BBCode"""
-        # 遍历 widget 内容，按标签还原 BBCode
-        result = []
-        index = "1.0"
-        end = self._text.index(tk.END + "-1c")
-
-        while self._text.compare(index, "<", end):
-            tags = self._text.tag_names(index)
-            # 找到该标签连续范围
-            next_idx = self._find_tag_boundary(index, tags)
-
-            chunk = self._text.get(index, next_idx)
-
-            if 'hr' in tags and '─' in chunk:
-                result.append('[hr]')
-            elif 'h1' in tags:
-                line = chunk.rstrip('\n')
-                if line:
-                    result.append(f'[h1]{line}[/h1]')
-            elif 'h2' in tags:
-                line = chunk.rstrip('\n')
-                if line:
-                    result.append(f'[h2]{line}[/h2]')
-            elif 'h3' in tags:
-                line = chunk.rstrip('\n')
-                if line:
-                    result.append(f'[h3]{line}[/h3]')
-            elif 'code' in tags:
-                line = chunk.rstrip('\n')
-                if line:
-                    result.append(f'[code]{line}[/code]')
-            elif 'bullet' in tags:
-                # 收集列表项
-                lines = chunk.rstrip('\n').split('\n')
-                items = []
-                for l in lines:
-                    l = l.strip()
-                    if l.startswith('• '):
-                        items.append(l[2:])
-                    elif l:
-                        items.append(l)
-                if items:
-                    result.append('[list]' + ''.join(f'[*]{it}' for it in items) + '[/list]')
-            elif 'olist' in tags:
-                lines = chunk.rstrip('\n').split('\n')
-                items = []
-                for l in lines:
-                    l = l.strip()
-                    m = re.match(r'^\d+\.\s*(.+)', l)
-                    if m:
-                        items.append(m.group(1))
-                    elif l:
-                        items.append(l)
-                if items:
-                    result.append('[olist]' + ''.join(f'[*]{it}' for it in items) + '[/olist]')
-            elif 'bold' in tags:
-                result.append(f'[b]{chunk}[/b]')
-            elif 'italic' in tags:
-                result.append(f'[i]{chunk}[/i]')
-            elif 'underline' in tags:
-                result.append(f'[u]{chunk}[/u]')
-            elif 'strike' in tags:
-                result.append(f'[strike]{chunk}[/strike]')
-            elif 'url' in tags:
-                # 通用 url 标签：显示文本就是 URL
-                result.append(f'[url]{chunk}[/url]')
-            elif any(t.startswith('url_') and t in self._url_map for t in tags):
-                # 唯一 url 标签：有 url= 属性
-                url_tag = next(t for t in tags if t.startswith('url_') and t in self._url_map)
-                target = self._url_map[url_tag]
-                result.append(f'[url={target}]{chunk}[/url]')
-            elif 'paragraph' in tags:
-                # 段落文本: 按换行分段落
-                paras = chunk.split('\n')
-                for p in paras:
-                    p = p.strip()
-                    if p:
-                        result.append(f'[p]{p}[/p]')
-            else:
-                # 无特殊标签的纯文本
-                text_stripped = chunk.strip()
-                if text_stripped:
-                    result.append(f'[p]{text_stripped}[/p]')
+    # 块级 Text 标签（按判定优先级）→ BBCode 标签
+    _BLOCK_VISUAL = (('hr', 'hr'), ('h1', 'h1'), ('h2', 'h2'), ('h3', 'h3'),
+                     ('code', 'code'), ('bullet', 'list'), ('olist', 'olist'),
+                     ('paragraph', 'p'))
+    _LIST_PREFIX_RE = re.compile(r'^( *)(?:• |\d+\.\s*)')
 
-            index = next_idx
+    def _dump_lines(self) -> list:
+        """按行读取 widget 内容：[(块级 BBCode 标签或 None, [(文本, 标签集合)])]
 
-        return ''.join(result)
-
-    def _find_tag_boundary(self, start_index, tags):
-        """找到当前标签组合结束的位置"""
-        tags_set = set(tags)
-        index = start_index
-        end = self._text.index(tk.END + "-1c")
+        Text.dump 一次取回全部文本片段与标签开关事件，不再逐字符查询标签。
+        """
+        lines = []
+        runs = []
+        block_tags = set()
+        active = set()
+        for key, value, _ in self._text.dump("1.0", "end-1c", text=True, tag=True):
+            if key == 'tagon':
+                active.add(value)
+            elif key == 'tagoff':
+                active.discard(value)
+            elif key == 'text':
+                tags = frozenset(active)
+                pieces = value.split('\n')
+                for n, piece in enumerate(pieces):
+                    if piece:
+                        runs.append((piece, tags))
+                    if piece or n < len(pieces) - 1:
+                        block_tags |= tags
+                    if n < len(pieces) - 1:
+                        lines.append((runs, block_tags))
+                        runs = []
+                        block_tags = set()
+        if runs:
+            lines.append((runs, block_tags))
+        result = []
+        for runs, tags in lines:
+            block = next((bb for vt, bb in self._BLOCK_VISUAL if vt in tags), None)
+            result.append((block, runs))
+        return result
+
+    def _inline_wrappers(self, tags) -> list:
+        """一段文本的内联样式 → [(BBCode 标签, 属性)]，由外到内"""
+        wrappers = [(bb, None) for bb, vt in self._INLINE_VISUAL.items() if vt in tags]
+        url_tag = next((t for t in tags if t in self._url_map), None)
+        if url_tag is not None:
+            wrappers.append(('url', self._url_map[url_tag]))
+        elif 'url' in tags or 'autolink' in tags:
+            wrappers.append(('url', None))
+        return wrappers
+
+    def _inline_nodes(self, runs: list, skip: int = 0) -> list:
+        """一行的文本片段 → 内联语法树节点列表（首尾空白去除，相邻的相同样式合并）"""
+        children = []
+        runs = list(runs)
+        # 跳过行首 skip 个字符（列表前缀）
+        while skip and runs:
+            text, tags = runs[0]
+            if len(text) <= skip:
+                skip -= len(text)
+                runs.pop(0)
+            else:
+                runs[0] = (text[skip:], tags)
+                skip = 0
+        if runs:
+            runs[0] = (runs[0][0].lstrip(), runs[0][1])
+            runs[-1] = (runs[-1][0].rstrip(), runs[-1][1])
+        for text, tags in runs:
+            if not text:
+                continue
+            target = children
+            for tag, attr in self._inline_wrappers(tags):
+                last = target[-1] if target else None
+                if isinstance(last, bbcode_parser.Node) and last.tag == tag and last.attr == attr:
+                    target = last.children
+                else:
+                    node = bbcode_parser.Node(tag, attr)
+                    target.append(node)
+                    target = node.children
+            if target and isinstance(target[-1], str):
+                target[-1] += text
+            else:
+                target.append(text)
+        return children
 
-        while self._text.compare(index, "<", end):
-            next_char = self._text.index(f"{index}+1c")
-            next_tags = set(self._text.tag_names(next_char))
-            if next_tags != tags_set:
-                return next_char
-            index = next_char
+    @staticmethod
+    def _append_code(root, lines: list):
+        code = '\n'.join(lines).rstrip('\n')
+        if code:
+            root.children.append(bbcode_parser.Node('code', children=[code]))
 
-        return end
+    def _serialize_to_bbcode(self) -> str:
+        """将 Text widget 的内容及标签序列化为 BBCode（先构建语法树再统一输出）"""
+        Node = bbcode_parser.Node
+        root = Node(None)
+        list_stack = []  # [(缩进层级, 列表标签, 列表节点)]
+        code_lines = None
+        for block, runs in self._dump_lines():
+            text = ''.join(t for t, _ in runs)
+            if block not in ('list', 'olist'):
+                list_stack = []
+            if block != 'code' and code_lines is not None:
+                self._append_code(root, code_lines)
+                code_lines = None
+            if block == 'hr':
+                if '─' in text:
+                    root.children.append(Node('hr'))
+            elif block == 'code':
+                if code_lines is None:
+                    code_lines = []
+                code_lines.append(text)
+            elif block in ('list', 'olist'):
+                m = self._LIST_PREFIX_RE.match(text)
+                if not m and not text.strip():
+                    continue
+                depth = len(m.group(1)) // len(self._LIST_INDENT) if m else \
+                    (list_stack[-1][0] if list_stack else 0)
+                while list_stack and (list_stack[-1][0] > depth or (
+                        list_stack[-1][0] == depth and list_stack[-1][1] != block)):
+                    list_stack.pop()
+                if not list_stack or list_stack[-1][0] < depth:
+                    node = Node(block)
+                    if not list_stack:
+                        root.children.append(node)
+                    else:
+                        parent = list_stack[-1][2]
+                        last = parent.children[-1] if parent.children else None
+                        (last if last is not None else parent).children.append(node)
+                    list_stack.append((depth, block, node))
+                item = Node('*', children=self._inline_nodes(runs, m.end() if m else 0))
+                list_stack[-1][2].children.append(item)
+            elif text.strip():
+                children = self._inline_nodes(runs)
+                if block is None and all(isinstance(c, Node) for c in children):
+                    # 顶层的纯内联内容（如单独的 [b]）不额外包裹段落
+                    root.children.extend(children)
+                else:
+                    root.children.append(Node(block or 'p', children=children))
+        if code_lines is not None:
+            self._append_code(root, code_lines)
+        return bbcode_parser.serialize(root)
 
     # ────────── 工具栏: 应用标签 ──────────
 
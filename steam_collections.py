@@ -0,0 +1,259 @@
+"""Steam 收藏夹读取 — cloud-storage-namespace-1.json 缓存解析、反向索引、动态收藏夹求值
+
+CollectionsReader 按文件 (size, mtime_ns) 缓存解析结果；文件变化时外层 JSON 仍需整体读取，
+但每个收藏夹内层 value 的 json.loads 只对 version 变化过的条目重新执行。
+同时维护 app_id → [收藏夹 id] 反向索引。
+
+动态收藏夹（value 中含 filterSpec）用本地数据求值：
+  strSearchText         — 名称包含（忽略大小写）
+  题材/特性/商店标签     — 选项值即 Steam 的 genre / category / tag ID，
+                          与 appinfo.vdf 中 common 段的对应字段直接比对
+  类型/游玩状态/好友等   — 依赖 Steam 客户端运行时数据，本地无法求值
+组内 bAcceptUnion=True 为「任一满足」，否则为「全部满足」；各组之间为「全部满足」。
+含本地无法求值条件的动态收藏夹 filter_spec_supported() 返回 False，调用方仍按旧逻辑只标记为动态。
+
+纯数据层模块，无 UI 依赖。
+"""
+
+import json
+import os
+import threading
+
+import vdf_parser
+
+_KEY_PREFIX = "user-collections."
+
+# filterSpec.filterGroups 的分组下标（nFormatVersion 2，与客户端动态收藏夹编辑器的分组顺序一致）
+# → appinfo.vdf common 段中对应的 ID 列表字段；未列出的分组本地无法求值
+_FILTER_FORMAT_VERSION = 2
+_GROUP_APPINFO_FIELDS = {
+    2: "genres",
+    3: "store_tags",
+    5: "category",
+}
+
+
+def _parse_value(raw: str):
+    """解析单个收藏夹条目的 value，无效时返回 None"""
+    try:
+        val_obj = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(val_obj, dict):
+        return None
+    spec = val_obj.get("filterSpec")
+    return {
+        "id": val_obj.get("id", ""),
+        "name": val_obj.get("name", "未命名"),
+        "app_ids": [int(x) for x in val_obj.get("added", []) if str(x).isdigit()],
+        "removed": [int(x) for x in val_obj.get("removed", []) if str(x).isdigit()],
+        "is_dynamic": spec is not None,
+        "filter_spec": spec if isinstance(spec, dict) else None,
+    }
+
+
+class CollectionsReader:
+    """单个账号收藏夹文件的缓存视图（线程安全）"""
+
+    def __init__(self, json_path: str):
+        self.json_path = json_path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._entries = {}      # {key: (version, 解析结果或 None)}
+        self._collections = []  # 按名称排序
+        self._by_app = {}       # {app_id(int): [收藏夹 id]}
+
+    def _stat(self):
+        try:
+            st = os.stat(self.json_path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """文件有变化时重新解析，返回是否发生了重新解析"""
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            data = []
+            if stamp is not None:
+                try:
+                    with open(self.json_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = []
+            entries = {}
+            for entry in data if isinstance(data, list) else []:
+                if not isinstance(entry, list) or len(entry) < 2:
+                    continue
+                key, meta = entry[0], entry[1]
+                if not isinstance(key, str) or not key.startswith(_KEY_PREFIX):
+                    continue
+                if not isinstance(meta, dict):
+                    continue
+                if meta.get("is_deleted") is True or "value" not in meta:
+                    continue
+                version = (meta.get("version"), meta.get("timestamp"))
+                cached = self._entries.get(key)
+                if cached is not None and cached[0] == version:
+                    entries[key] = cached
+                else:
+                    entries[key] = (version, _parse_value(meta["value"]))
+            self._entries = entries
+
+            collections = []
+            by_app = {}
+            for key, (_, col) in entries.items():
+                if col is None:
+                    continue
+                if not col["id"]:
+                    col["id"] = key[len(_KEY_PREFIX):]
+                collections.append(col)
+                for aid in col["app_ids"]:
+                    by_app.setdefault(aid, []).append(col["id"])
+            collections.sort(key=lambda c: c['name'].lower())
+            self._collections = collections
+            self._by_app = by_app
+            return True
+
+    def collections(self) -> list:
+        """[{'id', 'name', 'app_ids': [int], 'removed': [int], 'is_dynamic', 'filter_spec'}]
+
+        返回的是缓存对象，调用方不要修改
+        """
+        self.refresh()
+        return self._collections
+
+    def get(self, collection_id: str):
+        self.refresh()
+        for c in self._collections:
+            if c["id"] == collection_id:
+                return c
+        return None
+
+    def collections_of(self, app_id) -> list:
+        """包含该游戏的静态收藏夹名称列表"""
+        self.refresh()
+        try:
+            ids = self._by_app.get(int(app_id), ())
+        except (TypeError, ValueError):
+            return []
+        names = {c["id"]: c["name"] for c in self._collections}
+        return [names[i] for i in ids if i in names]
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_reader(json_path: str) -> CollectionsReader:
+    """同一文件共用一个 CollectionsReader"""
+    with _readers_lock:
+        reader = _readers.get(json_path)
+        if reader is None:
+            reader = _readers[json_path] = CollectionsReader(json_path)
+        return reader
+
+
+# ───────────────────────── 动态收藏夹求值 ─────────────────────────
+
+def _active_groups(spec: dict) -> list:
+    groups = spec.get("filterGroups", [])
+    return [(i, g) for i, g in enumerate(groups)
+            if isinstance(g, dict) and g.get("rgOptions")]
+
+
+def filter_spec_supported(spec: dict) -> bool:
+    """动态收藏夹的全部筛选条件是否都能用本地数据求值"""
+    if not isinstance(spec, dict):
+        return False
+    if spec.get("nFormatVersion") != _FILTER_FORMAT_VERSION:
+        return False
+    return all(i in _GROUP_APPINFO_FIELDS for i, _ in _active_groups(spec))
+
+
+class AppInfoIndex:
+    """appinfo.vdf 中游戏 genre / category / tag ID 的倒排索引（按需增量加载）"""
+
+    def __init__(self, steam_path: str):
+        self.appinfo_path = os.path.join(steam_path, "appcache", "appinfo.vdf")
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._loaded = set()  # 已查找过的 app_id（含 appinfo 中不存在的）
+        self._index = {}      # {(字段, 选项 ID): set(app_id)}
+
+    def _reset_if_changed(self):
+        try:
+            st = os.stat(self.appinfo_path)
+            stamp = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._loaded = set()
+            self._index = {}
+
+    @staticmethod
+    def _id_values(node) -> set:
+        """appinfo 中的 ID 列表有两种形态：{"0": "1", "1": "25"} 与 {"category_2": "1"}"""
+        values = set()
+        if not isinstance(node, dict):
+            return values
+        for k, v in node.items():
+            if k.startswith("category_"):
+                k_id = k[len("category_"):]
+                if k_id.isdigit():
+                    values.add(int(k_id))
+            elif str(v).isdigit():
+                values.add(int(v))
+        return values
+
+    def ensure(self, app_ids):
+        """确保这些游戏的数据已载入索引（只读取尚未查找过的条目）"""
+        with self._lock:
+            self._reset_if_changed()
+            missing = {int(a) for a in app_ids} - self._loaded
+            if not missing or self._stamp is None:
+                self._loaded |= missing
+                return
+            try:
+                for aid, info in vdf_parser.iter_appinfo(self.appinfo_path, missing):
+                    common = info.get("appinfo", {}).get("common", {})
+                    for field in _GROUP_APPINFO_FIELDS.values():
+                        for option in self._id_values(common.get(field)):
+                            self._index.setdefault((field, option), set()).add(aid)
+            except (OSError, vdf_parser.VDFError) as e:
+                print(f"[收藏夹] 读取 appinfo.vdf 失败: {e}")
+            self._loaded |= missing
+
+    def members(self, field: str, option: int) -> set:
+        return self._index.get((field, option), set())
+
+
+def evaluate_filter_spec(spec: dict, candidates, appinfo: AppInfoIndex,
+                         name_of=None) -> set:
+    """在 candidates（int AppID 集合，通常为游戏库/家庭库）中求动态收藏夹的成员
+
+    调用前应先确认 filter_spec_supported(spec)；name_of(app_id_int) 用于 strSearchText
+    """
+    result = set(candidates)
+    active = _active_groups(spec)
+    if active:
+        appinfo.ensure(result)
+    for i, group in active:
+        field = _GROUP_APPINFO_FIELDS[i]
+        option_sets = [appinfo.members(field, int(o)) for o in group["rgOptions"]
+                       if str(o).lstrip("-").isdigit()]
+        if not option_sets:
+            continue
+        if group.get("bAcceptUnion"):
+            result &= set().union(*option_sets)
+        else:
+            for s in option_sets:
+                result &= s
+    text = (spec.get("strSearchText") or "").strip().lower()
+    if text and name_of is not None:
+        result = {a for a in result if text in (name_of(a) or "").lower()}
+    return result
@@ -14,6 +14,7 @@ try:
 except ImportError:
     _HAS_URLLIB = False
 
+import bbcode_parser
 from core import (
     AI_NOTE_PREFIX,
     CONFIDENCE_EMOJI,
@@ -31,6 +32,22 @@ from core import (
     is_insufficient_info_note,
 )
 from account_manager import SteamAccountScanner
+from steam_collections import (
+    AppInfoIndex,
+    evaluate_filter_spec,
+    filter_spec_supported,
+    get_reader as get_collections_reader,
+)
+from game_catalog import (
+    AI_INSUFFICIENT,
+    FAMILY_INTERSECTION,
+    FAMILY_UNION,
+    HAS_AI,
+    LIBRARY,
+    GameCatalog,
+    collection_key,
+    to_id_set,
+)
 from cloud_uploader import SteamCloudUploader
 from ai_generator import SteamAIGenerator, AI_SYSTEM_PROMPT
 from steam_data import (
@@ -288,43 +305,44 @@ class AIBatchMixin:
         scan_container.pack(fill=tk.BOTH, expand=True)
 
         _library_games = []
-        _family_owned_app_ids = set()  # 家庭组所有成员拥有的游戏 app_id 集合（并集）
-        _family_intersection_app_ids = None  # 家庭组所有成员都拥有的游戏（交集），None=未扫描
+        # 游戏表 + 成员集合（游戏库 / 家庭组并集与交集 / 收藏夹 / AI 笔记属性）
+        _catalog = GameCatalog()
         _family_scan_done = [False]  # 是否已完成家庭组扫描
         _loaded_from_cache = [False]  # 是否从缓存加载
 
-        # ── 家庭库缓存：从配置文件加载上次扫描结果 ──
-        def _save_library_cache():
-            """将当前扫描结果保存到配置文件缓存"""
-            cache = {
-                'library_games': _library_games,
-                'family_owned_ids': sorted(_family_owned_app_ids),
-                'steam_id': steam_id_var.get().strip(),
-                'family_codes': sorted(_family_codes),
-                'family_scan_done': _family_scan_done[0],
-            }
-            self._config['family_library_cache'] = cache
-            self._save_config(self._config)
+        def _set_library(games):
+            """登记游戏库到 _catalog（名称 + LIBRARY 集合）"""
+            _catalog.set_members(LIBRARY, _catalog.add_games(games))
+
+        # ── 游戏库快照：从 OwnedGamesCache 载入上次在线扫描结果 ──
+        def _apply_family_snapshots(snapshots: dict) -> bool:
+            """用各成员快照计算家庭组并集/交集，全部成员都有快照时返回 True"""
+            member_sets = [snapshots[c].id_set() for c in _family_codes if snapshots.get(c)]
+            union = _catalog.members(LIBRARY).union(*member_sets)
+            _catalog.set_members(FAMILY_UNION, frozenset(union))
+            _catalog.set_members(FAMILY_INTERSECTION, frozenset(
+                set.intersection(*member_sets) if member_sets else ()))
+            return len(member_sets) == len(_family_codes)
 
         def _try_load_library_cache() -> bool:
-            """尝试从缓存加载家庭库数据，成功返回 True"""
-            nonlocal _library_games, _family_owned_app_ids, _family_scan_done
-            cache = self._config.get('family_library_cache')
-            if not cache:
-                return False
-            # 验证缓存是否仍然有效（Steam ID 和家庭组成员未变化）
-            cached_sid = cache.get('steam_id', '')
-            cached_codes = cache.get('family_codes', [])
-            current_sid = steam_id_var.get().strip()
-            current_codes = sorted(_family_codes)
-            if cached_sid != current_sid or cached_codes != current_codes:
-                return False
-            cached_games = cache.get('library_games', [])
-            if not cached_games:
+            """尝试从快照加载游戏库与家庭库数据，成功返回 True
+
+            主用户快照存在即视为成功；若有家庭组成员缺少快照，_family_scan_done 保持 False，
+            由调用方触发自动扫描（只会请求缺少或过期的成员）。
+            """
+            nonlocal _library_games
+            # 旧版把整个游戏库存在 config.json 中，已由快照取代
+            if self._config.pop('family_library_cache', None) is not None:
+                self._save_config(self._config)
+            cache = self._get_owned_games_cache()
+            snap = cache.load(steam_id_var.get().strip())
+            games = snap.games() if snap is not None else None
+            if not games:
                 return False
-            _library_games = cached_games
-            _family_owned_app_ids = set(cache.get('family_owned_ids', []))
-            _family_scan_done[0] = cache.get('family_scan_done', False)
+            _library_games = games
+            _set_library(_library_games)
+            snapshots = {c: cache.load(c) for c in _family_codes}
+            _family_scan_done[0] = bool(_family_codes) and _apply_family_snapshots(snapshots)
             _loaded_from_cache[0] = True
             # 更新名称缓存
             for g in _library_games:
@@ -332,6 +350,13 @@ class AIBatchMixin:
                     self._game_name_cache[g['app_id']] = g['name']
             return True
 
+        def _recent_additions() -> frozenset:
+            """最近一次在线扫描中新入库的游戏（家庭组已扫描时包含所有成员）"""
+            sids = [steam_id_var.get().strip()]
+            if _family_codes and _family_scan_done[0]:
+                sids += _family_codes
+            return frozenset(self._get_owned_games_cache().recent_additions(sids))
+
         # Steam API 配置状态提示 + Steam ID 输入（合并为一行）
         steam_status_frame = tk.Frame(scan_container)
         steam_status_frame.pack(fill=tk.X, pady=(0, 2))
@@ -422,6 +447,8 @@ class AIBatchMixin:
         collection_frame.pack(fill=tk.X, pady=(0, 2))
         tk.Label(collection_frame, text="📂 按分类筛选:", font=("", 9)).pack(side=tk.LEFT)
         _collections = []
+        _collections_by_display = {}  # {下拉框显示名: 收藏夹 dict}
+        _appinfo_index = AppInfoIndex(self.current_account['steam_path'])  # 动态收藏夹求值用
         _collection_var = tk.StringVar(value="（家庭库所有游戏）")
         collection_combo = ttk.Combobox(collection_frame, textvariable=_collection_var,
                                          width=25, state='readonly',
@@ -477,7 +504,7 @@ class AIBatchMixin:
         _ai_gen_filter_var = tk.StringVar(value="全部")
         ai_gen_filter_combo = ttk.Combobox(
             ai_filter_row, textvariable=_ai_gen_filter_var, width=18,
-            values=["全部", "☁️ 有改动", "☁️⬆ 上传中", "🤖 AI 处理过", "📝 未 AI 处理",
+            values=["全部", "🆕 新入库", "☁️ 有改动", "☁️⬆ 上传中", "🤖 AI 处理过", "📝 未 AI 处理",
                     "⛔ 信息过少", "📡 联网检索", "📚 非联网"], state='readonly')
         ai_gen_filter_combo.pack(side=tk.LEFT, padx=(3, 0))
 
@@ -514,31 +541,33 @@ class AIBatchMixin:
             """隐藏扫描进度条"""
             _scan_progress_frame.pack_forget()
 
-        def _get_selected_collection_ids():
-            """根据下拉框选中的分类名，返回该分类的 app_ids 集合，未选中返回 None"""
-            sel = _collection_var.get()
-            if sel == "（家庭库所有游戏）":
-                return None
-            for c in _collections:
-                display_name = f"{c['name']} ({len(c['app_ids'])})"
-                if display_name == sel:
-                    return set(str(x) for x in c['app_ids'])
-            return None
+        def _get_selected_collection():
+            """根据下拉框选中的分类名，返回该分类的收藏夹 dict，未选中返回 None"""
+            return _collections_by_display.get(_collection_var.get())
+
+        def _collection_members(col, owned):
+            """收藏夹的 AppID 集合：静态收藏夹直接取 _catalog 中的集合，
+            动态收藏夹在 owned 范围内按 filterSpec 求值"""
+            key = collection_key(col['id'])
+            if not col['is_dynamic']:
+                return _catalog.members(key)
+            ids = evaluate_filter_spec(
+                col['filter_spec'], owned, _appinfo_index,
+                name_of=lambda a: _catalog.name(a) or self._get_game_name(str(a)))
+            ids = (ids | set(col['app_ids'])) - set(col['removed'])
+            return _catalog.set_members(key, frozenset(ids))
 
         def _populate_listbox(filter_text=""):
             nonlocal _filtered_indices, _ai_notes_map_cache
             games_listbox.delete(0, tk.END)
             _filtered_indices = []
-            ft = filter_text.strip().lower()
 
             # 获取 syncstate（上传中检测）
             _syncstate_map = self._parse_remotecache_syncstates()
 
-            # 获取选中的分类
-            col_app_ids = _get_selected_collection_ids()
-
-            # 扫描 AI 笔记状态
+            # 扫描 AI 笔记状态，并重建 AI 属性成员集合
             _ai_notes_map_cache = self.manager.scan_ai_notes()
+            _catalog.index_ai_notes(_ai_notes_map_cache)
 
             # AI 筛选模式 & 确信度筛选
             ai_mode = _ai_gen_filter_var.get()
@@ -552,9 +581,6 @@ class AIBatchMixin:
             # 收集所有确信度（用于更新下拉框）
             all_confidences = set()
 
-            # 用于统计的变量
-            intersection = None
-
             def _make_display(app_id, name):
                 """为列表项生成显示文本和颜色"""
                 has_ai = app_id in _ai_notes_map_cache
@@ -577,7 +603,6 @@ class AIBatchMixin:
                     ai_tag = " 🤖"
                 else:
                     ai_tag = ""
-                dirty_tag = " ⬆" if is_dirty else ""
                 is_uploading = _syncstate_map.get(app_id) == 3
                 if is_uploading:
                     dirty_tag = " ☁️⬆"
@@ -587,148 +612,88 @@ class AIBatchMixin:
                     dirty_tag = ""
                 return f" {app_id:>10s}  |  {name}{ai_tag}{dirty_tag}", has_ai, is_dirty, is_uploading
 
-            def _should_include(app_id):
-                """判断是否通过 AI 筛选 + 确信度筛选 + dirty 筛选"""
-                has_ai = app_id in _ai_notes_map_cache
-                ai_info = _ai_notes_map_cache.get(app_id, {})
-                if ai_mode == "☁️ 有改动" and not self.manager.is_dirty(app_id):
-                    return False
-                if ai_mode == "☁️⬆ 上传中" and _syncstate_map.get(app_id) != 3:
-                    return False
-                if ai_mode == "🤖 AI 处理过" and not has_ai:
-                    return False
-                if ai_mode == "📝 未 AI 处理" and has_ai:
-                    return False
-                if ai_mode == "⛔ 信息过少":
-                    if not has_ai or not ai_info.get('has_insufficient', False):
-                        return False
-                if ai_mode == "📡 联网检索":
-                    if not has_ai or 'web' not in ai_info.get('info_sources', []):
-                        return False
-                if ai_mode == "📚 非联网":
-                    if not has_ai or 'local' not in ai_info.get('info_sources', []):
-                        return False
-                if (ai_mode.startswith("🤖 ")
-                        and ai_mode != "🤖 AI 处理过"):
-                    target_model = ai_mode[2:]
-                    if target_model not in ai_info.get('models', []):
-                        return False
+            def _apply_filters(ids):
+                """AI 筛选 + 确信度/质量筛选 + dirty 筛选，全部为集合运算"""
+                if ai_mode == "🆕 新入库":
+                    ids = ids & _recent_additions()
+                elif ai_mode == "☁️ 有改动":
+                    ids = ids & to_id_set(self.manager.dirty_app_ids())
+                elif ai_mode == "☁️⬆ 上传中":
+                    ids = ids & to_id_set(a for a, st in _syncstate_map.items() if st == 3)
+                elif ai_mode == "🤖 AI 处理过":
+                    ids = ids & _catalog.members(HAS_AI)
+                elif ai_mode == "📝 未 AI 处理":
+                    ids = ids - _catalog.members(HAS_AI)
+                elif ai_mode == "⛔ 信息过少":
+                    ids = ids & _catalog.members(AI_INSUFFICIENT)
+                elif ai_mode == "📡 联网检索":
+                    ids = ids & _catalog.ai_members('info_sources', 'web')
+                elif ai_mode == "📚 非联网":
+                    ids = ids & _catalog.ai_members('info_sources', 'local')
+                elif ai_mode.startswith("🤖 "):
+                    ids = ids & _catalog.ai_members('models', ai_mode[2:])
                 # 确信度二级筛选
                 if is_ai_mode and conf_filter != "全部确信度":
-                    if conf_filter not in ai_info.get('confidences', []):
-                        return False
+                    ids = ids & _catalog.ai_members('confidences', conf_filter)
                 # 质量二级筛选
                 if is_ai_mode and qual_filter != "全部质量":
                     qual_key = qual_filter
                     for q_emoji in QUALITY_EMOJI.values():
                         qual_key = qual_key.replace(q_emoji, "")
-                    if qual_key not in ai_info.get('qualities', []):
-                        return False
-                return True
-
-            # 构建要显示的游戏列表
-            if col_app_ids is not None:
-                # 如果有家庭组成员且已扫描，使用家庭组拥有的游戏（并集）进行交集
-                if _family_codes and _family_scan_done[0] and _family_owned_app_ids:
-                    family_set = _family_owned_app_ids
-                    intersection = col_app_ids & family_set
-                    # 名称：优先从 _library_games 取，其次从游戏名称缓存取
-                    lib_name_map = {g['app_id']: g['name'] for g in _library_games}
-                    def _get_name(aid):
-                        if aid in lib_name_map:
-                            return lib_name_map[aid]
-                        return self._get_game_name(aid)
-                    display_list = [{'app_id': a, 'name': _get_name(a)}
-                                    for a in sorted(intersection)]
-                else:
-                    lib_app_ids = {g['app_id'] for g in _library_games}
-                    intersection = col_app_ids & lib_app_ids
-                    lib_name_map = {g['app_id']: g['name'] for g in _library_games}
-                    display_list = [{'app_id': a, 'name': lib_name_map.get(a, f"AppID {a}")}
-                                    for a in sorted(intersection)]
-
-                display_list.sort(key=lambda x: x['name'].lower())
-                for idx, g in enumerate(display_list):
-                    if ft and ft not in g['name'].lower() and ft not in g['app_id']:
-                        continue
-                    if not _should_include(g['app_id']):
-                        continue
-                    _filtered_indices.append(('col', g['app_id'], g['name']))
-                    text, has_ai, is_dirty, is_uploading = _make_display(g['app_id'], g['name'])
-                    games_listbox.insert(tk.END, text)
-                    if is_uploading:
-                        games_listbox.itemconfig(games_listbox.size() - 1, fg="#2e7d32")
-                    elif is_dirty:
-                        games_listbox.itemconfig(games_listbox.size() - 1, fg="#b8860b")
-                    elif has_ai:
-                        games_listbox.itemconfig(games_listbox.size() - 1, fg="#1a73e8")
-            else:
-                # 无分类选中 — 默认显示游戏库
-                # 如果家庭组已扫描，显示所有成员拥有的游戏（并集）
-                if (_family_codes and _family_scan_done[0]
-                        and _family_owned_app_ids):
-                    lib_name_map = {g['app_id']: g['name'] for g in _library_games}
-                    def _get_name_fb(aid):
-                        if aid in lib_name_map:
-                            return lib_name_map[aid]
-                        return self._get_game_name(aid)
-                    all_ids = sorted(_family_owned_app_ids)
-                    family_display_list = [
-                        {'app_id': a, 'name': _get_name_fb(a)} for a in all_ids]
-                    family_display_list.sort(key=lambda x: x['name'].lower())
-                    for g in family_display_list:
-                        if ft and ft not in g['name'].lower() and ft not in g['app_id']:
-                            continue
-                        if not _should_include(g['app_id']):
-                            continue
-                        _filtered_indices.append(('col', g['app_id'], g['name']))
-                        text, has_ai, is_dirty, is_uploading = _make_display(g['app_id'], g['name'])
-                        games_listbox.insert(tk.END, text)
-                        if is_uploading:
-                            games_listbox.itemconfig(games_listbox.size() - 1, fg="#2e7d32")
-                        elif is_dirty:
-                            games_listbox.itemconfig(games_listbox.size() - 1, fg="#b8860b")
-                        elif has_ai:
-                            games_listbox.itemconfig(games_listbox.size() - 1, fg="#1a73e8")
+                    ids = ids & _catalog.ai_members('qualities', qual_key)
+                return ids
+
+            # 构建要显示的游戏集合：家庭组已扫描时为家庭组并集，否则为游戏库；
+            # 选中分类时再与分类取交集
+            family_active = bool(_family_codes and _family_scan_done[0]
+                                 and _catalog.members(FAMILY_UNION))
+            owned = _catalog.members(FAMILY_UNION if family_active else LIBRARY)
+            col = _get_selected_collection()
+            intersection = None
+            if col is not None:
+                col_app_ids = _collection_members(col, owned)
+                owned = intersection = col_app_ids & owned
+
+            shown = _catalog.search(_apply_filters(owned), filter_text,
+                                    name_resolver=self._get_game_name)
+            for app_id, name in _catalog.sorted_by_name(
+                    shown, name_resolver=self._get_game_name):
+                _filtered_indices.append(('col', app_id, name))
+                text, has_ai, is_dirty, is_uploading = _make_display(app_id, name)
+                games_listbox.insert(tk.END, text)
+                if is_uploading:
+                    games_listbox.itemconfig(games_listbox.size() - 1, fg="#2e7d32")
+                elif is_dirty:
+                    games_listbox.itemconfig(games_listbox.size() - 1, fg="#b8860b")
+                elif has_ai:
+                    games_listbox.itemconfig(games_listbox.size() - 1, fg="#1a73e8")
 
             # 统计信息
+            extra = ""
+            if filter_text.strip() or ai_mode != "全部":
+                extra = f"，筛选 {len(_filtered_indices)} 款"
             if intersection is not None:
-                total_in_collection = len(col_app_ids)
-                owned_count = len(intersection)
-                source_label = "家庭组入库" if (_family_codes and _family_scan_done[0] and _family_owned_app_ids) else "该用户拥有"
+                source_label = "家庭组入库" if family_active else "该用户拥有"
                 scan_info_label.config(
-                    text=f"收藏夹共 {total_in_collection} 款，{source_label} {owned_count} 款"
-                         + (f"，筛选 {len(_filtered_indices)} 款" if ft or ai_mode != "全部" else ""),
+                    text=f"收藏夹共 {len(col_app_ids)} 款，{source_label} {len(intersection)} 款{extra}",
                     fg="#333"
                 )
-            elif (_family_codes and _family_scan_done[0]
-                  and _family_owned_app_ids
-                  and col_app_ids is None):
+            elif family_active:
                 # 无分类，显示家庭组并集统计
-                total_union = len(_family_owned_app_ids)
-                extra = ""
-                if ft or ai_mode != "全部":
-                    extra = f"，筛选 {len(_filtered_indices)} 款"
                 scan_info_label.config(
-                    text=f"家庭组所有人的游戏共 {total_union} 款{extra}",
+                    text=f"家庭组所有人的游戏共 {len(owned)} 款{extra}",
                     fg="#333"
                 )
             else:
-                extra = ""
-                if ft or ai_mode != "全部":
-                    extra = f"，筛选 {len(_filtered_indices)} 款"
                 scan_info_label.config(
                     text=f"共 {len(_library_games)} 款{extra}",
                     fg="#333"
                 )
 
             # 更新 AI 筛选器下拉选项（加入检测到的模型名）
-            all_models = set()
-            for info in _ai_notes_map_cache.values():
-                for m in info.get('models', []):
-                    all_models.add(m)
-            filter_values = ["全部", "☁️ 有改动", "☁️⬆ 上传中", "🤖 AI 处理过", "📝 未 AI 处理"]
-            for m in sorted(all_models):
+            filter_values = ["全部", "🆕 新入库", "☁️ 有改动", "☁️⬆ 上传中",
+                             "🤖 AI 处理过", "📝 未 AI 处理"]
+            for m in _catalog.ai_values('models'):
                 filter_values.append(f"🤖 {m}")
             ai_gen_filter_combo['values'] = filter_values
 
@@ -766,11 +731,28 @@ class AIBatchMixin:
             nonlocal _collections
             raw = SteamAccountScanner.get_collections(
                 self.current_account['userdata_path'])
-            # 过滤掉空分类（0 个游戏的分类没意义）
-            _collections = [c for c in raw if len(c['app_ids']) > 0]
-            names = ["（家庭库所有游戏）"] + [
-                f"{c['name']} ({len(c['app_ids'])})" for c in _collections]
+            # 过滤掉空分类（0 个游戏的分类没意义）；动态分类只保留能用本地数据求值的
+            _collections = [c for c in raw
+                            if (filter_spec_supported(c['filter_spec']) if c['is_dynamic']
+                                else len(c['app_ids']) > 0)]
+            prev = _collections_by_display.get(_collection_var.get())
+            _collections_by_display.clear()
+            _catalog.drop_members("collection")
+            for c in _collections:
+                if c['is_dynamic']:
+                    display_name = f"{c['name']} (动态)"
+                else:
+                    display_name = f"{c['name']} ({len(c['app_ids'])})"
+                    _catalog.set_members(collection_key(c['id']), c['app_ids'])
+                _collections_by_display[display_name] = c
+            names = ["（家庭库所有游戏）"] + list(_collections_by_display)
             collection_combo['values'] = names
+            # 游戏数变化会改变显示名，按收藏夹 id 保持当前选中项
+            if prev is not None and _collection_var.get() not in _collections_by_display:
+                for display_name, c in _collections_by_display.items():
+                    if c['id'] == prev['id']:
+                        _collection_var.set(display_name)
+                        break
             if _collections:
                 scan_info_label.config(
                     text=f"已加载 {len(_collections)} 个分类", fg="#333")
@@ -786,6 +768,7 @@ class AIBatchMixin:
             nonlocal _library_games
             _library_games = SteamAccountScanner.scan_library(
                 self.current_account['steam_path'])
+            _set_library(_library_games)
             if not _library_games:
                 scan_info_label.config(
                     text="⚠️ 未扫描到本地游戏", fg="orange")
@@ -833,7 +816,14 @@ class AIBatchMixin:
                 return "break"
             txt.bind("<Key>", _block_edit)
 
-        def do_scan_online():
+        _online_scan_running = [False]
+
+        def do_scan_online(force=True):
+            """在线扫描主用户与家庭组成员的游戏库（后台并行，结果回主线程应用）
+
+            force=True（点击按钮）时成员游戏库全部重新获取；自动扫描时
+            成员使用未过期的磁盘缓存，只获取新增或过期的成员。
+            """
             skey = saved_steam_key
             sid = steam_id_var.get().strip()
             if not skey:
@@ -846,128 +836,99 @@ class AIBatchMixin:
                 messagebox.showwarning("提示", "请输入 Steam ID 或好友代码。",
                                         parent=win)
                 return
-            # 清除缓存，强制重新扫描
-            self._config.pop('family_library_cache', None)
+            if _online_scan_running[0]:
+                return
+            _online_scan_running[0] = True
             _loaded_from_cache[0] = False
-            # 计算总扫描步骤数：1（主用户）+ 家庭组成员数
-            total_steps = 1 + (len(_family_codes) if _family_codes and skey else 0)
+            _family_scan_done[0] = False
+            members = list(_family_codes)
+            # 总扫描步骤数：1（主用户）+ 家庭组成员数
+            total_steps = 1 + len(members)
             scan_info_label.config(text="🌐 正在通过 Steam API 获取...", fg="#333")
             _show_scan_progress(
-                f"🌐 正在扫描主用户游戏库... (1/{total_steps})", 0, total_steps)
-            win.update_idletasks()
-            nonlocal _library_games, _family_owned_app_ids
-            _family_scan_done[0] = False
-            debug_info = "[初始化] 开始在线扫描...\n"
-            try:
-                debug_info += f"[调用] scan_library_online(sid='{sid}', key='{skey[:6]}...')\n"
-                scan_result = SteamAccountScanner.scan_library_online(sid, skey)
-                debug_info += f"[返回] type = {type(scan_result)}\n"
-                if isinstance(scan_result, tuple) and len(scan_result) == 2:
-                    _library_games, scan_debug = scan_result
-                    debug_info += scan_debug
-                elif isinstance(scan_result, list):
-                    _library_games = scan_result
-                    debug_info += "[注意] 返回了 list 而非 tuple\n"
-                else:
-                    _library_games = []
-                    debug_info += f"[异常] 返回值类型不符: {type(scan_result)}\n"
-                _last_debug_info['text'] = debug_info
-                if not _library_games:
-                    scan_info_label.config(
-                        text="⚠️ 未获取到游戏，检查 ID/Key 或资料可能未公开",
-                        fg="orange")
-                    _show_debug_info(debug_info, parent=win)
+                f"🌐 正在并行获取 {total_steps} 个游戏库...", 0, total_steps)
+
+            def _on_progress(done, total, code, count):
+                # 工作线程中调用：只构造文本，界面更新交给主线程
+                if count is None:
+                    text = f"❌ ID {code} 获取失败 ({done}/{total})"
                 else:
-                    _show_scan_progress(
-                        f"✅ 主用户: {len(_library_games)} 款游戏 (1/{total_steps})",
-                        1, total_steps)
-            except Exception as e:
-                import traceback
-                tb_str = traceback.format_exc()
+                    text = f"✅ ID {code}: {count} 款 ({done}/{total})"
+                try:
+                    win.after(0, lambda: _show_scan_progress(text, done, total))
+                except (RuntimeError, tk.TclError):
+                    pass  # 窗口已关闭
+
+            def _worker():
+                try:
+                    result = SteamAccountScanner.scan_family_online(
+                        sid, members, skey, cache=self._get_owned_games_cache(),
+                        max_age=0 if force else None, progress_callback=_on_progress)
+                    error = None
+                except Exception as e:
+                    import traceback
+                    result = None
+                    error = (e, traceback.format_exc())
+                try:
+                    win.after(0, lambda: _apply_online_scan(result, error))
+                except (RuntimeError, tk.TclError):
+                    pass  # 窗口已关闭
+
+            threading.Thread(target=_worker, daemon=True).start()
+
+        def _apply_online_scan(result, error):
+            """主线程：应用在线扫描结果"""
+            nonlocal _library_games
+            _online_scan_running[0] = False
+            debug_info = "[初始化] 开始在线扫描...\n"
+            if error is not None:
+                e, tb_str = error
                 debug_info += f"\n[异常] {type(e).__name__}: {e}\n{tb_str}\n"
                 _last_debug_info['text'] = debug_info
-                err_display = str(e)
-                if hasattr(e, 'code'):
-                    err_display = f"HTTP {e.code}"
-                    try:
-                        err_display += f" — {e.read().decode('utf-8')[:200]}"
-                    except Exception:
-                        pass
-                scan_info_label.config(text=f"❌ 失败: {err_display}", fg="red")
+                scan_info_label.config(text=f"❌ 失败: {e}", fg="red")
                 _library_games = []
+                _set_library(_library_games)
+                _hide_scan_progress()
                 _show_debug_info(debug_info, parent=win)
+                _populate_listbox(search_var.get())
+                return
 
-            # 如果配置了家庭组成员，后台扫描所有成员的游戏库
-            if _family_codes and skey:
-                _scan_family_members(skey, total_steps)
+            _library_games = result['games']
+            _set_library(_library_games)
+            debug_info += result['debug']
+            _last_debug_info['text'] = debug_info
+            if not _library_games:
+                scan_info_label.config(
+                    text="⚠️ 未获取到游戏，检查 ID/Key 或资料可能未公开",
+                    fg="orange")
+                _show_debug_info(debug_info, parent=win)
 
-            # 保存扫描结果到缓存
-            if _library_games:
-                _save_library_cache()
+            if _family_codes:
+                # 成员游戏名称顺便写入名称缓存
+                for aid, name in result['names'].items():
+                    if aid not in self._game_name_cache:
+                        self._game_name_cache[aid] = name
+                # 并集/交集在数据层以整数集合计算，这里转为列表使用的字符串形式
+                union = _catalog.set_members(FAMILY_UNION, frozenset(result['union']))
+                inter = _catalog.set_members(FAMILY_INTERSECTION,
+                                             frozenset(result['intersection']))
+                _family_scan_done[0] = True
+                for code in result['failed']:
+                    print(f"[家庭组] 扫描成员 {code} 失败")
+                print(f"[家庭组] 扫描完成，并集 {len(union)} 款，"
+                      f"交集 {len(inter)} 款"
+                      f"（缓存命中 {len(result['from_cache'])} 人）")
 
             _hide_scan_progress()
             _populate_listbox(search_var.get())
 
-        def _scan_family_members(skey, total_steps=None):
-            """扫描所有家庭组成员的游戏库，合并到 _family_owned_app_ids（并集），
-            同时计算 _family_intersection_app_ids（交集）"""
-            nonlocal _family_owned_app_ids, _family_intersection_app_ids
-            _family_owned_app_ids = set()
-            _family_intersection_app_ids = None
-            per_member_sets = []
-            total_members = len(_family_codes)
-            if total_steps is None:
-                total_steps = 1 + total_members
-            total_games_fetched = 0
-            for i, code in enumerate(_family_codes):
-                step = i + 2  # 1 是主用户，从 2 开始
+            # 新入库提示（快照已在数据层写入）
+            added = _recent_additions() & _catalog.members(
+                FAMILY_UNION if _family_scan_done[0] else LIBRARY)
+            if added and _library_games:
                 scan_info_label.config(
-                    text=f"🌐 正在扫描家庭组成员 {i+1}/{total_members} (ID: {code})...",
-                    fg="#333")
-                _show_scan_progress(
-                    f"👨‍👩‍👧‍👦 扫描家庭组成员 {i+1}/{total_members} (ID: {code})... "
-                    f"已获取 {total_games_fetched} 款",
-                    step - 1, total_steps)
-                win.update_idletasks()
-                member_ids = set()
-                try:
-                    result = SteamAccountScanner.scan_library_online(code, skey)
-                    if isinstance(result, tuple) and len(result) == 2:
-                        games, _ = result
-                    elif isinstance(result, list):
-                        games = result
-                    else:
-                        games = []
-                    for g in games:
-                        member_ids.add(g['app_id'])
-                        _family_owned_app_ids.add(g['app_id'])
-                        # 顺便更新名称缓存
-                        if g['app_id'] not in self._game_name_cache:
-                            self._game_name_cache[g['app_id']] = g['name']
-                    total_games_fetched += len(games)
-                    _show_scan_progress(
-                        f"✅ 成员 {i+1}/{total_members}: {len(games)} 款 | "
-                        f"合计 {total_games_fetched} 款",
-                        step, total_steps)
-                except Exception as e:
-                    print(f"[家庭组] 扫描成员 {code} 失败: {e}")
-                    _show_scan_progress(
-                        f"❌ 成员 {i+1}/{total_members} (ID: {code}) 扫描失败",
-                        step, total_steps)
-                per_member_sets.append(member_ids)
-            # 计算交集（所有成员都拥有的游戏）
-            if per_member_sets:
-                _family_intersection_app_ids = set(per_member_sets[0])
-                for ms in per_member_sets[1:]:
-                    _family_intersection_app_ids &= ms
-            else:
-                _family_intersection_app_ids = set()
-            # 也把当前扫描用户的游戏包含进并集
-            for g in _library_games:
-                _family_owned_app_ids.add(g['app_id'])
-            _family_scan_done[0] = True
-            print(f"[家庭组] 扫描完成，并集 {len(_family_owned_app_ids)} 款，"
-                  f"交集 {len(_family_intersection_app_ids)} 款")
+                    text=f"🆕 较上次扫描新入库 {len(added)} 款（可用筛选「🆕 新入库」查看）",
+                    fg="#2e7d32")
 
         def do_select_all():
             games_listbox.select_set(0, tk.END)
@@ -1035,6 +996,12 @@ class AIBatchMixin:
                      font=("", 12, "bold")).pack(side=tk.LEFT)
             tk.Label(hdr, text=f"AppID: {app_id}",
                      font=("", 9), fg="#666").pack(side=tk.RIGHT)
+            in_collections = get_collections_reader(
+                SteamAccountScanner.get_collections_path(
+                    self.current_account['userdata_path'])).collections_of(app_id)
+            if in_collections:
+                tk.Label(preview, text=f"📁 收藏夹: {', '.join(in_collections)}",
+                         font=("", 9), fg="#666", anchor=tk.W, padx=10).pack(fill=tk.X)
 
             # AI 状态摘要
             ai_info = _ai_notes_map_cache.get(app_id, {})
@@ -1141,9 +1108,7 @@ class AIBatchMixin:
                 # 显示内容（去掉 AI 前缀冗余信息，只保留正文）
                 display_content = content
                 # 先去除 BBCode 标签（content 经过 _wrap_content 包裹了 [p]...[/p]）
-                display_content = re.sub(
-                    r'\[/?[a-z0-9*]+(?:=[^\]]*)?\]', '', display_content
-                ).strip()
+                display_content = bbcode_parser.strip_tags(display_content).strip()
                 if is_ai:
                     # 新版前缀格式（含信息来源、信息量和游戏质量）
                     m = re.match(
@@ -1243,19 +1208,33 @@ class AIBatchMixin:
         # 首次自动加载分类（所有 widget 已创建）
         _load_collections()
 
+        # Steam 客户端修改收藏夹时自动重新加载（窗口关闭时注销）
+        def _on_collections_file_changed():
+            _load_collections()
+            _on_collection_changed()
+        self._collections_listeners.append(_on_collections_file_changed)
+
+        def _unregister_collections_listener(event):
+            if event.widget is win and _on_collections_file_changed in self._collections_listeners:
+                self._collections_listeners.remove(_on_collections_file_changed)
+        win.bind("<Destroy>", _unregister_collections_listener, add="+")
+
         # 首次自动加载：优先从缓存加载，否则在线扫描，最后本地扫描
         if saved_steam_key and steam_id_var.get().strip():
             if _try_load_library_cache():
-                # 从缓存加载成功
+                # 从快照加载成功
                 n = len(_library_games)
-                f = len(_family_owned_app_ids)
+                f = len(_catalog.members(FAMILY_UNION))
+                _populate_listbox(search_var.get())
                 scan_info_label.config(
                     text=f"📦 已从缓存加载（{n} 款，家庭库 {f} 款）— 点击「在线扫描」刷新",
                     fg="#666")
-                _populate_listbox(search_var.get())
+                if _family_codes and not _family_scan_done[0]:
+                    # 有成员缺少快照：后台补扫（只请求缺少或过期的成员）
+                    win.after(100, lambda: do_scan_online(force=False))
             else:
                 # 缓存不可用，自动触发在线扫描
-                win.after(100, do_scan_online)
+                win.after(100, lambda: do_scan_online(force=False))
         else:
             # 否则触发本地扫描
             do_scan_library()
@@ -1468,6 +1447,8 @@ class AIBatchMixin:
             pkey = _get_current_provider()
             custom_url = _get_current_url()
             current_model = _get_current_model()
+            # Tk 变量只能在主线程读取；工作线程在 edit() 事务内持有写锁，不能再等主线程
+            skip_existing = skip_existing_var.get()
 
             def worker():
                 generator = SteamAIGenerator(
@@ -1490,7 +1471,7 @@ class AIBatchMixin:
                     if is_paused[0]:
                         _save_queue(
                             _remaining_queue, active_token_idx[0],
-                            skip_existing_var.get(), web_search_var.get())
+                            skip_existing, web_search_var.get())
                         def _on_paused(s=success_count, f=fail_count, r=len(_remaining_queue)):
                             progress_var.set(f"⏸️ 已暂停 — 完成 {s}，失败 {f}，剩余 {r}")
                             log(f"⏸️ 已暂停，剩余 {r} 款待处理（已保存，可关闭窗口稍后继续）")
@@ -1589,9 +1570,7 @@ class AIBatchMixin:
                             success_count += 1
                         elif content.strip():
                             flat_content = ' '.join(content.strip().splitlines())
-                            flat_content = re.sub(
-                                r'\[/?[a-z0-9*]+(?:=[^\]]*)?\]', '', flat_content)
-                            flat_content = flat_content.strip()
+                            flat_content = bbcode_parser.strip_tags(flat_content).strip()
                             ai_prefix = (
                                 f"🤖AI: {info_source_tag} | "
                                 f"相关信息量：{info_volume}{vol_emoji} | "
@@ -1601,20 +1580,11 @@ class AIBatchMixin:
                                 f"{confidence}{conf_emoji}。")
                             flat_content = f"{ai_prefix} {flat_content}"
 
-                            # 未跳过时自动替换旧 AI 笔记
-                            if not skip_existing_var.get():
-                                data = self.manager.read_notes(aid)
-                                notes_list = data.get("notes", [])
-                                had_old = False
-                                for ni in reversed(range(len(notes_list))):
-                                    if is_ai_note(notes_list[ni]):
-                                        notes_list.pop(ni)
-                                        had_old = True
-                                if had_old:
-                                    data["notes"] = notes_list
-                                    self.manager.write_notes(aid, data)
-
-                            self.manager.create_note(aid, flat_content, flat_content)
+                            # 未跳过时自动替换旧 AI 笔记（同一事务内完成，只读写一次）
+                            with self.manager.edit(aid) as notes_tx:
+                                if not skip_existing:
+                                    notes_tx.remove_notes(is_ai_note)
+                                notes_tx.create_note(flat_content, flat_content)
                             win.after(0, lambda a=aid, n=name, c=confidence, v=info_volume, q=quality: log(
                                 f"✅ 完成: {n} (AppID {a}) "
                                 f"[确信: {c}] [信息量: {v}] [质量: {q}]"))
@@ -3,7 +3,6 @@
 import json
 import os
 import platform
-import re
 import string
 import threading
 import time
@@ -31,9 +30,12 @@ from core import (
     extract_ai_quality_from_note,
     is_insufficient_info_note,
     SteamNotesManager,
+    SyncStateTracker,
 )
-from account_manager import SteamAccountScanner
+from account_manager import OwnedGamesCache, SteamAccountScanner
 from cloud_uploader import SteamCloudUploader
+from fs_watcher import OVERFLOW, create_watcher
+from game_catalog import AI_INSUFFICIENT, HAS_AI, ai_key, ai_note_sets
 from ai_generator import (
     SteamAIGenerator,
     AI_SYSTEM_PROMPT,
@@ -44,6 +46,7 @@ from ui_notes_viewer import NotesViewerMixin
 from ui_ai_batch import AIBatchMixin
 from ui_import_export import ImportExportMixin
 from ui_settings import SettingsMixin
+from ui_tasks import TaskRunnerMixin
 
 from rich_text_editor import SteamRichTextEditor
 from steam_data import get_game_name_from_steam
@@ -53,22 +56,35 @@ from steam_data import get_game_name_from_steam
 #  主应用类
 # ═══════════════════════════════════════════════════════════════════════════════
 
-class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsMixin):
+class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsMixin,
+                    TaskRunnerMixin):
     """Steam 笔记管理器 GUI"""
 
     # API Key 配置文件路径（跨平台）
     _CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".steam_notes_gen")
     _CONFIG_FILE = os.path.join(_CONFIG_DIR, "config.json")
+    _OWNED_GAMES_DIR = os.path.join(_CONFIG_DIR, "owned_games")
 
     def __init__(self):
         self.current_account = None
         self.accounts = []
         self.manager = None  # SteamNotesManager
+        self._syncstate_tracker = None  # SyncStateTracker（remotecache.vdf 缓存视图）
+        self._refreshing_games = False
+        self._steam_check_busy = False  # 后台 Steam 进程检测进行中
+        # 文件监视：监视线程产生的事件先合并，再由主线程统一处理
+        self._fs_watcher = None
+        self._fs_pending = {}  # {path: kind}
+        self._fs_lock = threading.Lock()
+        self._fs_flush_scheduled = False
+        self._fs_collections_path = None  # 当前账号收藏夹文件（绝对路径）
+        self._collections_listeners = []  # 收藏夹文件变化时调用的回调（主线程）
         self.cloud_uploader = None  # SteamCloudUploader
         self.root = None
         self._games_data = []
         self._game_name_cache = {}  # {app_id: name} — 缓存在线解析的游戏名
         self._game_name_cache_loaded = False
+        self._owned_games_cache = None  # OwnedGamesCache（各账号已拥有游戏快照，首次使用时创建）
         self._config = self._load_config()
 
     @classmethod
@@ -92,6 +108,12 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         except Exception:
             pass
 
+    def _get_owned_games_cache(self) -> OwnedGamesCache:
+        """各 Steam 账号已拥有游戏的快照存储（AI 批量窗口游戏库与家庭组扫描共用）"""
+        if self._owned_games_cache is None:
+            self._owned_games_cache = OwnedGamesCache(self._OWNED_GAMES_DIR)
+        return self._owned_games_cache
+
     def _get_saved_key(self, key_name: str) -> str:
         """获取已保存的 API Key"""
         return self._config.get(key_name, "")
@@ -157,7 +179,13 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         hashes = self._config.get(f"uploaded_hashes_{fc}", {})
         self.manager = SteamNotesManager(
             account['notes_dir'], self.cloud_uploader,
-            uploaded_hashes=hashes)
+            uploaded_hashes=hashes,
+            compact_json=self._config.get("notes_compact_json", False))
+        if self.manager.hashes_upgraded:
+            # 旧版 MD5 / stat 不符但内容未变的记录已升级，立即保存，下次启动免重新哈希
+            self._save_uploaded_hashes()
+        self._syncstate_tracker = SyncStateTracker.for_notes_dir(account['notes_dir'])
+        self._syncstate_tracker.add_listener(self._on_syncstates_changed)
         # 切换账号时清空游戏名称缓存
         self._game_name_cache = {}
         self._game_name_cache_loaded = False
@@ -174,11 +202,13 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
 
     def run(self):
         """主入口"""
-        self.accounts = SteamAccountScanner.scan_accounts()
+        # 先只列出账号，昵称与笔记数在选择界面中后台补全
+        self.accounts = SteamAccountScanner.scan_accounts(with_details=False)
 
         if not self.accounts:
             self._show_no_account_ui()
         elif len(self.accounts) == 1:
+            SteamAccountScanner.load_account_details(self.accounts[0])
             self.set_current_account(self.accounts[0])
             self._show_main_window()
         else:
@@ -206,23 +236,7 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
                 if not os.path.exists(userdata):
                     messagebox.showerror("错误", "该目录下没有 userdata 文件夹。")
                     return
-                for entry in os.listdir(userdata):
-                    ep = os.path.join(userdata, entry)
-                    if os.path.isdir(ep) and entry.isdigit():
-                        notes_dir = os.path.join(ep, NOTES_APPID, "remote")
-                        persona = SteamAccountScanner._get_persona_name(ep, entry)
-                        nc = 0
-                        if os.path.exists(notes_dir):
-                            nc = len([f for f in os.listdir(notes_dir)
-                                      if f.startswith("notes_")])
-                        self.accounts.append({
-                            'friend_code': entry,
-                            'userdata_path': ep,
-                            'notes_dir': notes_dir,
-                            'persona_name': persona,
-                            'steam_path': path,
-                            'notes_count': nc,
-                        })
+                self.accounts.extend(SteamAccountScanner.scan_accounts([path]))
                 if self.accounts:
                     root.destroy()
                     if len(self.accounts) == 1:
@@ -258,19 +272,46 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         listbox.config(yscrollcommand=scrollbar.set)
 
+        def row_text(acc):
+            count = acc['notes_count']
+            count_text = "统计中…" if count is None else f"{count} 个游戏有笔记"
+            return f"{acc['persona_name']}  |  ID: {acc['friend_code']}  |  📝 {count_text}"
+
         for acc in self.accounts:
-            listbox.insert(tk.END,
-                           f"{acc['persona_name']}  |  ID: {acc['friend_code']}  "
-                           f"|  📝 {acc['notes_count']} 个游戏有笔记")
+            listbox.insert(tk.END, row_text(acc))
 
         listbox.selection_set(0)
 
+        def update_row(acc):
+            """主线程：某账号的昵称/笔记数读取完成后只刷新该行"""
+            try:
+                idx = self.accounts.index(acc)
+                selected = listbox.curselection()
+                listbox.delete(idx)
+                listbox.insert(idx, row_text(acc))
+                if idx in selected:
+                    listbox.selection_set(idx)
+            except (ValueError, tk.TclError):
+                pass  # 窗口已关闭
+
+        def on_detail(acc):
+            try:
+                sel.after(0, lambda: update_row(acc))
+            except (RuntimeError, tk.TclError):
+                pass  # 窗口已关闭
+
+        SteamAccountScanner.load_details_async(self.accounts, on_detail)
+
         def on_select():
             idx = listbox.curselection()
             if not idx:
                 messagebox.showwarning("提示", "请选择一个账号。")
                 return
-            self.set_current_account(self.accounts[idx[0]])
+            acc = self.accounts[idx[0]]
+            if acc['notes_count'] is None:
+                # 后台尚未读到该账号，直接同步读取（只涉及一个账号）
+                SteamAccountScanner.load_account_details(acc)
+            self.set_current_account(acc)
             sel.destroy()
             self._show_main_window()
 
@@ -298,6 +339,8 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
 
         if len(self.accounts) > 1:
             def switch():
+                # 先停掉当前账号的文件监视，避免旧监视线程向新窗口投递事件
+                self._stop_fs_watcher()
                 root.destroy()
                 self._show_account_selector()
             tk.Button(acc_frame, text="🔄 切换账号", command=switch,
@@ -556,9 +599,15 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         # 启动 Steam 进程监控定时器
         self._steam_monitor_id = None
         self._start_steam_monitor()
+        # 监视笔记目录等文件，Steam 客户端的改动增量反映到列表
+        self._start_fs_watcher()
 
         self._center_window(root)
         root.mainloop()
+        self._stop_fs_watcher()
+        # 退出前将写缓冲中尚未落盘的笔记写入
+        if self.manager:
+            self.manager.flush()
 
     # ────────────────────── Steam 进程监控 ──────────────────────
 
@@ -568,27 +617,139 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
 
     def _check_steam_alive(self):
         """定时检测 Steam 进程，若 Cloud 已连接但 Steam 不在则自动断开；
-        同时检测子进程是否意外退出。"""
-        if self.cloud_uploader and self.cloud_uploader.initialized:
-            # 检测子进程是否意外退出
-            if not self.cloud_uploader.is_alive():
-                self.cloud_uploader.initialized = False
-                self.cloud_uploader.logged_in_friend_code = None
-                self.cloud_uploader = None
-                self.manager.cloud_uploader = None
-                self._update_cloud_status_display()
-            elif not SteamCloudUploader.is_steam_running():
-                # Steam 已关闭，自动断开 Cloud
-                self.cloud_uploader.shutdown()
-                self.cloud_uploader = None
-                self.manager.cloud_uploader = None
-                self._update_cloud_status_display()
+        同时检测子进程是否意外退出。检测在后台线程进行，结果经 root.after 回到主线程。"""
+        uploader = self.cloud_uploader
+        if uploader and uploader.initialized and not self._steam_check_busy:
+            self._steam_check_busy = True
+
+            def _bg():
+                posted = False
+                try:
+                    worker_alive = uploader.is_alive()
+                    steam_running = worker_alive and SteamCloudUploader.is_steam_running()
+                    self.root.after(0, lambda: self._apply_steam_check(
+                        uploader, worker_alive, steam_running))
+                    posted = True
+                except Exception:
+                    pass  # 检测出错或 root 已销毁（切换账号）
+                finally:
+                    if not posted:
+                        # 结果没能交给主线程，在此清除标记，否则之后永远不再检测
+                        self._steam_check_busy = False
+
+            threading.Thread(target=_bg, daemon=True).start()
         # 5 秒后再次检测
         try:
             self._steam_monitor_id = self.root.after(5000, self._check_steam_alive)
         except Exception:
             pass  # root 已销毁
 
+    def _apply_steam_check(self, uploader, worker_alive, steam_running):
+        """主线程：根据后台检测结果断开失效的 Cloud 连接"""
+        self._steam_check_busy = False
+        if uploader is not self.cloud_uploader or not uploader.initialized:
+            return  # 检测期间连接已被用户断开或替换
+        if not worker_alive:
+            # 子进程意外退出
+            uploader.initialized = False
+            uploader.logged_in_friend_code = None
+            self.cloud_uploader = None
+            self.manager.cloud_uploader = None
+            self._update_cloud_status_display()
+        elif not steam_running:
+            # Steam 已关闭，自动断开 Cloud
+            uploader.shutdown()
+            self.cloud_uploader = None
+            self.manager.cloud_uploader = None
+            self._update_cloud_status_display()
+
+    # ────────────────────── 文件变更监视 ──────────────────────
+
+    def _start_fs_watcher(self):
+        """监视笔记目录、remotecache.vdf 与收藏夹文件（inotify 或 stat 轮询）"""
+        notes_dir = self.current_account['notes_dir']
+        try:
+            os.makedirs(notes_dir, exist_ok=True)
+        except OSError:
+            pass
+        self._fs_collections_path = os.path.abspath(SteamAccountScanner.get_collections_path(
+            self.current_account['userdata_path']))
+        watcher = create_watcher(lambda path, kind: self._on_fs_event(watcher, path, kind))
+        watcher.watch_dir(notes_dir)
+        if self._syncstate_tracker:
+            watcher.watch_file(self._syncstate_tracker.vdf_path)
+        watcher.watch_file(self._fs_collections_path)
+        self._fs_watcher = watcher
+        watcher.start()
+
+    def _stop_fs_watcher(self):
+        """停止文件监视并丢弃尚未处理的事件（退出或切换账号时调用）"""
+        watcher, self._fs_watcher = self._fs_watcher, None
+        if watcher:
+            watcher.stop()
+        with self._fs_lock:
+            self._fs_pending = {}
+            # 未执行的 root.after 随窗口一起销毁，须重置，否则新窗口永远不再处理事件
+            self._fs_flush_scheduled = False
+
+    def _on_fs_event(self, watcher, path, kind):
+        """监视线程回调：合并 300ms 内的事件后交给主线程处理"""
+        with self._fs_lock:
+            if watcher is not self._fs_watcher:
+                return  # 已停止的旧监视器（切换账号前）的残留事件
+            self._fs_pending[path] = kind
+            if self._fs_flush_scheduled:
+                return
+            self._fs_flush_scheduled = True
+        try:
+            self.root.after(300, self._apply_fs_events)
+        except Exception:
+            with self._fs_lock:
+                self._fs_flush_scheduled = False  # root 已销毁
+
+    def _apply_fs_events(self):
+        """主线程：按文件类型分派合并后的变更事件"""
+        with self._fs_lock:
+            events, self._fs_pending = self._fs_pending, {}
+            self._fs_flush_scheduled = False
+        notes_dir = os.path.abspath(self.manager.notes_dir)
+        vdf_path = (os.path.abspath(self._syncstate_tracker.vdf_path)
+                    if self._syncstate_tracker else None)
+        changed_apps = set()
+        rescan_notes = syncstates = collections = False
+        for path, kind in events.items():
+            if kind == OVERFLOW:
+                # 事件丢失：对应目录全量处理
+                if path == notes_dir:
+                    rescan_notes = True
+                else:
+                    syncstates = collections = True
+                continue
+            directory, name = os.path.split(path)
+            if directory == notes_dir and name.startswith("notes_"):
+                changed_apps.add(name[6:])
+            elif path == vdf_path:
+                syncstates = True
+            elif path == self._fs_collections_path:
+                collections = True
+
+        if syncstates and self._syncstate_tracker:
+            # 有笔记开始/结束上传时由 _on_syncstates_changed 刷新列表
+            self._syncstate_tracker.refresh()
+        if rescan_notes:
+            if self.manager._rebuild_dirty_from_hashes():
+                self._save_uploaded_hashes()
+            self._refresh_games_list()
+        elif changed_apps:
+            # 只处理外部改动，本程序自身的写入已在操作处刷新过界面
+            external = {aid for aid in changed_apps
+                        if self.manager.sync_external_change(aid)}
+            if external:
+                self._update_game_rows(external)
+        if collections:
+            for callback in list(self._collections_listeners):
+                callback()
+
     # ────────────────────── 右侧列表操作 ──────────────────────
 
     def _ensure_game_name_cache(self, force=False, progress_callback=None):
@@ -602,22 +763,10 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         #    此列表约 15 万条，覆盖几乎所有 Steam 应用
         #    使用单独的缓存键来避免每次启动都重新请求
         bulk_cache_ts = self._config.get("game_name_bulk_cache_ts", 0)
-        now = time.time()
-        # 每 24 小时更新一次全量列表
-        if now - bulk_cache_ts > 86400 or not persisted:
-            try:
-                # 使用已有缓存数作为估计总数
-                est_total = len(persisted) if persisted else 0
-                bulk_names = SteamAccountScanner.fetch_all_steam_app_names(
-                    api_key=self._config.get("steam_web_api_key", ""),
-                    progress_callback=progress_callback,
-                    estimated_total=est_total)
-                if bulk_names:
-                    self._game_name_cache.update(bulk_names)
-                    self._config["game_name_bulk_cache_ts"] = now
-                    print(f"[游戏名称] 全量列表已更新: {len(bulk_names)} 条")
-            except Exception as e:
-                print(f"[游戏名称] 全量列表获取失败: {e}")
+        # 每 24 小时更新一次全量列表（有 API Key 时为增量更新）
+        if time.time() - bulk_cache_ts > 86400 or not persisted:
+            self._update_bulk_names(progress_callback=progress_callback,
+                                    full=not persisted)
         # 3. 本地扫描（已安装游戏，可能有更准确的本地化名称）
         try:
             library_games = SteamAccountScanner.scan_library(
@@ -630,6 +779,40 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         self._persist_name_cache()
         self._game_name_cache_loaded = True
 
+    def _app_names_checkpoint_path(self) -> str:
+        return os.path.join(self._CONFIG_DIR, "app_names.partial.json")
+
+    def _update_bulk_names(self, progress_callback=None, full=False) -> int:
+        """获取 Steam 全量应用名称并合并进名称缓存，返回获取到的条数
+
+        有 API Key 且已有全量缓存时只请求上次更新以来有变化的应用（if_modified_since）；
+        分页断点保存在配置目录，中断后下次调用从断点继续。
+        调用方负责之后的 _persist_name_cache()。
+        """
+        api_key = self._config.get("steam_web_api_key", "")
+        bulk_cache_ts = self._config.get("game_name_bulk_cache_ts", 0)
+        since = int(bulk_cache_ts) if (api_key and bulk_cache_ts and not full) else 0
+        info = {}
+        try:
+            bulk_names = SteamAccountScanner.fetch_all_steam_app_names(
+                api_key=api_key,
+                progress_callback=progress_callback,
+                # 使用已有缓存数作为估计总数（增量更新时未知）
+                estimated_total=0 if since else len(self._game_name_cache),
+                checkpoint_path=self._app_names_checkpoint_path(),
+                if_modified_since=since,
+                info=info)
+        except Exception as e:
+            print(f"[游戏名称] 全量列表获取失败: {e}")
+            return 0
+        if not bulk_names and not info.get('incremental'):
+            return 0
+        self._game_name_cache.update(bulk_names)
+        self._config["game_name_bulk_cache_ts"] = info.get('started_at', int(time.time()))
+        kind = "增量" if info.get('incremental') else "全量"
+        print(f"[游戏名称] {kind}列表已更新: {len(bulk_names)} 条")
+        return len(bulk_names)
+
     def _ensure_game_name_cache_fast(self):
         """仅从持久化缓存快速加载游戏名称（不做任何网络请求），用于启动时快速显示"""
         if self._game_name_cache_loaded:
@@ -720,15 +903,12 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
                    if g['app_id'] not in self._game_name_cache]
         if not missing:
             return
-        # 先尝试批量获取（如果缓存中不够）
+        # 全量列表过期时先增量更新一次（_ensure_game_name_cache 刚更新过则跳过）
         resolved_any = False
-        bulk_names = SteamAccountScanner.fetch_all_steam_app_names(
-            api_key=self._config.get("steam_web_api_key", ""))
-        if bulk_names:
-            for aid in missing:
-                if aid in bulk_names:
-                    self._game_name_cache[aid] = bulk_names[aid]
-                    resolved_any = True
+        bulk_cache_ts = self._config.get("game_name_bulk_cache_ts", 0)
+        if time.time() - bulk_cache_ts > 86400 and self._update_bulk_names():
+            self._persist_name_cache()
+            resolved_any = any(aid in self._game_name_cache for aid in missing)
             # 更新 missing 列表
             missing = [aid for aid in missing
                        if aid not in self._game_name_cache]
@@ -755,48 +935,40 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         return self._game_name_cache.get(app_id, f"AppID {app_id}")
 
     def _parse_remotecache_syncstates(self) -> dict:
-        """解析 remotecache.vdf 获取每个笔记文件的 syncstate
+        """获取每个笔记文件的 syncstate（remotecache.vdf 未变化时直接返回缓存）
         返回 {app_id: syncstate_int}，例如 {'570': 3} 表示 notes_570 正在上传
         syncstate=1 表示已同步，syncstate=3 表示上传中
         """
-        if not self.current_account:
-            return {}
-        notes_dir = self.current_account.get('notes_dir', '')
-        vdf_path = os.path.join(os.path.dirname(notes_dir), 'remotecache.vdf')
-        if not os.path.isfile(vdf_path):
-            return {}
-        try:
-            with open(vdf_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-        except Exception:
+        if not self._syncstate_tracker:
             return {}
-        # 简易 VDF 解析：提取每个 "notes_<appid>" 块中的 "syncstate" 值
-        result = {}
-        # 找所有 notes_XXX 的块
-        block_pat = re.compile(
-            r'"(notes_(?:shortcut_)?[^"]+)"\s*\{([^}]*)\}', re.DOTALL)
-        sync_pat = re.compile(r'"syncstate"\s+"(\d+)"')
-        for m in block_pat.finditer(content):
-            fname = m.group(1)  # e.g. "notes_570"
-            block = m.group(2)
-            sm = sync_pat.search(block)
-            if sm:
-                syncstate = int(sm.group(1))
-                # 从文件名提取 app_id（与 list_all_games 一致，去掉 notes_ 前缀）
-                if fname.startswith("notes_"):
-                    aid = fname[6:]  # "notes_570" → "570", "notes_shortcut_X" → "shortcut_X"
-                else:
-                    continue
-                result[aid] = syncstate
-        return result
+        return self._syncstate_tracker.snapshot()
 
     def is_app_uploading(self, app_id: str) -> bool:
         """判断指定 app_id 的笔记是否正在上传中（syncstate=3）"""
-        syncstates = self._parse_remotecache_syncstates()
-        return syncstates.get(app_id) == 3
+        if not self._syncstate_tracker:
+            return False
+        return self._syncstate_tracker.is_uploading(app_id)
+
+    def _on_syncstates_changed(self, changes: dict):
+        """syncstate 变化回调（可能来自后台线程）：有笔记开始/结束上传时刷新列表"""
+        if self._refreshing_games:
+            return  # 正在刷新的列表已使用最新状态
+        if not any(SyncStateTracker.UPLOADING in pair for pair in changes.values()):
+            return
+        try:
+            self.root.after(0, self._refresh_games_list)
+        except Exception:
+            pass  # root 已销毁
 
     def _refresh_games_list(self, force_cache=False):
         """刷新右侧游戏列表（Treeview 实现，支持并列筛选 + dirty 状态）"""
+        self._refreshing_games = True
+        try:
+            self._refresh_games_list_impl(force_cache)
+        finally:
+            self._refreshing_games = False
+
+    def _refresh_games_list_impl(self, force_cache=False):
         tree = self._games_tree
         tree.delete(*tree.get_children())
 
@@ -848,65 +1020,53 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         vol_filter = self._vol_filter_var.get() if hasattr(self, '_vol_filter_var') else "全部信息量"
         qual_filter = self._qual_filter_var.get() if hasattr(self, '_qual_filter_var') else "全部质量"
 
-        # 过滤
+        # 过滤：各筛选条件先化为 AppID 集合求交，逐行只做一次成员判断。
+        # 集合以原始 str AppID 为键，非 Steam 快捷方式（shortcut_xxx）的笔记同样参与筛选
+        ai_sets = ai_note_sets(ai_notes_map)
+        allowed = None  # None = 不限制
+
+        def _ai(field, value):
+            return ai_sets.get(ai_key(field, value), frozenset())
+
+        def _restrict(ids):
+            nonlocal allowed
+            allowed = ids if allowed is None else allowed & ids
+
+        if dirty_only:
+            _restrict(frozenset(self.manager.dirty_app_ids()))
+        if uploading_only:
+            _restrict(frozenset(a for a, st in syncstate_map.items() if st == 3))
+        if filter_mode == "🤖 AI 处理过":
+            _restrict(ai_sets[HAS_AI])
+        elif filter_mode == "⛔ 信息过少":
+            _restrict(ai_sets[AI_INSUFFICIENT])
+        if is_ai_selected and model_filter != "全部":
+            _restrict(_ai('models', model_filter))
+        if source_filter == "📡 联网":
+            _restrict(_ai('info_sources', 'web'))
+        elif source_filter == "📚 本地":
+            _restrict(_ai('info_sources', 'local'))
+        if conf_filter != "全部确信度":
+            _restrict(_ai('confidences', conf_filter))
+        if vol_filter != "全部信息量":
+            _restrict(_ai('info_volumes', vol_filter))
+        if qual_filter != "全部质量":
+            # 去掉 emoji 前缀（如 "💎相当好" → "相当好"）
+            qual_key = qual_filter
+            for q_emoji in QUALITY_EMOJI.values():
+                qual_key = qual_key.replace(q_emoji, "")
+            _restrict(_ai('qualities', qual_key))
+        excluded = ai_sets[HAS_AI] if filter_mode == "📝 未 AI 处理" else None
+
         filtered_games = []
         for g in games:
             aid = g['app_id']
-            has_ai = aid in ai_notes_map
-            is_dirty = self.manager.is_dirty(aid)
-
-            # 有改动全局勾选
-            if dirty_only and not is_dirty:
-                continue
-
-            # 上传中勾选
-            if uploading_only and syncstate_map.get(aid) != 3:
-                continue
-
-            # AI 状态筛选
-            if filter_mode == "🤖 AI 处理过" and not has_ai:
+            if allowed is not None and aid not in allowed:
                 continue
-            if filter_mode == "📝 未 AI 处理" and has_ai:
+            if excluded is not None and aid in excluded:
                 continue
-            if filter_mode == "⛔ 信息过少":
-                if not has_ai or not ai_notes_map.get(aid, {}).get('has_insufficient', False):
-                    continue
-
-            # 模型二级筛选
-            if is_ai_selected and model_filter != "全部":
-                models = ai_notes_map.get(aid, {}).get('models', [])
-                if model_filter not in models:
-                    continue
-
-            # 信息来源筛选
-            if source_filter == "📡 联网":
-                if not has_ai or 'web' not in ai_notes_map.get(aid, {}).get('info_sources', []):
-                    continue
-            elif source_filter == "📚 本地":
-                if not has_ai or 'local' not in ai_notes_map.get(aid, {}).get('info_sources', []):
-                    continue
-
-            # 确信度筛选
-            if conf_filter != "全部确信度":
-                confs = ai_notes_map.get(aid, {}).get('confidences', [])
-                if conf_filter not in confs:
-                    continue
-
-            # 信息量筛选
-            if vol_filter != "全部信息量":
-                vols = ai_notes_map.get(aid, {}).get('info_volumes', [])
-                if vol_filter not in vols:
-                    continue
-
-            # 质量筛选
-            if qual_filter != "全部质量":
-                # 去掉 emoji 前缀（如 "💎相当好" → "相当好"）
-                qual_key = qual_filter
-                for q_emoji in QUALITY_EMOJI.values():
-                    qual_key = qual_key.replace(q_emoji, "")
-                quals = ai_notes_map.get(aid, {}).get('qualities', [])
-                if qual_key not in quals:
-                    continue
+            has_ai = aid in ai_notes_map
+            is_dirty = self.manager.is_dirty(aid)
 
             g['has_ai'] = has_ai
             g['ai_models'] = ai_notes_map.get(aid, {}).get('models', [])
@@ -946,54 +1106,63 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         # 插入到 Treeview
         for g in filtered_games:
             aid = g['app_id']
-            is_dirty = g.get('is_dirty', False)
-            has_ai = g.get('has_ai', False)
-            display_name = g['game_name']
-            if len(display_name) > 38:
-                display_name = display_name[:35] + "..."
-            ai_tag = ""
-            if has_ai:
-                ai_info = ai_notes_map.get(aid, {})
-                confs = ai_info.get('confidences', [])
-                conf_emoji = CONFIDENCE_EMOJI.get(confs[0], "") if confs else ""
-                quals = ai_info.get('qualities', [])
-                qual_emoji = QUALITY_EMOJI.get(quals[0], "") if quals else ""
-                has_insuf = ai_info.get('has_insufficient', False)
-                # 信息来源 emoji
-                sources = ai_info.get('info_sources', [])
-                source_emoji = ""
-                if 'web' in sources:
-                    source_emoji = "📡"
-                elif 'local' in sources:
-                    source_emoji = "📚"
-                if has_insuf:
-                    ai_tag = " ⛔"
-                else:
-                    ai_tag = f" 🤖{conf_emoji}{qual_emoji}"
-                if source_emoji:
-                    ai_tag += source_emoji
-            dirty_tag = ""
-            is_uploading = g.get('is_uploading', False)
-            if is_uploading:
-                dirty_tag = " ☁️⬆"
-            elif is_dirty:
-                dirty_tag = " ⬆"
-            text = f"{display_name}{ai_tag}{dirty_tag}"
-            notes_col = f"📝{g['note_count']}"
-
-            if is_uploading:
-                tag = "uploading"
-            elif is_dirty:
-                tag = "dirty"
-            elif has_ai and ai_notes_map.get(aid, {}).get('has_insufficient', False):
-                tag = "insufficient"
-            elif has_ai:
-                tag = "ai"
+            text, values, tag = self._game_row_display(g, ai_notes_map.get(aid))
+            tree.insert("", tk.END, iid=aid, text=text, values=values, tags=(tag,))
+
+        self._update_upload_all_btn()
+
+    def _game_row_display(self, g: dict, ai_info) -> tuple:
+        """计算游戏列表一行的显示内容，返回 (text, values, tag)
+        g 需含 game_name, note_count, is_dirty, is_uploading；ai_info 为 summarize_ai_notes 结果或 None"""
+        is_dirty = g.get('is_dirty', False)
+        ai_info = ai_info or {}
+        has_ai = bool(ai_info)
+        display_name = g['game_name']
+        if len(display_name) > 38:
+            display_name = display_name[:35] + "..."
+        ai_tag = ""
+        if has_ai:
+            confs = ai_info.get('confidences', [])
+            conf_emoji = CONFIDENCE_EMOJI.get(confs[0], "") if confs else ""
+            quals = ai_info.get('qualities', [])
+            qual_emoji = QUALITY_EMOJI.get(quals[0], "") if quals else ""
+            has_insuf = ai_info.get('has_insufficient', False)
+            # 信息来源 emoji
+            sources = ai_info.get('info_sources', [])
+            source_emoji = ""
+            if 'web' in sources:
+                source_emoji = "📡"
+            elif 'local' in sources:
+                source_emoji = "📚"
+            if has_insuf:
+                ai_tag = " ⛔"
             else:
-                tag = "normal"
-            tree.insert("", tk.END, iid=aid, text=text, values=(notes_col,), tags=(tag,))
+                ai_tag = f" 🤖{conf_emoji}{qual_emoji}"
+            if source_emoji:
+                ai_tag += source_emoji
+        dirty_tag = ""
+        is_uploading = g.get('is_uploading', False)
+        if is_uploading:
+            dirty_tag = " ☁️⬆"
+        elif is_dirty:
+            dirty_tag = " ⬆"
+        text = f"{display_name}{ai_tag}{dirty_tag}"
+        notes_col = f"📝{g['note_count']}"
+
+        if is_uploading:
+            tag = "uploading"
+        elif is_dirty:
+            tag = "dirty"
+        elif has_ai and ai_info.get('has_insufficient', False):
+            tag = "insufficient"
+        elif has_ai:
+            tag = "ai"
+        else:
+            tag = "normal"
+        return text, (notes_col,), tag
 
-        # 更新上传按钮状态
+    def _update_upload_all_btn(self):
+        """更新上传按钮上的待上传数量"""
         dirty_n = self.manager.dirty_count()
         if hasattr(self, '_upload_all_btn'):
             if dirty_n > 0:
@@ -1001,6 +1170,53 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
             else:
                 self._upload_all_btn.config(text="☁️全部")
 
+    def _games_filters_active(self) -> bool:
+        """游戏列表当前是否有任何筛选条件或搜索词"""
+        defaults = (
+            ('_ai_filter_var', "全部"), ('_source_filter_var', "全部"),
+            ('_conf_filter_var', "全部确信度"), ('_vol_filter_var', "全部信息量"),
+            ('_qual_filter_var', "全部质量"),
+        )
+        for attr, default in defaults:
+            if hasattr(self, attr) and getattr(self, attr).get() != default:
+                return True
+        for attr in ('_dirty_filter_var', '_uploading_filter_var'):
+            if hasattr(self, attr) and getattr(self, attr).get():
+                return True
+        return bool(hasattr(self, '_main_search_var')
+                    and self._main_search_var.get().strip())
+
+    def _update_game_rows(self, app_ids):
+        """增量更新指定游戏在列表中的行
+
+        行的增删（笔记文件新建/删除）、有筛选或搜索条件、或改动数量较多时退回全量刷新，
+        以保证排序与筛选结果和 _refresh_games_list 一致。
+        """
+        tree = self._games_tree
+        if len(app_ids) > 50 or self._games_filters_active():
+            self._refresh_games_list()
+            return
+        for aid in app_ids:
+            exists = os.path.isfile(os.path.join(self.manager.notes_dir, f"notes_{aid}"))
+            if exists != tree.exists(aid):
+                self._refresh_games_list()
+                return
+        for aid in app_ids:
+            if not tree.exists(aid):
+                continue
+            notes = self.manager.read_notes(aid).get("notes", [])
+            g = {
+                'app_id': aid,
+                'note_count': len(notes),
+                'game_name': self._get_game_name(aid),
+                'is_dirty': self.manager.is_dirty(aid),
+                'is_uploading': self.is_app_uploading(aid),
+            }
+            text, values, tag = self._game_row_display(
+                g, SteamNotesManager.summarize_ai_notes(notes))
+            tree.item(aid, text=text, values=values, tags=(tag,))
+        self._update_upload_all_btn()
+
     def _force_refresh_games_list(self):
         """刷新按钮：强制重建游戏名称缓存（后台执行，不阻塞 UI）"""
         self._game_name_cache_loaded = False
@@ -1197,19 +1413,29 @@ class SteamNotesApp(NotesViewerMixin, AIBatchMixin, ImportExportMixin, SettingsM
         if n == 0:
             messagebox.showinfo("提示", "没有需要上传的改动。", parent=self.root)
             return
-        ok, fail = self.manager.cloud_upload_all_dirty()
-        self._save_uploaded_hashes()
-        self._refresh_games_list()
-        if fail == 0:
-            messagebox.showinfo("✅ 成功",
-                                f"已上传 {ok} 个游戏的笔记到 Steam Cloud。\n\n"
-                                "💡 这些改动仍需等待 Steam 客户端自动同步到云端，\n"
-                                "通常在几秒到几分钟内完成。",
-                                parent=self.root)
-        else:
-            messagebox.showwarning("⚠️ 部分失败",
-                                    f"成功 {ok} 个，失败 {fail} 个。",
+
+        def _after_upload():
+            # 取消时已上传的部分同样要记录
+            self._save_uploaded_hashes()
+            self._refresh_games_list()
+
+        def _done(result):
+            ok, fail = result
+            _after_upload()
+            if fail == 0:
+                messagebox.showinfo("✅ 成功",
+                                    f"已上传 {ok} 个游戏的笔记到 Steam Cloud。\n\n"
+                                    "💡 这些改动仍需等待 Steam 客户端自动同步到云端，\n"
+                                    "通常在几秒到几分钟内完成。",
                                     parent=self.root)
+            else:
+                messagebox.showwarning("⚠️ 部分失败",
+                                        f"成功 {ok} 个，失败 {fail} 个。",
+                                        parent=self.root)
+
+        self._run_task(
+            lambda task: self.manager.cloud_upload_all_dirty(progress_callback=task.progress),
+            on_done=_done, on_cancel=_after_upload, title=f"正在上传 {n} 个游戏的笔记…")
 
     def _on_game_double_click(self, event):
         app_id = self._get_selected_app_id()
@@ -1,13 +1,14 @@
 """导入/导出/去重对话框 (Mixin)"""
 
 import os
-import re
-import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from datetime import datetime
 
-from core import is_ai_note
+import bbcode_parser
+import note_similarity
+from core import (BatchFile, SteamNotesManager, is_ai_note, open_batch_text,
+                  supported_compressions)
 
 
 class ImportExportMixin:
@@ -23,25 +24,35 @@ class ImportExportMixin:
                 parent=self.root)
             return
 
+        # 统计笔记数（全部 + AI）：后台读取指纹索引，文件未变化的游戏不重新解析
+        def _count(task):
+            total_notes = 0
+            total_ai_notes = 0
+            for i, aid in enumerate(aids, 1):
+                idx = self.manager.note_index(aid)
+                if idx is not None:
+                    total_notes += len(idx.fingerprints)
+                    total_ai_notes += sum(idx.ai_flags)
+                task.progress(i, len(aids))
+            return total_notes, total_ai_notes
+
+        def _counted(result):
+            total_notes, total_ai_notes = result
+            if total_notes == 0:
+                messagebox.showinfo("提示", "选中的游戏没有笔记可导出。", parent=self.root)
+                return
+            self._show_export_dialog(aids, total_notes, total_ai_notes)
+
+        self._run_task(_count, on_done=_counted, title="正在统计选中游戏的笔记…")
+
+    def _show_export_dialog(self, aids: list, total_notes: int, total_ai_notes: int):
+        """导出对话框主体（笔记数已统计好）"""
         # 检测当前 AI 筛选状态
         current_filter = self._ai_filter_var.get() if hasattr(self, '_ai_filter_var') else "全部"
         is_ai_filtered = (current_filter == "🤖 AI 处理过"
                           or (current_filter.startswith("🤖 ")
                               and current_filter != "🤖 AI 处理过"))
 
-        # 统计笔记数（全部 + AI）
-        total_notes = 0
-        total_ai_notes = 0
-        for aid in aids:
-            data = self.manager.read_notes(aid)
-            notes = data.get("notes", [])
-            total_notes += len(notes)
-            total_ai_notes += sum(1 for n in notes if is_ai_note(n))
-
-        if total_notes == 0:
-            messagebox.showinfo("提示", "选中的游戏没有笔记可导出。", parent=self.root)
-            return
-
         win = tk.Toplevel(self.root)
         win.title("📤 导出笔记")
         win.resizable(False, False)
@@ -92,8 +103,12 @@ class ImportExportMixin:
                        text="📄 逐条导出为多个文件",
                        variable=mode_var, value=1, font=("", 10)).pack(anchor=tk.W)
         tk.Label(mode_frame,
-                 text="每条笔记保存为独立 .txt 文件（文件名=笔记标题，内容=BBCode）",
-                 font=("", 9), fg="#888").pack(anchor=tk.W, padx=25, pady=(0, 5))
+                 text="每条笔记保存为独立 .txt 文件（文件名=笔记标题，内容=BBCode）\n"
+                      "与目录中已有文件同名时自动追加序号，不会覆盖",
+                 font=("", 9), fg="#888", justify=tk.LEFT).pack(anchor=tk.W, padx=25)
+        zip_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(mode_frame, text="🗜️ 打包为单个 .zip 文件（大量笔记或网络盘时更快）",
+                       variable=zip_var, font=("", 9)).pack(anchor=tk.W, padx=22, pady=(0, 5))
 
         ttk.Separator(mode_frame, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=5)
 
@@ -105,52 +120,106 @@ class ImportExportMixin:
                  text="所有笔记写入一个结构化 .txt 文件，可在其他账号上直接导入还原",
                  font=("", 9), fg="#888").pack(anchor=tk.W, padx=25, pady=(0, 5))
 
+        # 导出在后台任务中执行，窗口保持响应
+        running = [False]
+
+        def _run_export(job, on_success, single_file=False):
+            """后台执行 job(progress_callback)，完成后调用 on_success(结果) 并关闭窗口
+
+            single_file：输出为单个文件（合并导出 / zip），数据层先写临时文件，
+            失败或取消时目标路径上不会留下不完整的文件
+            """
+            running[0] = True
+
+            def _done(result):
+                running[0] = False
+                on_success(result)
+                win.destroy()
+
+            def _failed(error):
+                running[0] = False
+                messagebox.showerror("❌ 错误", f"导出失败:\n{error}", parent=win)
+
+            def _cancelled():
+                running[0] = False
+                if single_file:
+                    messagebox.showinfo("提示", "已取消导出，未生成文件。", parent=win)
+                else:
+                    messagebox.showinfo("提示", "已取消导出，已写入的文件保留在目录中。", parent=win)
+
+            self._run_task(lambda task: job(task.progress), on_done=_done, on_error=_failed,
+                           on_cancel=_cancelled, title=f"正在导出 {len(aids)} 个游戏的笔记…",
+                           parent=win)
+
         def do_export():
+            if running[0]:
+                return
             # 构建过滤函数
             nf = is_ai_note if ai_only_var.get() else None
-            export_count = total_ai_notes if ai_only_var.get() else total_notes
 
             if mode_var.get() == 1:
-                # 逐条导出 → 选择目录
-                output_dir = filedialog.askdirectory(
-                    title="选择保存目录（每条笔记一个文件）",
-                    parent=win)
+                as_zip = zip_var.get()
+                if as_zip:
+                    # 逐条导出并打包 → 选择 zip 文件
+                    output_dir = filedialog.asksaveasfilename(
+                        title="保存逐条导出的 zip 文件", defaultextension=".zip",
+                        initialfile=f"steam_notes_{datetime.now().strftime('%Y%m%d')}.zip",
+                        filetypes=[("zip 压缩包", "*.zip")],
+                        parent=win)
+                else:
+                    # 逐条导出 → 选择目录
+                    output_dir = filedialog.askdirectory(
+                        title="选择保存目录（每条笔记一个文件）",
+                        parent=win)
                 if not output_dir:
                     return
-                try:
-                    n_files, n_notes = self.manager.export_individual_files(
-                        aids, output_dir, note_filter=nf)
+
+                def _done_files(result):
+                    n_files, n_notes = result
                     messagebox.showinfo("✅ 成功",
                         f"已导出 {n_files} 个文件到:\n{output_dir}",
                         parent=win)
-                    win.destroy()
-                except Exception as e:
-                    messagebox.showerror("❌ 错误", f"导出失败:\n{e}", parent=win)
+
+                _run_export(lambda cb: self.manager.export_individual_files(
+                    aids, output_dir, note_filter=nf, progress_callback=cb,
+                    as_zip=as_zip), _done_files,
+                    single_file=as_zip)
             else:
-                # 合并导出 → 选择文件
+                # 合并导出 → 选择文件（.gz / .zst 为压缩格式，导入时自动识别）
+                filetypes = [("文本文件", "*.txt"), ("gzip 压缩", "*.txt.gz")]
+                if "zstd" in supported_compressions():
+                    filetypes.append(("zstd 压缩", "*.txt.zst"))
+                filetypes.append(("所有文件", "*.*"))
                 path = filedialog.asksaveasfilename(
                     title="保存合并导出文件", defaultextension=".txt",
                     initialfile=f"steam_notes_batch_{datetime.now().strftime('%Y%m%d')}.txt",
-                    filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")],
+                    filetypes=filetypes,
                     parent=win)
                 if not path:
                     return
-                try:
-                    self.manager.export_batch(aids, path, note_filter=nf)
+
+                def _done_batch(result):
+                    n_apps, n_notes = result
                     messagebox.showinfo("✅ 成功",
-                        f"已导出 {len(aids)} 个游戏的 {export_count} 条笔记到:\n{path}",
+                        f"已导出 {n_apps} 个游戏的 {n_notes} 条笔记到:\n{path}",
                         parent=win)
-                    win.destroy()
-                except Exception as e:
-                    messagebox.showerror("❌ 错误", f"导出失败:\n{e}", parent=win)
+
+                _run_export(lambda cb: self.manager.export_batch(
+                    aids, path, note_filter=nf, progress_callback=cb), _done_batch,
+                    single_file=True)
+
+        def _close():
+            if not running[0]:
+                win.destroy()
 
         btn_frame = tk.Frame(win)
         btn_frame.pack(pady=(10, 15))
-        ttk.Button(btn_frame, text="📤 确认导出",
-                   command=do_export).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="取消",
-                   command=win.destroy).pack(side=tk.LEFT, padx=5)
+        export_btn = ttk.Button(btn_frame, text="📤 确认导出", command=do_export)
+        export_btn.pack(side=tk.LEFT, padx=5)
+        cancel_btn = ttk.Button(btn_frame, text="取消", command=_close)
+        cancel_btn.pack(side=tk.LEFT, padx=5)
 
+        win.protocol("WM_DELETE_WINDOW", _close)
         self._center_window(win)
 
     def _batch_export_selected(self):
@@ -158,9 +227,13 @@ class ImportExportMixin:
         self._ui_export_dialog()
 
     def _ui_dedup_notes(self):
-        """笔记去重功能：扫描所有笔记中的重复项，供用户选择删除"""
-        duplicates = self.manager.find_duplicate_notes()
+        """笔记去重功能：扫描所有笔记中的完全重复项与跨游戏近似重复项，供用户选择删除"""
+        self._run_task(
+            lambda task: self.manager.find_duplicate_notes(progress_callback=task.progress),
+            on_done=self._show_dedup_window, title="正在扫描重复笔记…")
 
+    def _show_dedup_window(self, duplicates: list):
+        """去重窗口主体（完全重复项已扫描好，近似重复在窗口内后台检测）"""
         win = tk.Toplevel(self.root)
         win.title("🔍 笔记去重")
         win.resizable(True, True)
@@ -169,27 +242,29 @@ class ImportExportMixin:
 
         tk.Label(win, text="🔍 笔记去重", font=("", 13, "bold")).pack(pady=(15, 5))
 
-        if not duplicates:
-            tk.Label(win, text="✅ 没有发现重复的笔记！",
-                     font=("", 11), fg="#2a7f2a").pack(padx=40, pady=20)
-            ttk.Button(win, text="关闭", command=win.destroy).pack(pady=(0, 15))
-            self._center_window(win)
-            return
+        # ── 完全重复（同一游戏内标题+内容相同）──
+        exact_frame = tk.LabelFrame(win, text="📋 完全重复（同一游戏内）", font=("", 10),
+                                    padx=10, pady=5)
+        exact_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=5)
 
         total_dup_notes = sum(d['count'] - 1 for d in duplicates)
         total_groups = len(duplicates)
-        tk.Label(win,
-                 text=f"发现 {total_groups} 组重复笔记，"
-                      f"共 {total_dup_notes} 条可删除的副本",
-                 font=("", 10), fg="#c0392b").pack(pady=(0, 10))
+        if duplicates:
+            tk.Label(exact_frame,
+                     text=f"发现 {total_groups} 组重复笔记，"
+                          f"共 {total_dup_notes} 条可删除的副本",
+                     font=("", 10), fg="#c0392b").pack(pady=(0, 5))
+        else:
+            tk.Label(exact_frame, text="✅ 没有发现完全重复的笔记！",
+                     font=("", 10), fg="#2a7f2a").pack(pady=(0, 5))
 
         # 重复列表
-        list_frame = tk.Frame(win)
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=5)
+        list_frame = tk.Frame(exact_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
 
         columns = ("game", "title_preview", "copies")
         tree = ttk.Treeview(list_frame, columns=columns, show="headings",
-                             height=15, selectmode="extended")
+                             height=8 if duplicates else 3, selectmode="extended")
         tree.heading("game", text="游戏")
         tree.heading("title_preview", text="笔记标题 (前50字)")
         tree.heading("copies", text="副本数")
@@ -212,6 +287,41 @@ class ImportExportMixin:
                         values=(game_name, title_preview, d['count']))
             dup_map[iid] = d
 
+        exact_btns = tk.Frame(exact_frame)
+        exact_btns.pack(pady=(5, 0))
+
+        # ── 近似重复（跨游戏，MinHash/LSH）──
+        near_frame = tk.LabelFrame(win, text="🔎 近似重复（跨游戏，含同一游戏内）",
+                                   font=("", 10), padx=10, pady=5)
+        near_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=5)
+
+        near_top = tk.Frame(near_frame)
+        near_top.pack(fill=tk.X)
+        tk.Label(near_top, text="相似度下限 (%):", font=("", 9)).pack(side=tk.LEFT)
+        threshold_var = tk.IntVar(value=int(note_similarity.DEFAULT_THRESHOLD * 100))
+        tk.Spinbox(near_top, textvariable=threshold_var, from_=50, to=100,
+                   increment=5, width=5, font=("", 9)).pack(side=tk.LEFT, padx=(6, 10))
+        near_status = tk.Label(near_top, font=("", 9), fg="#666")
+        near_status.pack(side=tk.LEFT, padx=(10, 0))
+
+        near_list = tk.Frame(near_frame)
+        near_list.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        near_tree = ttk.Treeview(near_list, columns=("title_preview", "similarity"),
+                                 show="tree headings", height=10, selectmode="extended")
+        near_tree.heading("#0", text="簇 / 游戏")
+        near_tree.heading("title_preview", text="笔记标题 (前50字)")
+        near_tree.heading("similarity", text="相似度")
+        near_tree.column("#0", width=220, minwidth=120)
+        near_tree.column("title_preview", width=330, minwidth=150)
+        near_tree.column("similarity", width=70, minwidth=50, anchor=tk.CENTER)
+        near_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        near_scroll = ttk.Scrollbar(near_list, orient=tk.VERTICAL, command=near_tree.yview)
+        near_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        near_tree.config(yscrollcommand=near_scroll.set)
+
+        near_map = {}  # {iid: member}，只含笔记行（簇行不在其中）
+        near_heads = set()  # 各簇簇首（⭐）的 iid，删除时始终保留
+
         # 预览区
         preview_frame = tk.LabelFrame(win, text="选中笔记预览", font=("", 10),
                                        padx=10, pady=5)
@@ -220,6 +330,12 @@ class ImportExportMixin:
                                 state=tk.DISABLED)
         preview_text.pack(fill=tk.X)
 
+        def _set_preview(lines):
+            preview_text.config(state=tk.NORMAL)
+            preview_text.delete("1.0", tk.END)
+            preview_text.insert(tk.END, "\n".join(lines))
+            preview_text.config(state=tk.DISABLED)
+
         def _on_select(event):
             sel = tree.selection()
             if not sel:
@@ -227,19 +343,103 @@ class ImportExportMixin:
             d = dup_map.get(sel[0])
             if not d:
                 return
-            preview_text.config(state=tk.NORMAL)
-            preview_text.delete("1.0", tk.END)
             game_name = self._get_game_name(d['app_id'])
-            preview_text.insert(tk.END, f"🎮 {game_name} (AppID: {d['app_id']})\n")
-            preview_text.insert(tk.END, f"📝 标题: {d['title'][:100]}\n")
-            preview_text.insert(tk.END, f"🔢 总副本数: {d['count']} (可删除 {d['count'] - 1} 条)\n")
-            preview_text.insert(tk.END, f"📄 索引位置: {d['indices']}")
-            preview_text.config(state=tk.DISABLED)
+            _set_preview([
+                f"🎮 {game_name} (AppID: {d['app_id']})",
+                f"📝 标题: {d['title'][:100]}",
+                f"🔢 总副本数: {d['count']} (可删除 {d['count'] - 1} 条)",
+                f"📄 索引位置: {d['indices']}",
+            ])
         tree.bind("<<TreeviewSelect>>", _on_select)
 
-        # 按钮区
-        btn_frame = tk.Frame(win)
-        btn_frame.pack(pady=(10, 15))
+        def _on_near_select(event):
+            sel = near_tree.selection()
+            m = near_map.get(sel[0]) if sel else None
+            if not m:
+                return
+            game_name = self._get_game_name(m['app_id'])
+            _set_preview([
+                f"🎮 {game_name} (AppID: {m['app_id']})  #{m['index'] + 1}"
+                f"  相似度 {m['similarity']:.0%}",
+                f"📝 标题: {m['title'][:100]}",
+                m['preview'],
+            ])
+        near_tree.bind("<<TreeviewSelect>>", _on_near_select)
+
+        def _show_clusters(clusters):
+            near_tree.delete(*near_tree.get_children())
+            near_map.clear()
+            near_heads.clear()
+            n_notes = sum(c['count'] for c in clusters)
+            near_status.config(
+                text=f"发现 {len(clusters)} 簇近似重复，共 {n_notes} 条笔记" if clusters
+                else "✅ 没有发现近似重复的笔记")
+            for ci, c in enumerate(clusters):
+                n_apps = len({m['app_id'] for m in c['members']})
+                parent = near_tree.insert(
+                    "", tk.END, iid=f"cl_{ci}", open=True,
+                    text=f"簇 {ci + 1}（{c['count']} 条 / {n_apps} 个游戏）",
+                    values=("", f"≥{min(m['similarity'] for m in c['members']):.0%}"))
+                for mi, m in enumerate(c['members']):
+                    title_preview = m['title'][:50] + ("..." if len(m['title']) > 50 else "")
+                    iid = f"cl_{ci}_{mi}"
+                    near_tree.insert(parent, tk.END, iid=iid,
+                                     text=("⭐ " if mi == 0 else "") + self._get_game_name(m['app_id']),
+                                     values=(title_preview, f"{m['similarity']:.0%}"))
+                    near_map[iid] = m
+                    if mi == 0:
+                        near_heads.add(iid)
+
+        def _start_near_scan():
+            """后台计算近似重复簇（签名缓存在笔记索引中，再次检测只处理有变化的文件）
+
+            遮罩只覆盖近似重复区域，检测期间完全重复部分仍可操作。
+            """
+            try:
+                threshold = min(max(int(threshold_var.get()), 50), 100) / 100
+            except (tk.TclError, ValueError):
+                threshold = note_similarity.DEFAULT_THRESHOLD
+            near_status.config(text="")
+            self._run_task(
+                lambda task: self.manager.find_similar_notes(
+                    threshold, progress_callback=task.progress),
+                on_done=_show_clusters,
+                on_error=lambda e: near_status.config(text=f"❌ 检测失败: {e}"),
+                on_cancel=lambda: near_status.config(text="已取消检测"),
+                title="正在计算相似度…", parent=near_frame)
+
+        def _delete_near_selected():
+            sel = [iid for iid in near_tree.selection() if iid in near_map]
+            # 簇首始终保留，避免把一簇笔记全部删光
+            heads = [iid for iid in sel if iid in near_heads]
+            targets = [(near_map[iid]['app_id'], near_map[iid]['index'],
+                        near_map[iid]['fingerprint'])
+                       for iid in sel if iid not in near_heads]
+            if not targets:
+                messagebox.showwarning("提示",
+                    "请先在近似重复列表中选择要删除的笔记（簇下的笔记行，可多选；"
+                    "⭐ 簇首始终保留）。", parent=win)
+                return
+            note = f"\n（选中的 {len(heads)} 条 ⭐ 簇首将保留）" if heads else ""
+            if not messagebox.askyesno("确认删除",
+                    f"将删除选中的 {len(targets)} 条笔记。{note}\n\n确定继续？",
+                    parent=win):
+                return
+            removed_total = self.manager.delete_notes_by_fingerprint(targets)
+            skipped = len(targets) - removed_total
+            messagebox.showinfo("✅ 完成",
+                f"已删除 {removed_total} 条笔记。"
+                + (f"\n{skipped} 条笔记在检测后已被修改或移动，已跳过。" if skipped else ""),
+                parent=win)
+            self._refresh_games_list()
+            win.destroy()
+
+        near_btns = tk.Frame(near_frame)
+        near_btns.pack(pady=(5, 0))
+        ttk.Button(near_btns, text="🔎 检测近似重复",
+                   command=_start_near_scan).pack(side=tk.LEFT, padx=4)
+        ttk.Button(near_btns, text="🗑️ 删除选中笔记",
+                   command=_delete_near_selected).pack(side=tk.LEFT, padx=4)
 
         def _delete_selected():
             sel = tree.selection()
@@ -288,20 +488,23 @@ class ImportExportMixin:
             self._refresh_games_list()
             win.destroy()
 
-        ttk.Button(btn_frame, text="🗑️ 删除选中组的副本",
-                   command=_delete_selected).pack(side=tk.LEFT, padx=4)
-        ttk.Button(btn_frame, text="🗑️ 全部去重",
-                   command=_delete_all).pack(side=tk.LEFT, padx=4)
-        ttk.Button(btn_frame, text="取消",
-                   command=win.destroy).pack(side=tk.LEFT, padx=(15, 4))
+        if duplicates:
+            ttk.Button(exact_btns, text="🗑️ 删除选中组的副本",
+                       command=_delete_selected).pack(side=tk.LEFT, padx=4)
+            ttk.Button(exact_btns, text="🗑️ 全部去重",
+                       command=_delete_all).pack(side=tk.LEFT, padx=4)
+        ttk.Button(win, text="关闭",
+                   command=win.destroy).pack(pady=(5, 15))
 
         self._center_window(win)
+        _start_near_scan()
 
     def _ui_import(self):
         """导入笔记窗口 — 支持单条导入和批量导入"""
         path = filedialog.askopenfilename(
             title="选择要导入的文件",
-            filetypes=[("文本文件", "*.txt"), ("Markdown", "*.md"), ("所有文件", "*.*")]
+            filetypes=[("文本文件", "*.txt"), ("Markdown", "*.md"),
+                       ("压缩的批量导出文件", "*.gz *.zst"), ("所有文件", "*.*")]
         )
         if not path:
             return
@@ -309,7 +512,7 @@ class ImportExportMixin:
         # 检测文件是否为批量导出格式
         is_batch_format = False
         try:
-            with open(path, "r", encoding="utf-8") as f:
+            with open_batch_text(path) as f:
                 first_line = f.readline().strip()
                 if first_line == SteamNotesManager.BATCH_EXPORT_HEADER:
                     is_batch_format = True
@@ -389,89 +592,64 @@ class ImportExportMixin:
                  text="检测导入笔记的标题+内容是否与已有笔记完全重复，跳过重复项",
                  font=("", 9), fg="#888").pack(anchor=tk.W, padx=25, pady=(0, 3))
 
+        def _warn_no_notes():
+            messagebox.showwarning("提示",
+                "未在文件中识别到有效笔记。\n"
+                "如果这不是批量导出格式文件，请切换到单条导入。",
+                parent=win)
+
+        def _start_batch_plan():
+            """后台流式读取导入文件并检测冲突（只比对指纹索引），完成后回到主线程"""
+            source = BatchFile(path)
+            mode = "ai" if conflict_mode_var.get() == 1 else "literal"
+            self._run_task(lambda task: self.manager.plan_batch_import(source, mode),
+                           on_done=lambda plan: _apply_plan(source, mode, plan),
+                           on_error=lambda e: messagebox.showerror(
+                               "❌ 错误", f"导入失败:\n{e}", parent=win),
+                           title="正在分析导入文件…", parent=win)
+
+        def _apply_plan(source, mode, plan):
+            """主线程：根据检测结果提示用户并执行导入"""
+            if not plan["n_entries"]:
+                _warn_no_notes()
+                return
+            if mode == "ai":
+                # 模式 1: AI 笔记冲突检测
+                conflicts = plan["conflicts"]
+                if not conflicts:
+                    self._run_batch_import(win, source, plan["n_apps"])
+                    return
+                self._ui_import_conflict(win, source, conflicts,
+                                         n_total=plan["n_apps"])
+                return
+
+            # 模式 2: 字面重复检测（写入时按同一指纹规则再过滤一遍）
+            total_skipped = sum(plan["skipped"].values())
+            n_kept = plan["n_new"]
+            if total_skipped > 0 and not n_kept:
+                messagebox.showinfo("ℹ️ 全部重复",
+                    f"导入文件中的所有 {total_skipped} 条笔记"
+                    f"与已有笔记完全重复，\n已全部跳过。",
+                    parent=win)
+                return
+            if total_skipped > 0:
+                # 有部分重复 — 告知用户
+                proceed = messagebox.askyesno("ℹ️ 检测到重复",
+                    f"发现 {total_skipped} 条笔记与已有笔记完全重复，"
+                    f"已自动跳过。\n\n"
+                    f"剩余 {n_kept} "
+                    f"条不重复笔记将被导入。\n\n继续导入？",
+                    parent=win)
+                if not proceed:
+                    return
+
+            self._run_batch_import(win, self.manager.iter_new_entries(source))
+
         def do_import():
             try:
                 if mode_var.get() == 2:
-                    # 批量导入 — 先解析，再按模式检测冲突
-                    parsed = SteamNotesManager.parse_batch_file(path)
-                    if not parsed:
-                        messagebox.showwarning("提示",
-                            "未在文件中识别到有效笔记。\n"
-                            "如果这不是批量导出格式文件，请切换到单条导入。",
-                            parent=win)
-                        return
-
-                    if conflict_mode_var.get() == 1:
-                        # 模式 1: AI 笔记冲突检测（原有逻辑）
-                        conflicts = {}
-                        for aid, entries in parsed.items():
-                            incoming_ai = [e for e in entries
-                                           if is_ai_note({"title": e["title"],
-                                                           "content": e["content"]})]
-                            if not incoming_ai:
-                                continue
-                            existing_data = self.manager.read_notes(aid)
-                            existing_ai = [n for n in existing_data.get("notes", [])
-                                           if is_ai_note(n)]
-                            if existing_ai:
-                                conflicts[aid] = {
-                                    "existing_ai": existing_ai,
-                                    "incoming_ai": incoming_ai
-                                }
-
-                        if not conflicts:
-                            results = self.manager.apply_batch_import(parsed)
-                            self._show_import_result(win, results)
-                            return
-
-                        self._ui_import_conflict(win, parsed, conflicts)
-                    else:
-                        # 模式 2: 字面重复检测
-                        skipped = {}  # {app_id: skipped_count}
-                        filtered_parsed = {}
-                        for aid, entries in parsed.items():
-                            existing_data = self.manager.read_notes(aid)
-                            existing_notes = existing_data.get("notes", [])
-                            existing_set = set()
-                            for n in existing_notes:
-                                existing_set.add(
-                                    (n.get("title", ""), n.get("content", "")))
-                            kept = []
-                            skip_count = 0
-                            for e in entries:
-                                if (e["title"], e["content"]) in existing_set:
-                                    skip_count += 1
-                                else:
-                                    kept.append(e)
-                            if kept:
-                                filtered_parsed[aid] = kept
-                            if skip_count > 0:
-                                skipped[aid] = skip_count
-
-                        total_skipped = sum(skipped.values())
-                        if total_skipped > 0 and not filtered_parsed:
-                            messagebox.showinfo("ℹ️ 全部重复",
-                                f"导入文件中的所有 {total_skipped} 条笔记"
-                                f"与已有笔记完全重复，\n已全部跳过。",
-                                parent=win)
-                            return
-                        if total_skipped > 0:
-                            # 有部分重复 — 告知用户
-                            proceed = messagebox.askyesno("ℹ️ 检测到重复",
-                                f"发现 {total_skipped} 条笔记与已有笔记完全重复，"
-                                f"已自动跳过。\n\n"
-                                f"剩余 {sum(len(v) for v in filtered_parsed.values())} "
-                                f"条不重复笔记将被导入。\n\n继续导入？",
-                                parent=win)
-                            if not proceed:
-                                return
-
-                        if filtered_parsed:
-                            results = self.manager.apply_batch_import(filtered_parsed)
-                            self._show_import_result(win, results)
-                        else:
-                            results = self.manager.apply_batch_import(parsed)
-                            self._show_import_result(win, results)
+                    # 批量导入 — 先在后台检测冲突，确认后再流式读一遍写入
+                    _start_batch_plan()
                 else:
                     # 单条导入
                     aid = single_app_id_var.get().strip()
@@ -481,18 +659,14 @@ class ImportExportMixin:
                         return
                     title = single_title_var.get().strip() or fname
                     # 单条导入也支持字面重复检测
-                    if conflict_mode_var.get() == 2:
-                        existing_data = self.manager.read_notes(aid)
-                        existing_notes = existing_data.get("notes", [])
-                        with open(path, "r", encoding="utf-8") as f_content:
-                            file_content = f_content.read()
-                        for n in existing_notes:
-                            if n.get("title", "") == title and n.get("content", "") == file_content:
-                                messagebox.showinfo("ℹ️ 重复",
-                                    f"该笔记与 AppID {aid} 中已有笔记完全重复，已跳过导入。",
-                                    parent=win)
-                                return
-                    self.manager.import_single_note(aid, title, path)
+                    imported = self.manager.import_single_note(
+                        aid, title, path,
+                        skip_identical=conflict_mode_var.get() == 2)
+                    if imported is None:
+                        messagebox.showinfo("ℹ️ 重复",
+                            f"该笔记与 AppID {aid} 中已有笔记完全重复，已跳过导入。",
+                            parent=win)
+                        return
                     messagebox.showinfo("✅ 成功",
                                         f"已导入为 AppID {aid} 的笔记:\n「{title}」",
                                         parent=win)
@@ -504,6 +678,29 @@ class ImportExportMixin:
         ttk.Button(win, text="✅ 确认导入", command=do_import).pack(pady=(5, 15))
         self._center_window(win)
 
+    def _run_batch_import(self, import_win, parsed, n_apps: int = 0, **policy):
+        """后台写入批量导入的笔记（参数同 apply_batch_import），完成后显示结果
+
+        n_apps: 待导入的游戏数，用于进度条；未知时传 0
+        取消（或导入窗口被关闭）时已落盘的批次保留。
+        """
+        def _work(task):
+            return self.manager.apply_batch_import(
+                parsed, progress_callback=lambda done, _: task.progress(
+                    done, n_apps, f"已写入 {done} 个游戏的笔记"), **policy)
+
+        def _cancelled():
+            self._refresh_games_list()
+            messagebox.showinfo("提示", "已取消导入，取消前已写入的笔记保留。",
+                                parent=import_win)
+
+        self._run_task(_work,
+                       on_done=lambda results: self._show_import_result(import_win, results),
+                       on_error=lambda e: messagebox.showerror(
+                           "❌ 错误", f"导入失败:\n{e}", parent=import_win),
+                       on_cancel=_cancelled, on_closed=self._refresh_games_list,
+                       title="正在导入笔记…", parent=import_win)
+
     def _show_import_result(self, parent_win, results: dict):
         """显示导入结果的可滚动窗口"""
         if not results:
@@ -545,9 +742,11 @@ class ImportExportMixin:
         result_win.protocol("WM_DELETE_WINDOW", _close_result)
         self._center_window(result_win)
 
-    def _ui_import_conflict(self, import_win, parsed: dict, conflicts: dict):
+    def _ui_import_conflict(self, import_win, parsed, conflicts: dict,
+                            n_total: int = None):
         """AI 笔记冲突处理主窗口
-        parsed: 完整的解析数据 {app_id: [{title, content}, ...]}
+        parsed: 完整的解析数据 {app_id: [{title, content}, ...]} 或可重复迭代的 BatchFile
+        n_total: 待导入的游戏数（parsed 为 BatchFile 时由调用方统计传入）
         conflicts: {app_id: {existing_ai: [note_dict], incoming_ai: [entry_dict]}}
         """
         cwin = tk.Toplevel(import_win)
@@ -561,7 +760,8 @@ class ImportExportMixin:
                  font=("", 14, "bold"), fg="#c0392b").pack(pady=(15, 5))
 
         n_conflict = len(conflicts)
-        n_total = len(parsed)
+        if n_total is None:
+            n_total = len(parsed)
         n_safe = n_total - n_conflict
         tk.Label(cwin,
                  text=f"共 {n_total} 个游戏待导入，其中 {n_conflict} 个存在 AI 笔记冲突"
@@ -618,10 +818,9 @@ class ImportExportMixin:
         btn_frame.pack(pady=(15, 15))
 
         def _do_apply(policy):
-            results = self.manager.apply_batch_import(parsed, ai_policy=policy)
             cwin.grab_release()
             cwin.destroy()
-            self._show_import_result(import_win, results)
+            self._run_batch_import(import_win, parsed, n_total, ai_policy=policy)
 
         def _do_cancel():
             cwin.grab_release()
@@ -630,7 +829,7 @@ class ImportExportMixin:
         def _do_one_by_one():
             cwin.grab_release()
             cwin.destroy()
-            self._ui_import_one_by_one(import_win, parsed, conflicts)
+            self._ui_import_one_by_one(import_win, parsed, conflicts, n_total=n_total)
 
         ttk.Button(btn_frame, text="🔄 全部替换",
                    command=lambda: _do_apply("replace")).pack(side=tk.LEFT, padx=4)
@@ -646,8 +845,9 @@ class ImportExportMixin:
         cwin.protocol("WM_DELETE_WINDOW", _do_cancel)
         self._center_window(cwin)
 
-    def _ui_import_one_by_one(self, import_win, parsed: dict, conflicts: dict):
-        """逐一处理每个冲突游戏的 AI 笔记，左右对比"""
+    def _ui_import_one_by_one(self, import_win, parsed, conflicts: dict,
+                              n_total: int = 0):
+        """逐一处理每个冲突游戏的 AI 笔记，左右对比（n_total 仅用于导入进度）"""
         conflict_list = list(conflicts.items())
         per_app_policy = {}  # {app_id: "replace"/"append"/"skip_ai"}
         current_idx = [0]
@@ -711,7 +911,7 @@ class ImportExportMixin:
 
         def _strip_bbcode(text):
             """简单去除 BBCode 标签以便阅读"""
-            return re.sub(r'\[/?[a-z0-9*]+(?:=[^\]]*)?\]', '', text)
+            return bbcode_parser.strip_tags(text)
 
         def _show_current():
             idx = current_idx[0]
@@ -756,10 +956,8 @@ class ImportExportMixin:
         def _finish():
             owin.grab_release()
             owin.destroy()
-            results = self.manager.apply_batch_import(
-                parsed, ai_policy="append",
-                per_app_policy=per_app_policy)
-            self._show_import_result(import_win, results)
+            self._run_batch_import(import_win, parsed, n_total, ai_policy="append",
+                                   per_app_policy=per_app_policy)
 
         def _cancel_remaining():
             # 将剩余冲突全部设为 skip_ai
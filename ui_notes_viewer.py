@@ -5,7 +5,7 @@ from tkinter import filedialog, messagebox, simpledialog, ttk
 from datetime import datetime
 
 from rich_text_editor import SteamRichTextEditor
-from core import is_ai_note, extract_ai_model_from_note
+from core import SteamNotesManager, note_meta
 
 
 class NotesViewerMixin:
@@ -131,13 +131,20 @@ class NotesViewerMixin:
         note_listbox = tk.Listbox(left_f, width=30, height=15, font=("", 10))
         note_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
 
+        # 先算好全部行文本，一次 insert；AI 标记与模型名按标题缓存（note_meta）
+        labels = []
+        ai_rows = []
         for i, n in enumerate(notes):
             ts = n.get("time_modified", 0)
             t_str = datetime.fromtimestamp(ts).strftime("%m/%d %H:%M") if ts else ""
-            ai_mark = "🤖 " if is_ai_note(n) else ""
-            note_listbox.insert(tk.END, f"[{i}] {ai_mark}{n.get('title', '(无标题)')[:40]}  {t_str}")
-            if is_ai_note(n):
-                note_listbox.itemconfig(i, fg="#1a73e8")
+            is_ai = note_meta(n)[0]
+            ai_mark = "🤖 " if is_ai else ""
+            labels.append(f"[{i}] {ai_mark}{n.get('title', '(无标题)')[:40]}  {t_str}")
+            if is_ai:
+                ai_rows.append(i)
+        note_listbox.insert(tk.END, *labels)
+        for i in ai_rows:
+            note_listbox.itemconfig(i, fg="#1a73e8")
 
         # 检测是否正在上传中
         _is_uploading = self.is_app_uploading(app_id)
@@ -172,6 +179,8 @@ class NotesViewerMixin:
 
         # 用于跟踪原始文本显示状态
         _raw_mode = {'active': False}
+        # 当前渲染在编辑器中的笔记下标（重复选中同一条时不重新渲染）
+        _shown = {'index': None}
 
         btn_frame = tk.Frame(right_f)
         btn_frame.pack(fill=tk.X, pady=5)
@@ -306,8 +315,9 @@ class NotesViewerMixin:
         # 切换笔记时重置原始文本模式
         def on_select(event=None):
             idx = note_listbox.curselection()
-            if not idx:
+            if not idx or (idx[0] == _shown['index'] and not _raw_mode['active']):
                 return
+            _shown['index'] = idx[0]
             _raw_mode['active'] = False
             raw_toggle_btn.config(text="📄 原始文本")
             i = idx[0]
@@ -319,8 +329,8 @@ class NotesViewerMixin:
             if ts:
                 ts_label.config(text=f"⏰ {datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')}")
             # 显示 AI 模型信息
-            if is_ai_note(note):
-                model = extract_ai_model_from_note(note)
+            is_ai, model = note_meta(note)
+            if is_ai:
                 ai_info_label.config(
                     text=f"🤖 AI 生成" + (f" (模型: {model})" if model else ""))
             else:
@@ -376,25 +386,42 @@ class NotesViewerMixin:
                 messagebox.showinfo("✅ 成功", f"已删除「{game_name}」的所有笔记。")
                 self._refresh_games_list()
         else:
-            # 多选：批量删除
-            total_notes = 0
-            valid_ids = []
-            for aid in app_ids:
-                n = len(self.manager.read_notes(aid).get("notes", []))
-                if n > 0:
-                    total_notes += n
-                    valid_ids.append(aid)
-            if not valid_ids:
-                messagebox.showinfo("提示", "选中的游戏均无笔记。")
-                return
-            if messagebox.askyesno("确认批量删除",
-                                   f"确定删除 {len(valid_ids)} 个游戏的全部 {total_notes} 条笔记？\n"
-                                   f"此操作不可撤销。"):
+            # 多选：批量删除（统计与删除都在后台执行）
+            def _count(task):
+                total_notes = 0
+                valid_ids = []
+                for i, aid in enumerate(app_ids, 1):
+                    idx = self.manager.note_index(aid)
+                    if idx is not None and idx.fingerprints:
+                        total_notes += len(idx.fingerprints)
+                        valid_ids.append(aid)
+                    task.progress(i, len(app_ids))
+                return valid_ids, total_notes
+
+            def _delete(task, valid_ids):
                 ok = 0
-                for aid in valid_ids:
+                for i, aid in enumerate(valid_ids, 1):
                     if self.manager.delete_all_notes(aid):
                         ok += 1
+                    task.progress(i, len(valid_ids))
+                return ok
+
+            def _deleted(ok):
                 messagebox.showinfo("✅ 成功", f"已删除 {ok} 个游戏的所有笔记。")
                 self._refresh_games_list()
 
+            def _confirm(result):
+                valid_ids, total_notes = result
+                if not valid_ids:
+                    messagebox.showinfo("提示", "选中的游戏均无笔记。")
+                    return
+                if messagebox.askyesno("确认批量删除",
+                                       f"确定删除 {len(valid_ids)} 个游戏的全部 {total_notes} 条笔记？\n"
+                                       f"此操作不可撤销。"):
+                    self._run_task(lambda task: _delete(task, valid_ids), on_done=_deleted,
+                                   on_cancel=self._refresh_games_list,
+                                   title=f"正在删除 {len(valid_ids)} 个游戏的笔记…")
+
+            self._run_task(_count, on_done=_confirm, title="正在统计选中游戏的笔记…")
+
     # ────────────────────── API Key 设置 ──────────────────────
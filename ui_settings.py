@@ -456,6 +456,10 @@ class SettingsMixin:
         def _clear_name_cache():
             self._config.pop("game_name_cache", None)
             self._config.pop("game_name_bulk_cache_ts", None)
+            try:
+                os.remove(self._app_names_checkpoint_path())
+            except OSError:
+                pass
             self._game_name_cache = {}
             self._game_name_cache_loaded = False
             self._save_config(self._config)
@@ -509,26 +513,57 @@ class SettingsMixin:
         ttk.Button(row3, text="清除", width=5,
                    command=_clear_free_cache).pack(side=tk.RIGHT)
 
-        # 家庭库扫描缓存
-        flib_cache = self._config.get("family_library_cache", {})
-        flib_games = len(flib_cache.get("library_games", []))
-        flib_family = len(flib_cache.get("family_owned_ids", []))
+        # 游戏库快照（在线扫描结果，含家庭组成员）
+        flib_snapshots = len(self._get_owned_games_cache())
         row3b = tk.Frame(info_frame)
         row3b.pack(fill=tk.X, pady=2)
-        flib_text = (f"👨‍👩‍👧‍👦 家庭库缓存: {flib_games} 款游戏，家庭库 {flib_family} 款"
-                     if flib_cache else "👨‍👩‍👧‍👦 家庭库缓存: 无")
+        flib_text = (f"👨‍👩‍👧‍👦 游戏库快照: {flib_snapshots} 个账号"
+                     if flib_snapshots else "👨‍👩‍👧‍👦 游戏库快照: 无")
         tk.Label(row3b, text=flib_text, font=("", 10)).pack(side=tk.LEFT)
 
         def _clear_family_lib_cache():
-            self._config.pop("family_library_cache", None)
-            self._save_config(self._config)
+            self._get_owned_games_cache().clear()
             _refresh_size()
-            messagebox.showinfo("✅", "家庭库缓存已清除（下次打开 AI 生成窗口将重新扫描）",
+            messagebox.showinfo("✅", "游戏库快照已清除（下次打开 AI 生成窗口将重新扫描）",
                                 parent=cache_win)
 
         ttk.Button(row3b, text="清除", width=5,
                    command=_clear_family_lib_cache).pack(side=tk.RIGHT)
 
+        # 笔记文件格式（紧凑格式体积更小，上传与哈希更快）
+        compact_now = self._config.get("notes_compact_json", False)
+        row_fmt = tk.Frame(info_frame)
+        row_fmt.pack(fill=tk.X, pady=2)
+        fmt_lbl = tk.Label(row_fmt, font=("", 10),
+                           text=f"📄 笔记文件格式: {'紧凑' if compact_now else '缩进'}")
+        fmt_lbl.pack(side=tk.LEFT)
+
+        def _toggle_note_format():
+            target = not self._config.get("notes_compact_json", False)
+            fmt_name = "紧凑（Steam 原生）" if target else "缩进"
+            if not messagebox.askyesno("确认",
+                    f"将当前账号的所有笔记文件转换为{fmt_name}格式？\n"
+                    "内容不变，已同步的笔记不会因此变为待上传。",
+                    parent=cache_win):
+                return
+            self._config["notes_compact_json"] = target
+            count, saved = 0, 0
+            if self.manager:
+                count, saved = self.manager.migrate_note_format(target)
+                self._save_uploaded_hashes()
+            else:
+                self._save_config(self._config)
+            fmt_lbl.config(text=f"📄 笔记文件格式: {'紧凑' if target else '缩进'}")
+            fmt_btn.config(text="转为缩进" if target else "转为紧凑")
+            _refresh_size()
+            messagebox.showinfo("✅",
+                                f"已转换 {count} 个笔记文件，体积变化 {-saved / 1024:+.1f} KB",
+                                parent=cache_win)
+
+        fmt_btn = ttk.Button(row_fmt, text="转为缩进" if compact_now else "转为紧凑",
+                             width=8, command=_toggle_note_format)
+        fmt_btn.pack(side=tk.RIGHT)
+
         # AI 令牌配置（不可清除，仅展示）
         tokens = self._config.get("ai_tokens", [])
         family_codes = self._config.get("family_friend_codes", [])
@@ -568,7 +603,7 @@ class SettingsMixin:
                 if k.startswith("uploaded_hashes_"):
                     del self._config[k]
             self._config.pop("free_apps_cache", None)
-            self._config.pop("family_library_cache", None)
+            self._get_owned_games_cache().clear()
             self._save_config(self._config)
             if self.manager:
                 self.manager._uploaded_hashes = {}
@@ -0,0 +1,189 @@
+"""后台任务执行 (Mixin) — 阻塞的文件/网络操作放到工作线程，窗口上显示统一的进度/取消遮罩
+
+用法（任意 Mixin 方法中）：
+    def _work(task):
+        for i, aid in enumerate(aids, 1):
+            ...
+            task.progress(i, len(aids))      # 已取消时抛出 TaskCancelled
+        return result
+
+    self._run_task(_work, on_done=lambda result: ..., title="正在导出…", parent=win)
+
+工作函数在共享的后台线程池中执行，参数为 BackgroundTask：
+  task.progress(done, total, text="") 可在工作线程中随意调用，界面按 _PROGRESS_INTERVAL 节流刷新；
+  签名与数据层的 progress_callback(done, total) 一致，可直接传入，取消后下一次回调即中止任务；
+  不上报进度的循环可调用 task.check()。
+on_done(result) / on_error(exc) / on_cancel() 经 root.after 回到主线程调用。
+遮罩盖住 parent 窗口（默认主窗口）的全部内容，任务结束前该窗口不可操作，其他窗口不受影响；
+parent 被关闭时（遮罩随之销毁）可取消的任务自动取消，结束后只调用 on_closed()。
+"""
+
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import messagebox, ttk
+
+_TASK_WORKERS = 4           # 共享后台线程数
+_PROGRESS_INTERVAL = 0.1    # 进度刷新最小间隔（秒）
+
+
+class TaskCancelled(Exception):
+    """后台任务已被用户取消（由 BackgroundTask.check / progress 抛出）"""
+
+
+class _WorkerPool:
+    """守护线程池：程序退出时不等待未完成的任务（与项目中其他后台线程一致）"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn):
+        with self._lock:
+            if len(self._threads) < self._size:
+                t = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(t)
+                t.start()
+        self._queue.put(fn)
+
+    def _run(self):
+        while True:
+            fn = self._queue.get()
+            try:
+                fn()
+            except Exception as e:
+                print(f"[后台任务] 未处理的异常: {e}")
+
+
+_pool = _WorkerPool(_TASK_WORKERS)
+
+
+class BackgroundTask:
+    """一次后台任务的句柄：取消标志 + 进度上报"""
+
+    def __init__(self, report):
+        self._report = report  # report(done, total, text)，在工作线程中调用
+        self._cancel = threading.Event()
+        self._last_report = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """已取消时抛出 TaskCancelled"""
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done: int, total: int = 0, text: str = ""):
+        """上报进度（工作线程中调用，自动节流）；已取消时抛出 TaskCancelled"""
+        self.check()
+        now = time.monotonic()
+        if (total and done >= total) or now - self._last_report >= _PROGRESS_INTERVAL:
+            self._last_report = now
+            self._report(done, total, text)
+
+
+class TaskRunnerMixin:
+    """各 Mixin 共用的后台任务执行与进度遮罩"""
+
+    def _run_task(self, fn, on_done=None, title: str = "正在处理…", parent=None,
+                  on_error=None, on_cancel=None, on_closed=None,
+                  cancellable: bool = True) -> BackgroundTask:
+        """在后台线程池中执行 fn(task)，返回 BackgroundTask
+
+        on_done(result)：成功完成后在主线程调用
+        on_error(exc)：抛出异常时在主线程调用，默认弹出错误对话框
+        on_cancel()：用户取消后在主线程调用（工作函数响应取消、抛出 TaskCancelled 之后）
+        on_closed()：parent 在任务结束前被关闭时，任务结束后在主线程调用（代替上面三者）
+        parent：覆盖遮罩的窗口，默认主窗口；关闭 parent 即取消任务（cancellable 为 True 时）
+        """
+        parent = parent or self.root
+        overlay = self._show_task_overlay(parent, title, cancellable)
+        task = BackgroundTask(lambda done, total, text: self._post_to_ui(
+            lambda: self._update_task_overlay(overlay, done, total, text)))
+        overlay.cancel_btn.config(command=lambda: self._cancel_task(task, overlay))
+        if cancellable:
+            # 遮罩只会随 parent 一起销毁（或在 _finish 中任务已结束后销毁）
+            overlay.bind("<Destroy>", lambda e: task.cancel(), add="+")
+
+        def _finish(outcome, value):
+            if not parent.winfo_exists():
+                if on_closed:
+                    on_closed()
+                return
+            if overlay.winfo_exists():
+                overlay.destroy()
+            if outcome == "done":
+                if on_done:
+                    on_done(value)
+            elif outcome == "cancelled":
+                if on_cancel:
+                    on_cancel()
+            elif on_error:
+                on_error(value)
+            else:
+                messagebox.showerror("❌ 错误", f"操作失败:\n{value}", parent=parent)
+
+        def _work():
+            try:
+                outcome, value = "done", fn(task)
+            except TaskCancelled:
+                outcome, value = "cancelled", None
+            except Exception as e:
+                outcome, value = "error", e
+            self._post_to_ui(lambda: _finish(outcome, value))
+
+        _pool.submit(_work)
+        return task
+
+    def _post_to_ui(self, callback):
+        """从工作线程把回调交给 Tk 主线程执行"""
+        try:
+            self.root.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            pass  # 主窗口已关闭
+
+    def _show_task_overlay(self, parent, title: str, cancellable: bool):
+        """在 parent 上铺一层遮罩，中间为标题、进度条与取消按钮"""
+        overlay = tk.Frame(parent, bg="#dcdcdc", cursor="watch")
+        overlay.place(relx=0, rely=0, relwidth=1, relheight=1)
+        box = tk.Frame(overlay, bg="white", padx=20, pady=15,
+                       highlightthickness=1, highlightbackground="#999")
+        box.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        tk.Label(box, text=f"⏳ {title}", font=("", 11, "bold"), bg="white").pack()
+        overlay.bar = ttk.Progressbar(box, mode='indeterminate', length=280)
+        overlay.bar.pack(pady=(10, 4))
+        overlay.bar.start(15)
+        overlay.detail = tk.Label(box, text="", font=("", 9), fg="#666", bg="white")
+        overlay.detail.pack()
+        overlay.cancel_btn = ttk.Button(box, text="取消")
+        if cancellable:
+            overlay.cancel_btn.pack(pady=(8, 0))
+        overlay.lift()
+        overlay.focus_set()
+        return overlay
+
+    @staticmethod
+    def _update_task_overlay(overlay, done: int, total: int, text: str):
+        if not overlay.winfo_exists():
+            return
+        if total:
+            if str(overlay.bar.cget("mode")) != "determinate":
+                overlay.bar.stop()
+                overlay.bar.config(mode='determinate')
+            overlay.bar.config(maximum=total, value=done)
+        overlay.detail.config(text=text or (f"{done} / {total}" if total else ""))
+
+    @staticmethod
+    def _cancel_task(task: BackgroundTask, overlay):
+        task.cancel()
+        if overlay.winfo_exists():
+            overlay.cancel_btn.config(state=tk.DISABLED)
+            overlay.detail.config(text="正在取消…")
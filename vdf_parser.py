@@ -0,0 +1,328 @@
+"""Valve KeyValues (VDF/ACF) 解析 — 文本格式流式解析 + 二进制格式读取
+
+文本格式（localconfig.vdf / remotecache.vdf / libraryfolders.vdf / appmanifest_*.acf）：
+  按块读取文件、逐个产出键值事件，不把整个文件读入内存；
+  find_values() 找齐所需键后立即停止读取，iter_subtrees() 只为匹配路径的子块构建 dict。
+二进制格式（shortcuts.vdf / appinfo.vdf）：
+  binary_loads() 解析二进制 KeyValues；iter_appinfo() 逐条读取 appinfo.vdf，
+  不需要的条目直接 seek 跳过。
+
+纯数据层模块，无 UI 依赖。Steam 的键名不区分大小写，本模块的路径/键匹配同样忽略大小写。
+"""
+
+import io
+import os
+import re
+import struct
+
+_CHUNK_SIZE = 1 << 16
+
+# 一次匹配一个完整事件（键值对 / 子块开始 / 子块结束 / 注释），连同前导空白：
+#   键：带引号字符串(1) 或无引号单词(2)，其后可跟 [$WIN32] 这类条件标记
+#   值：带引号字符串(3) | "{"(4) | 无引号单词(5)，其后可跟条件标记
+#   "}"(6)
+# 带引号字符串用展开循环写法，比 (?:[^"\\]|\\.)* 快约一倍
+_QUOTED = r'"([^"\\]*(?:\\.[^"\\]*)*)"'
+_WORD = r'([^\s{}"\[/][^\s{}"]*)'
+_COND = r'(?:[ \t]*\[[^\]\n]*\])?'
+_EVENT_RE = re.compile(
+    r'\s*(?:(?:' + _QUOTED + '|' + _WORD + r')\s*' + _COND + r'\s*'
+    r'(?:' + _QUOTED + r'|(\{)|' + _WORD + ')' + _COND +
+    r'|(\})|//[^\n]*)', re.DOTALL)
+
+_ESCAPES = {"\\\\": "\\", '\\"': '"', "\\n": "\n", "\\t": "\t"}
+_ESCAPE_RE = re.compile(r'\\[\\"nt]')
+
+# 事件类型
+VALUE = "value"   # ("value", key, str)
+BEGIN = "begin"   # ("begin", key, None)
+END = "end"       # ("end", None, None)
+
+
+def _unescape(s: str) -> str:
+    if "\\" not in s:
+        return s
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(0)], s)
+
+
+def _open_source(source):
+    """source 可为文件路径或已打开的文本文件对象。返回 (文件对象, 是否需要关闭)"""
+    if isinstance(source, (str, bytes, os.PathLike)):
+        return open(source, "r", encoding="utf-8", errors="replace"), True
+    return source, False
+
+
+def iter_events(source):
+    """按块读取文本 VDF，产出键值事件流：
+
+        ("value", key, value)  标量键值
+        ("begin", key, None)   进入子块
+        ("end", None, None)    离开子块
+
+    每块只处理到最后一个换行符为止，剩余部分与下一块拼接后再匹配；
+    匹配不连续（如跨块的多行字符串）时同样留待读入更多内容后重试。
+    注释与 [$WIN32] 这类条件标记直接丢弃。
+    """
+    fp, should_close = _open_source(source)
+    try:
+        buf = ""
+        eof = False
+        while not eof:
+            chunk = fp.read(_CHUNK_SIZE)
+            eof = not chunk
+            buf += chunk
+            cut = len(buf) if eof else buf.rfind("\n")
+            if cut <= 0:
+                continue
+            # 缓冲区积压过多说明文件本身有不合法内容，放弃连续性检查以免反复重扫
+            strict = not eof and len(buf) < _CHUNK_SIZE * 16
+            pos = 0
+            for m in _EVENT_RE.finditer(buf):
+                if m.end() > cut or (strict and m.start() != pos):
+                    break
+                pos = m.end()
+                kq, kw, vq, vb, vw, close = m.groups()
+                if close:
+                    yield END, None, None
+                    continue
+                key = _unescape(kq) if kq is not None else kw
+                if vb:
+                    yield BEGIN, key, None
+                elif vq is not None:
+                    yield VALUE, key, _unescape(vq)
+                elif vw is not None:
+                    yield VALUE, key, vw
+            buf = buf[pos:]
+    finally:
+        if should_close:
+            fp.close()
+
+
+def _build(events) -> dict:
+    """从事件流构建 dict，直到遇到与起点配对的 end（或事件流结束）"""
+    root = {}
+    stack = [root]
+    for event, key, value in events:
+        if event == VALUE:
+            stack[-1][key] = value
+        elif event == BEGIN:
+            child = {}
+            stack[-1][key] = child
+            stack.append(child)
+        else:
+            if len(stack) == 1:
+                break
+            stack.pop()
+    return root
+
+
+def load(source) -> dict:
+    """完整解析为嵌套 dict（重复键以后者为准）"""
+    return _build(iter_events(source))
+
+
+def loads(text: str) -> dict:
+    return load(io.StringIO(text))
+
+
+def _path_matches(stack: list, path: tuple) -> bool:
+    if len(stack) != len(path):
+        return False
+    for actual, want in zip(stack, path):
+        if want is not None and actual.lower() != want.lower():
+            return False
+    return True
+
+
+def find_values(source, keys, path: tuple = None) -> dict:
+    """查找若干标量键的首次出现，找齐后立即停止读取文件
+
+    keys: 键名列表（忽略大小写）
+    path: 可选，只在该路径下的直接子键中查找，如 ("AppState",)；None 表示任意位置
+    Returns: {键名(按 keys 中的写法): 值}，未找到的键不出现在结果中
+    """
+    wanted = {k.lower(): k for k in keys}
+    found = {}
+    stack = []
+    for event, key, value in iter_events(source):
+        if event == BEGIN:
+            stack.append(key)
+        elif event == END:
+            if stack:
+                stack.pop()
+        elif path is None or _path_matches(stack, path):
+            k = wanted.get(key.lower())
+            if k is not None and k not in found:
+                found[k] = value
+                if len(found) == len(wanted):
+                    break
+    return found
+
+
+def iter_subtrees(source, path: tuple):
+    """惰性遍历 path 下的每个子块，逐个产出 (key, dict)
+
+    path 中的 None 为通配符，如 (None,) 表示根块下每个块的子块。
+    只为匹配的子块构建 dict，其余内容只做词法扫描；调用方可随时 break 提前结束读取。
+    """
+    events = iter_events(source)
+    stack = []
+    for event, key, value in events:
+        if event == BEGIN:
+            if _path_matches(stack, path):
+                yield key, _build(events)
+            else:
+                stack.append(key)
+        elif event == END and stack:
+            stack.pop()
+
+
+# ───────────────────────── 二进制 KeyValues ─────────────────────────
+
+_BIN_NONE = 0x00      # 子块开始
+_BIN_STRING = 0x01
+_BIN_INT32 = 0x02
+_BIN_FLOAT32 = 0x03
+_BIN_POINTER = 0x04
+_BIN_WIDESTRING = 0x05
+_BIN_COLOR = 0x06
+_BIN_UINT64 = 0x07
+_BIN_END = 0x08
+_BIN_INT64 = 0x0A
+_BIN_END_ALT = 0x0B
+
+_INT32 = struct.Struct("<i")
+_UINT32 = struct.Struct("<I")
+_UINT64 = struct.Struct("<Q")
+_INT64 = struct.Struct("<q")
+_FLOAT32 = struct.Struct("<f")
+
+
+class VDFError(ValueError):
+    """二进制 VDF 数据格式错误"""
+
+
+def _read_cstring(data: bytes, pos: int) -> tuple:
+    end = data.index(b"\0", pos)
+    return data[pos:end].decode("utf-8", "replace"), end + 1
+
+
+def _parse_binary(data: bytes, pos: int, key_table: list = None) -> tuple:
+    """从 pos 开始解析一个二进制 KeyValues 块，返回 (dict, 结束后的位置)"""
+    result = {}
+    stack = [result]
+    size = len(data)
+    try:
+        while pos < size:
+            kind = data[pos]
+            pos += 1
+            if kind in (_BIN_END, _BIN_END_ALT):
+                if len(stack) == 1:
+                    return result, pos
+                stack.pop()
+                continue
+            if key_table is not None:
+                key = key_table[_UINT32.unpack_from(data, pos)[0]]
+                pos += 4
+            else:
+                key, pos = _read_cstring(data, pos)
+            if kind == _BIN_NONE:
+                child = {}
+                stack[-1][key] = child
+                stack.append(child)
+            elif kind == _BIN_STRING:
+                stack[-1][key], pos = _read_cstring(data, pos)
+            elif kind in (_BIN_INT32, _BIN_POINTER, _BIN_COLOR):
+                stack[-1][key] = _INT32.unpack_from(data, pos)[0]
+                pos += 4
+            elif kind == _BIN_FLOAT32:
+                stack[-1][key] = _FLOAT32.unpack_from(data, pos)[0]
+                pos += 4
+            elif kind == _BIN_UINT64:
+                stack[-1][key] = _UINT64.unpack_from(data, pos)[0]
+                pos += 8
+            elif kind == _BIN_INT64:
+                stack[-1][key] = _INT64.unpack_from(data, pos)[0]
+                pos += 8
+            elif kind == _BIN_WIDESTRING:
+                end = pos
+                while data[end:end + 2] != b"\0\0":
+                    end += 2
+                stack[-1][key] = data[pos:end].decode("utf-16-le", "replace")
+                pos = end + 2
+            else:
+                raise VDFError(f"未知的二进制 VDF 类型 0x{kind:02x} @ {pos - 1}")
+    except (IndexError, ValueError, struct.error) as e:
+        if isinstance(e, VDFError):
+            raise
+        raise VDFError(f"二进制 VDF 数据截断或损坏 @ {pos}") from e
+    return result, pos
+
+
+def binary_loads(data: bytes) -> dict:
+    """解析二进制 KeyValues（如 shortcuts.vdf）"""
+    return _parse_binary(data, 0)[0]
+
+
+def load_binary_file(path: str) -> dict:
+    with open(path, "rb") as f:
+        return binary_loads(f.read())
+
+
+# appinfo.vdf 头部魔数 → 每条记录 KeyValues 之前的固定字段长度
+_APPINFO_MAGIC = {
+    0x07564427: 40,  # v27：infostate, last_updated, access_token, sha1, change_number
+    0x07564428: 60,  # v28：额外 binary_data_sha1
+    0x07564429: 60,  # v29：同 v28，键名改为字符串表索引
+}
+
+
+def _read_exact(fp, n: int) -> bytes:
+    data = fp.read(n)
+    if len(data) != n:
+        raise VDFError("appinfo.vdf 数据截断")
+    return data
+
+
+def iter_appinfo(path: str, app_ids=None):
+    """逐条读取 appinfo.vdf，产出 (app_id: int, dict)
+
+    app_ids: 可选的 AppID 集合，不在其中的条目直接 seek 跳过、不做解析；
+             全部找到后立即停止
+    """
+    wanted = set(int(a) for a in app_ids) if app_ids is not None else None
+    with open(path, "rb") as f:
+        magic, _universe = struct.unpack("<II", _read_exact(f, 8))
+        header_len = _APPINFO_MAGIC.get(magic)
+        if header_len is None:
+            raise VDFError(f"不支持的 appinfo.vdf 版本 0x{magic:08x}")
+        key_table = None
+        if magic == 0x07564429:
+            table_offset = _INT64.unpack(_read_exact(f, 8))[0]
+            start = f.tell()
+            f.seek(table_offset)
+            raw = f.read()
+            count = _UINT32.unpack_from(raw, 0)[0]
+            key_table = []
+            pos = 4
+            for _ in range(count):
+                s, pos = _read_cstring(raw, pos)
+                key_table.append(s)
+            f.seek(start)
+        while True:
+            head = f.read(4)
+            if len(head) < 4:
+                return
+            app_id = _UINT32.unpack(head)[0]
+            if app_id == 0:
+                return
+            size = _UINT32.unpack(_read_exact(f, 4))[0]
+            if wanted is not None and app_id not in wanted:
+                f.seek(size, os.SEEK_CUR)
+                continue
+            blob = _read_exact(f, size)
+            yield app_id, _parse_binary(blob, header_len, key_table)[0]
+            if wanted is not None:
+                wanted.discard(app_id)
+                if not wanted:
+                    return